@@ -28,6 +28,13 @@ function! CloseVimDatabaseQueryBorder(bufnr, ...) abort
   call setbufvar(a:bufnr, 'border_winid', -1)
 endfunction
 
+function! CloseVimDatabasePrompt(bufnr, ...) abort
+  let s:winids = win_findbuf(a:bufnr)
+  for winid in s:winids
+    call nvim_win_close(winid, v:true)
+  endfor
+endfunction
+
 function! s:VimDatabaseSelectTable(table) abort
   call VimDatabase_select_table_fzf(a:table)
 endfunction
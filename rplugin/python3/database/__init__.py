@@ -1,30 +1,51 @@
 import os
-from asyncio import AbstractEventLoop, Lock, run_coroutine_threadsafe
+from asyncio import AbstractEventLoop, run_coroutine_threadsafe
 from typing import Any, Awaitable, Callable, Sequence
 
 from pynvim import Nvim, plugin, command, function
 
 from .concurrents.executor_service import ExecutorService
+from .concurrents.executors import get_transition_lock
 from .configs.config import load_config
 from .states.state import init_state, Mode
 from .transitions.connection_ops import show_connections, select_connection, delete_connection, new_connection, \
     edit_connection
 from .transitions.data_ops import (
+    commit_changes,
+    discard_changes,
     copy_row,
+    copy_rows,
     edit_row,
     filter_columns,
     order,
     show_table_data,
     delete_row,
+    delete_rows,
+    edit_table,
+    write_table,
     row_filter,
+    clear_row_filter,
     next_page,
     previous_page,
+    toggle_sample,
+    change_sample_rate,
 )
 from .transitions.database_ops import show_databases, select_database
+from .transitions.export_ops import export
+from .transitions.facet_ops import show_column_facets, select_facet, refresh_facets
+from .transitions.import_ops import import_csv
+from .transitions.job_ops import run_query_job, show_jobs, open_job, delete_job
 from .transitions.lsp_ops import lsp_config
-from .transitions.query_ops import run_query, show_update_query, show_copy_query, show_insert_query
+from .transitions.plan_ops import explain
+from .transitions.profile_ops import profile, refresh_profile, show_profiled_table
+from .transitions.query_ops import (run_query, run_local_query, run_script, show_update_query, show_copy_query,
+                                    show_insert_query, change_result_page)
+from .transitions.refresh_ops import toggle_auto_refresh
+from .transitions.tail_ops import toggle_tail
 from .transitions.table_ops import (list_tables_fzf, describe_table, select_table, delete_table, describe_current_table,
-                                    show_tables, table_filter)
+                                    show_tables, table_filter, filter_tables, submit_table_filter, find_table,
+                                    search_tables, submit_found_table, next_tables_page, previous_tables_page)
+from .transitions.tree_ops import show_tree, toggle_tree_node, reload_tree_node, show_tree_table_data
 from .transitions.view_ops import (resize_database, close_query, show_query, toggle_query, close, toggle)
 from .utils.files import create_folder_if_not_present
 from .utils.log import log, init_log
@@ -36,7 +57,6 @@ class DatabasePlugin(object):
 
     def __init__(self, nvim: Nvim) -> None:
         self._nvim = nvim
-        self._lock = Lock()
         self._executor = ExecutorService()
         init_nvim(self._nvim)
         init_log(self._nvim)
@@ -63,7 +83,7 @@ class DatabasePlugin(object):
     def _run(self, func: Callable[..., Awaitable[None]], *args: Any) -> None:
 
         async def run() -> None:
-            async with self._lock:
+            async with get_transition_lock():
                 if self._configs is None:
                     self._configs = await load_config()
                 if self._state is None:
@@ -80,6 +100,27 @@ class DatabasePlugin(object):
     def toggle_query_command(self) -> None:
         self._run(toggle_query)
 
+    @command('VDFindTable')
+    def find_table_command(self) -> None:
+        self._run(find_table)
+
+    @command('VDEditTable')
+    def edit_table_command(self) -> None:
+        if self._state.mode == Mode.QUERY and not self._state.user_query:
+            self._run(edit_table)
+
+    @command('VDExport', nargs='?', complete='file')
+    def export_command(self, args: Sequence[str]) -> None:
+        self._run(export, args[0] if args else None)
+
+    @command('VDImport', nargs='?', complete='file')
+    def import_command(self, args: Sequence[str]) -> None:
+        self._run(import_csv, args[0] if args else None)
+
+    @command('VDJobs')
+    def jobs_command(self) -> None:
+        self._run(show_jobs)
+
     @command('VDLSPConfig')
     def lsp_config_command(self) -> None:
         self._run(lsp_config)
@@ -100,6 +141,10 @@ class DatabasePlugin(object):
     def show_tables_function(self, _: Sequence[Any]) -> None:
         self._run(show_tables)
 
+    @function('VimDatabase_show_tree')
+    def show_tree_function(self, _: Sequence[Any]) -> None:
+        self._run(show_tree)
+
     @function('VimDatabase_show_query')
     def show_query_function(self, _: Sequence[Any]) -> None:
         self._run(show_query)
@@ -114,15 +159,28 @@ class DatabasePlugin(object):
             self._run(select_table)
         elif self._state.mode == Mode.TABLE_INFO:
             self._run(show_table_data, self._state.selected_table)
+        elif self._state.mode == Mode.TREE:
+            self._run(toggle_tree_node)
+        elif self._state.mode == Mode.JOBS:
+            self._run(open_job)
+        elif self._state.mode == Mode.PROFILE:
+            self._run(show_profiled_table)
+        elif self._state.mode == Mode.FACETS:
+            self._run(select_facet)
 
     @function('VimDatabase_delete')
-    def delete_function(self, _: Sequence[Any]) -> None:
-        if self._state.mode == Mode.CONNECTION and self._state.connections:
+    def delete_function(self, args: Sequence[Any]) -> None:
+        if args and args[0]:
+            if self._state.mode == Mode.QUERY and not self._state.user_query:
+                self._run(delete_rows)
+        elif self._state.mode == Mode.CONNECTION and self._state.connections:
             self._run(delete_connection)
         elif self._state.mode == Mode.TABLE and self._state.tables:
             self._run(delete_table)
         elif self._state.mode == Mode.QUERY and not self._state.user_query:
             self._run(delete_row)
+        elif self._state.mode == Mode.JOBS:
+            self._run(delete_job)
 
     @function('VimDatabase_new')
     def new_function(self, _: Sequence[Any]) -> None:
@@ -130,8 +188,12 @@ class DatabasePlugin(object):
             self._run(new_connection)
 
     @function('VimDatabase_copy')
-    def copy_function(self, _: Sequence[Any]) -> None:
-        self._run(copy_row)
+    def copy_function(self, args: Sequence[Any]) -> None:
+        if args and args[0]:
+            if self._state.mode == Mode.QUERY and not self._state.user_query:
+                self._run(copy_rows)
+        else:
+            self._run(copy_row)
 
     @function('VimDatabase_edit')
     def edit_function(self, _: Sequence[Any]) -> None:
@@ -140,6 +202,25 @@ class DatabasePlugin(object):
         elif self._state.mode == Mode.QUERY and not self._state.user_query:
             self._run(edit_row)
 
+    @function('VimDatabase_commit')
+    def commit_function(self, _: Sequence[Any]) -> None:
+        if self._state.mode == Mode.QUERY and not self._state.user_query:
+            self._run(commit_changes)
+
+    @function('VimDatabase_discard')
+    def discard_function(self, _: Sequence[Any]) -> None:
+        if self._state.mode == Mode.QUERY and not self._state.user_query:
+            self._run(discard_changes)
+
+    @function('VimDatabase_edit_table')
+    def edit_table_function(self, _: Sequence[Any]) -> None:
+        if self._state.mode == Mode.QUERY and not self._state.user_query:
+            self._run(edit_table)
+
+    @function('VimDatabase_write_table')
+    def write_table_function(self, _: Sequence[Any]) -> None:
+        self._run(write_table)
+
     @function('VimDatabase_show_update_query')
     def show_update_query_function(self, _: Sequence[Any]) -> None:
         self._run(show_update_query)
@@ -158,24 +239,37 @@ class DatabasePlugin(object):
             self._run(describe_current_table)
         elif self._state.mode == Mode.QUERY and not self._state.user_query:
             self._run(describe_table, self._state.selected_table)
+        elif self._state.mode == Mode.TREE:
+            self._run(show_tree_table_data)
 
     @function('VimDatabase_filter')
     def filter_function(self, _: Sequence[Any]) -> None:
         if self._state.mode == Mode.TABLE:
             self._run(table_filter)
-        elif self._state.mode == Mode.QUERY and not self._state.user_query:
+        elif self._state.mode == Mode.QUERY:
             self._run(row_filter)
 
+    @function('VimDatabase_table_filter_changed')
+    def table_filter_changed_function(self, args: Sequence[Any]) -> None:
+        self._run(filter_tables, str(args[0]))
+
+    @function('VimDatabase_table_filter_submit')
+    def table_filter_submit_function(self, args: Sequence[Any]) -> None:
+        self._run(submit_table_filter, str(args[0]))
+
     @function('VimDatabase_clear_filter')
     def clear_filter_function(self, _: Sequence[Any]) -> None:
         self._state.filtered_tables = None
+        self._state.tables_page = 1
+        if self._state.mode == Mode.QUERY:
+            self._run(clear_row_filter)
+            return
+
         self._state.query_conditions = None
+        self._state.rows_limit = None
         log.info("[vim-database] Filter was cleared")
-
         if self._state.mode == Mode.TABLE:
             self._run(show_tables)
-        elif self._state.mode == Mode.QUERY and not self._state.user_query:
-            self._run(show_table_data, self._state.selected_table)
 
     @function('VimDatabase_filter_columns')
     def filter_columns_function(self, _: Sequence[Any]) -> None:
@@ -189,15 +283,47 @@ class DatabasePlugin(object):
     def order_desc_function(self, _: Sequence[Any]) -> None:
         self._run(order, "DESC")
 
+    @function('VimDatabase_sample')
+    def sample_function(self, _: Sequence[Any]) -> None:
+        self._run(toggle_sample)
+
+    @function('VimDatabase_sample_rate')
+    def sample_rate_function(self, _: Sequence[Any]) -> None:
+        self._run(change_sample_rate)
+
+    @function('VimDatabase_profile')
+    def profile_function(self, _: Sequence[Any]) -> None:
+        self._run(profile)
+
+    @function('VimDatabase_facets')
+    def facets_function(self, _: Sequence[Any]) -> None:
+        self._run(show_column_facets)
+
+    @function('VimDatabase_auto_refresh')
+    def auto_refresh_function(self, _: Sequence[Any]) -> None:
+        self._run(toggle_auto_refresh)
+
+    @function('VimDatabase_tail')
+    def tail_function(self, _: Sequence[Any]) -> None:
+        self._run(toggle_tail)
+
     @function('VimDatabase_next')
     def next_function(self, _: Sequence[Any]) -> None:
         if self._state.mode == Mode.QUERY and not self._state.user_query:
             self._run(next_page)
+        elif self._state.mode == Mode.QUERY and self._state.query_result is not None:
+            self._run(change_result_page, 1)
+        elif self._state.mode == Mode.TABLE:
+            self._run(next_tables_page)
 
     @function('VimDatabase_previous')
     def previous_function(self, _: Sequence[Any]) -> None:
         if self._state.mode == Mode.QUERY and not self._state.user_query:
             self._run(previous_page)
+        elif self._state.mode == Mode.QUERY and self._state.query_result is not None:
+            self._run(change_result_page, -1)
+        elif self._state.mode == Mode.TABLE:
+            self._run(previous_tables_page)
 
     @function('VimDatabase_clear_filter_column')
     def clear_filter_column_function(self, _: Sequence[Any]) -> None:
@@ -219,6 +345,14 @@ class DatabasePlugin(object):
             self._run(show_table_data, self._state.selected_table)
         elif self._state.mode == Mode.TABLE_INFO:
             self._run(describe_table, self._state.selected_table)
+        elif self._state.mode == Mode.TREE:
+            self._run(reload_tree_node)
+        elif self._state.mode == Mode.JOBS:
+            self._run(show_jobs)
+        elif self._state.mode == Mode.PROFILE:
+            self._run(refresh_profile)
+        elif self._state.mode == Mode.FACETS:
+            self._run(refresh_facets)
 
     @function('VimDatabase_bigger')
     def bigger_function(self, _: Sequence[Any]) -> None:
@@ -236,10 +370,38 @@ class DatabasePlugin(object):
     def select_table_fzf_table(self, args: Sequence[Any]) -> None:
         self._run(show_table_data, str(args[0]))
 
+    @function('VimDatabase_find_table_changed')
+    def find_table_changed_function(self, args: Sequence[Any]) -> None:
+        self._run(search_tables, str(args[0]))
+
+    @function('VimDatabase_find_table_submit')
+    def find_table_submit_function(self, args: Sequence[Any]) -> None:
+        self._run(submit_found_table, int(args[1]))
+
     @function('VimDatabaseQuery_quit')
     def quit_query_function(self, _: Sequence[Any]) -> None:
         self._run(close_query)
 
     @function('VimDatabaseQuery_run_query')
-    def run_query_function(self, _: Sequence[Any]) -> None:
-        self._run(run_query)
+    def run_query_function(self, args: Sequence[Any]) -> None:
+        self._run(run_query, bool(args and args[0]))
+
+    @function('VimDatabaseQuery_run_script')
+    def run_script_function(self, _: Sequence[Any]) -> None:
+        self._run(run_script)
+
+    @function('VimDatabaseQuery_run_job')
+    def run_job_function(self, args: Sequence[Any]) -> None:
+        self._run(run_query_job, bool(args and args[0]))
+
+    @function('VimDatabaseQuery_explain')
+    def explain_function(self, args: Sequence[Any]) -> None:
+        self._run(explain, bool(args and args[0]), False)
+
+    @function('VimDatabaseQuery_run_local')
+    def run_local_function(self, args: Sequence[Any]) -> None:
+        self._run(run_local_query, bool(args and args[0]))
+
+    @function('VimDatabaseQuery_explain_analyze')
+    def explain_analyze_function(self, args: Sequence[Any]) -> None:
+        self._run(explain, bool(args and args[0]), True)
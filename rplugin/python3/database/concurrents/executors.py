@@ -1,10 +1,43 @@
-from asyncio import get_running_loop
+from asyncio import Lock, Task, ensure_future, get_running_loop
 from functools import partial
-from typing import Any, Callable, TypeVar
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from ..utils.log import log
 
 T = TypeVar("T")
 
+_background_tasks: set = set()
+# Held by every transition, the background tasks take it to change the state or the views between two transitions
+_transition_lock: Optional[Lock] = None
+
 
 async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
     loop = get_running_loop()
     return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+def get_transition_lock() -> Lock:
+    global _transition_lock
+    if _transition_lock is None:
+        _transition_lock = Lock()
+
+    return _transition_lock
+
+
+def run_in_background(coro: Awaitable[None]) -> Task:
+    task = ensure_future(coro)
+    # Keep a strong reference until the task is done, the event loop only keeps weak references
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+
+    return task
+
+
+def _on_background_task_done(task: Task) -> None:
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+
+    exception = task.exception()
+    if exception is not None:
+        log.exception("%s", str(exception), exc_info=exception)
@@ -8,6 +8,7 @@ _DEFAULT_DATABASE_MAPPINGS = {
     "show_connections": ["<Leader>c"],
     "show_databases": ["<Leader>d"],
     "show_tables": ["<Leader>t"],
+    "show_tree": ["<Leader>s"],
     "show_query": ["<Leader>r"],
     "quit": ["q"],
     "delete": ["dd"],
@@ -28,13 +29,40 @@ _DEFAULT_DATABASE_MAPPINGS = {
     "filter_columns": ["a"],
     "clear_filter_column": ["A"],
     "clear_filter": ["F"],
+    "sample": ["gs"],
+    "sample_rate": ["gS"],
+    "profile": ["gp"],
+    "facets": ["gf"],
+    "auto_refresh": ["gr"],
+    "tail": ["T"],
+    "commit": ["gw"],
+    "discard": ["gu"],
+    "edit_table": ["ge"],
     'bigger': ["=", "+"],
     'smaller': ["_", "-"],
 }
 
+_DEFAULT_DATABASE_VISUAL_MAPPINGS = {
+    "delete": ["d"],
+    "copy": ["p"],
+}
+
 _DEFAULT_DATABASE_QUERY_MAPPINGS = {
     "quit": ["q"],
     "run_query": ["r"],
+    "run_script": ["R"],
+    "run_job": ["b"],
+    "explain": ["e"],
+    "explain_analyze": ["E"],
+    "run_local": ["l"],
+}
+
+_DEFAULT_DATABASE_QUERY_VISUAL_MAPPINGS = {
+    "run_query": ["r"],
+    "run_job": ["b"],
+    "explain": ["e"],
+    "explain_analyze": ["E"],
+    "run_local": ["l"],
 }
 
 
@@ -43,26 +71,99 @@ class UserConfig:
     rows_limit: int
     window_layout: str
     window_size: int
+    table_finder: str
+    table_search: str
+    tables_limit: int
+    large_table_rows: int
+    filter_guard: bool
+    sample_rate: float
+    sample_method: str
+    profile_ttl: int
+    facet_timeout: int
+    auto_refresh_interval: int
+    tail_rows: int
+    tail_interval: float
+    tail_batch: int
+    workspace_rows: int
+    # Bytes
+    spill_size: int
+    result_max_size: int
+    # Seconds a cached result stays valid, by connection name
+    result_cache: Dict
+    result_cache_size: int
+    staged_edits: bool
     mappings: Dict
+    visual_mappings: Dict
     query_mappings: Dict
+    query_visual_mappings: Dict
 
 
 async def load_config() -> UserConfig:
     mappings = await async_call(partial(get_global_var, "vim_database_mappings", _DEFAULT_DATABASE_MAPPINGS))
     mappings = {f"VimDatabase_{function}": mappings for function, mappings in mappings.items()}
 
+    visual_mappings = await async_call(
+        partial(get_global_var, "vim_database_visual_mappings", _DEFAULT_DATABASE_VISUAL_MAPPINGS))
+    visual_mappings = {f"VimDatabase_{function}": mappings for function, mappings in visual_mappings.items()}
+
     query_mappings = await async_call(
         partial(get_global_var, "vim_database_query_mappings", _DEFAULT_DATABASE_QUERY_MAPPINGS))
     query_mappings = {
         f"VimDatabaseQuery_{function}": query_mappings for function, query_mappings in query_mappings.items()
     }
 
+    query_visual_mappings = await async_call(
+        partial(get_global_var, "vim_database_query_visual_mappings", _DEFAULT_DATABASE_QUERY_VISUAL_MAPPINGS))
+    query_visual_mappings = {
+        f"VimDatabaseQuery_{function}": mappings for function, mappings in query_visual_mappings.items()
+    }
+
     rows_limit = await async_call(partial(get_global_var, "vim_database_rows_limit", 50))
     window_layout = await async_call(partial(get_global_var, "vim_database_window_layout", "left"))
     window_size = await async_call(partial(get_global_var, "vim_database_window_size", 100))
+    table_finder = await async_call(partial(get_global_var, "vim_database_table_finder", "builtin"))
+    table_search = await async_call(partial(get_global_var, "vim_database_table_search", "local"))
+    tables_limit = await async_call(partial(get_global_var, "vim_database_tables_limit", 500))
+    large_table_rows = await async_call(partial(get_global_var, "vim_database_large_table_rows", 100000))
+    filter_guard = await async_call(partial(get_global_var, "vim_database_filter_guard", 0))
+    sample_rate = await async_call(partial(get_global_var, "vim_database_sample_rate", 1))
+    sample_method = await async_call(partial(get_global_var, "vim_database_sample_method", "system"))
+    profile_ttl = await async_call(partial(get_global_var, "vim_database_profile_ttl", 600))
+    facet_timeout = await async_call(partial(get_global_var, "vim_database_facet_timeout", 10))
+    auto_refresh_interval = await async_call(partial(get_global_var, "vim_database_auto_refresh_interval", 5))
+    tail_rows = await async_call(partial(get_global_var, "vim_database_tail_rows", 500))
+    tail_interval = await async_call(partial(get_global_var, "vim_database_tail_interval", 1))
+    tail_batch = await async_call(partial(get_global_var, "vim_database_tail_batch", 1000))
+    workspace_rows = await async_call(partial(get_global_var, "vim_database_workspace_rows", 10000))
+    spill_size = await async_call(partial(get_global_var, "vim_database_spill_size", 8))
+    result_max_size = await async_call(partial(get_global_var, "vim_database_result_max_size", 1024))
+    result_cache = await async_call(partial(get_global_var, "vim_database_result_cache", {}))
+    result_cache_size = await async_call(partial(get_global_var, "vim_database_result_cache_size", 256))
+    staged_edits = await async_call(partial(get_global_var, "vim_database_staged_edits", 0))
 
     return UserConfig(rows_limit=rows_limit,
                       window_layout=window_layout,
                       window_size=window_size,
+                      table_finder=table_finder,
+                      table_search=table_search,
+                      tables_limit=tables_limit,
+                      large_table_rows=large_table_rows,
+                      filter_guard=bool(filter_guard),
+                      sample_rate=float(sample_rate),
+                      sample_method=sample_method,
+                      profile_ttl=profile_ttl,
+                      facet_timeout=facet_timeout,
+                      auto_refresh_interval=auto_refresh_interval,
+                      tail_rows=tail_rows,
+                      tail_interval=float(tail_interval),
+                      tail_batch=tail_batch,
+                      workspace_rows=workspace_rows,
+                      spill_size=spill_size * 1024 * 1024,
+                      result_max_size=result_max_size * 1024 * 1024,
+                      result_cache=result_cache,
+                      result_cache_size=result_cache_size * 1024 * 1024,
+                      staged_edits=bool(staged_edits),
                       mappings=mappings,
-                      query_mappings=query_mappings)
+                      visual_mappings=visual_mappings,
+                      query_mappings=query_mappings,
+                      query_visual_mappings=query_visual_mappings)
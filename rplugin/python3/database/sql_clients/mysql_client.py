@@ -1,9 +1,38 @@
-from typing import Optional, Tuple
-
-from .sql_client import SqlClient, CommandResult
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+from .query_session import SESSION_MARKER, QuerySession
+from .sql_client import (
+    ExportFormat,
+    ImportResult,
+    SqlClient,
+    CommandResult,
+    PlanNode,
+    StatementResult,
+    TableSample,
+    SCRIPT_MARKER,
+    get_column_declaration,
+    get_script_sections,
+    like_pattern,
+    quote,
+)
 from ..storages.connection import Connection
 from ..utils.log import log
 
+_BATCH_ESCAPE_PATTERN = re.compile(r"\\(.)")
+_BATCH_ESCAPES = {"0": "\0", "t": "\t", "n": "\n", "\\": "\\"}
+# A node of the TREE format, eg: "    -> Table scan on t  (cost=1.45 rows=3) (actual time=0.04..0.05 rows=3 loops=1)"
+_PLAN_NODE_PATTERN = re.compile(r"^( *)-> (.*?)(?:  \(cost=([\d.e+]+) rows=([\d.e+]+)\))?"
+                                r"(?: \(actual time=[\d.]+\.\.([\d.]+) rows=([\d.e+]+) loops=(\d+)\))?"
+                                r"(?: \(never executed\))?$")
+_FULL_SCAN_PATTERN = re.compile(r"^Table scan on (\S+)")
+_READ_QUERY_PATTERN = re.compile(r"^\s*(select|with|table)\b", re.IGNORECASE)
+
 
 class MySqlClient(SqlClient):
 
@@ -11,7 +40,13 @@ class MySqlClient(SqlClient):
         SqlClient.__init__(self, connection)
 
     def _run_query(self, query: str, options: list = []) -> CommandResult:
-        return self.run_command([
+        return self.run_command(self._get_command() + ["-e", query] + options)
+
+    def _run_script(self, script: str, options: list = []) -> CommandResult:
+        return self.run_command(self._get_command() + options, input=script)
+
+    def _get_command(self) -> list:
+        return [
             "mysql",
             "--unbuffered",
             "--batch",
@@ -20,20 +55,31 @@ class MySqlClient(SqlClient):
             "--port=" + self.connection.port,
             "--user=" + self.connection.username,
             "--password=" + self.connection.password,
-            "-e",
-            query,
-        ] + options)
+        ]
 
-    def get_databases(self) -> list:
+    def get_databases(self) -> Optional[list]:
         result = self._run_query("SHOW DATABASES", ["--skip-column-names"])
         if result.error:
             log.info("[vim-database] " + result.data)
-            return list()
+            return None
         return result.data.splitlines()
 
-    def get_tables(self, database: str) -> list:
+    def get_tables(self, database: str) -> Optional[list]:
         result = self._run_query("SHOW TABLES FROM " + database, ["--skip-column-names"])
 
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+        return result.data.splitlines()
+
+    def search_tables(self, database: str, pattern: Optional[str], limit: int, offset: int) -> list:
+        search_tables_query = \
+            "SELECT TABLE_NAME " \
+            "FROM information_schema.TABLES " \
+            "WHERE TABLE_SCHEMA = '" + database + "' " \
+            "AND TABLE_NAME LIKE '" + like_pattern(pattern).replace("\\", "\\\\") + "' " \
+            "ORDER BY TABLE_NAME LIMIT " + str(limit) + " OFFSET " + str(offset)
+        result = self._run_query(search_tables_query, ["--skip-column-names"])
         if result.error:
             log.info("[vim-database] " + result.data)
             return list()
@@ -57,6 +103,90 @@ class MySqlClient(SqlClient):
 
         return list(map(lambda line: line.split("\t"), lines))
 
+    def get_schemas(self, database: str) -> list:
+        # A MySQL database is a schema
+        return list()
+
+    def get_columns(self, database: str, table: str) -> Optional[list]:
+        # The value of an AUTO_INCREMENT column is generated like a default
+        get_columns_query = \
+            "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, " \
+            "IF(EXTRA LIKE '%auto_increment%', 'AUTO_INCREMENT', COLUMN_DEFAULT) " \
+            "FROM information_schema.COLUMNS " \
+            "WHERE TABLE_SCHEMA = '" + database + "' AND TABLE_NAME = '" + table + "' " \
+            "ORDER BY ORDINAL_POSITION"
+        result = self._run_query(get_columns_query, ["--skip-column-names"])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return list(map(lambda line: line.split("\t"), result.data.splitlines()))
+
+    def get_column_declarations(self, database: str, table: str) -> Optional[dict]:
+        # The text columns of a case-insensitive collation compare without the case
+        get_collations_query = \
+            "SELECT COLUMN_NAME, COLUMN_TYPE, COLLATION_NAME " \
+            "FROM information_schema.COLUMNS " \
+            "WHERE TABLE_SCHEMA = '" + database + "' AND TABLE_NAME = '" + table + "'"
+        result = self._run_query(get_collations_query, ["--skip-column-names"])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        declarations = dict()
+        for name, data_type, collation in map(lambda line: line.split("\t"), result.data.splitlines()):
+            declaration = get_column_declaration(data_type)
+            case_insensitive = declaration == "TEXT" and collation.endswith("_ci")
+            declarations[name] = declaration + " COLLATE NOCASE" if case_insensitive else declaration
+        return declarations
+
+    def is_like_case_sensitive(self, declarations: dict) -> Optional[bool]:
+        # LIKE follows the collation of the column
+        text_declarations = {
+            declaration for declaration in declarations.values()
+            if declaration is not None and declaration.startswith("TEXT")
+        }
+        return None if len(text_declarations) > 1 else "TEXT" in text_declarations
+
+    def get_indexes(self, database: str, table: str) -> Optional[list]:
+        # The size and the usage need access to the mysql and performance_schema databases, they are left empty
+        # without it
+        result = None
+        for size, usage in (("(SELECT st.stat_value * @@innodb_page_size FROM mysql.innodb_index_stats st "
+                             "WHERE st.database_name = s.TABLE_SCHEMA AND st.table_name = s.TABLE_NAME "
+                             "AND st.index_name = s.INDEX_NAME AND st.stat_name = 'size')",
+                             "(SELECT u.COUNT_READ FROM performance_schema.table_io_waits_summary_by_index_usage u "
+                             "WHERE u.OBJECT_SCHEMA = s.TABLE_SCHEMA AND u.OBJECT_NAME = s.TABLE_NAME "
+                             "AND u.INDEX_NAME = s.INDEX_NAME)"), ("''", "''")):
+            get_indexes_query = \
+                "SELECT s.INDEX_NAME, GROUP_CONCAT(s.COLUMN_NAME ORDER BY s.SEQ_IN_INDEX SEPARATOR ', '), " \
+                "IF(s.NON_UNIQUE = 0, 'YES', 'NO'), " + size + ", " + usage + " " \
+                "FROM information_schema.STATISTICS s " \
+                "WHERE s.TABLE_SCHEMA = '" + database + "' AND s.TABLE_NAME = '" + table + "' " \
+                "GROUP BY s.TABLE_SCHEMA, s.TABLE_NAME, s.INDEX_NAME, s.NON_UNIQUE ORDER BY s.INDEX_NAME"
+            result = self._run_query(get_indexes_query, ["--skip-column-names"])
+            if not result.error:
+                break
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return [[value if value != "NULL" else "" for value in line.split("\t")] for line in result.data.splitlines()]
+
+    def get_foreign_keys(self, database: str, table: str) -> Optional[list]:
+        get_foreign_keys_query = \
+            "SELECT CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME " \
+            "FROM information_schema.KEY_COLUMN_USAGE " \
+            "WHERE TABLE_SCHEMA = '" + database + "' AND TABLE_NAME = '" + table + "' " \
+            "AND REFERENCED_TABLE_NAME IS NOT NULL " \
+            "ORDER BY CONSTRAINT_NAME, ORDINAL_POSITION"
+        result = self._run_query(get_foreign_keys_query, ["--skip-column-names"])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return list(map(lambda line: line.split("\t"), result.data.splitlines()))
+
     def run_query(self, database: str, query: str) -> Optional[list]:
         result = self._run_query(query, ["--database=" + database])
         if result.error:
@@ -80,51 +210,209 @@ class MySqlClient(SqlClient):
 
         return True
 
-    def copy(self, database: str, table: str, unique_columns: list, new_unique_column_values: list) -> bool:
-        num_unique_columns = len(unique_columns)
-        if num_unique_columns != len(new_unique_column_values):
-            log.info("[vim-database] The lenght of unique columns must be equal to new unique column values")
+    def delete(self, database: str, table: str, condition: Tuple[str, str]) -> bool:
+        condition_column, condition_value = condition
+        delete_query = "DELETE FROM " + table + " WHERE " + condition_column + " = " + condition_value
+
+        result = self._run_query(delete_query, ["--database=" + database])
+        if result.error:
+            log.info("[vim-database] " + result.data)
             return False
 
-        assign_query = ""
-        condition_query = ""
-        for index in range(num_unique_columns):
-            unique_column, unique_column_value = unique_columns[index]
-            new_unique_column_value = new_unique_column_values[index]
-            if index != 0:
-                assign_query += ", "
-                condition_query += " AND "
-            assign_query += unique_column + " = " + (new_unique_column_value if new_unique_column_value == 'NULL' else
-                                                     ("\'" + new_unique_column_value + "\'"))
-            if unique_column_value == 'NULL':
-                condition_query += unique_column + " is NULL"
-            else:
-                condition_query += unique_column + " = + \'" + unique_column_value + "\'"
+        return True
 
-        create_temporary_query = \
-            "CREATE TEMPORARY TABLE tmptable_1 SELECT * FROM " + table + " WHERE " + condition_query + ";"
-        update_primary_key_temporary_query = "UPDATE tmptable_1 SET " + assign_query + ";"
-        insert_query = "INSERT INTO " + table + " SELECT * FROM tmptable_1;"
-        delete_temporary_query = "DROP TEMPORARY TABLE IF EXISTS tmptable_1;"
-        copy_query = create_temporary_query + update_primary_key_temporary_query + insert_query + delete_temporary_query
+    def run_transaction(self, database: str, statements: list) -> Optional[int]:
+        script = "START TRANSACTION;\nSET @vim_database_rows = 0;\n"
+        for statement in statements:
+            script += statement + ";\n"
+            script += "SET @vim_database_rows = @vim_database_rows + GREATEST(ROW_COUNT(), 0);\n"
+        script += "SELECT @vim_database_rows;\nCOMMIT;\n"
 
-        result = self._run_query(copy_query, ["--database=" + database])
+        # mysql stops on the first error in batch mode, the open transaction is rolled back on disconnect
+        result = self._run_script(script, ["--skip-column-names", "--database=" + database])
         if result.error:
             log.info("[vim-database] " + result.data)
-            return False
+            return None
 
-        return True
+        return int(result.data.splitlines()[-1])
+
+    def run_script(self, database: str, statements: list) -> Tuple[list, Optional[str]]:
+        # The marker row carries the row count of the previous statement and the server time, a last marker closes the
+        # last statement
+        script = ""
+        for index in range(len(statements) + 1):
+            script += "SELECT '" + SCRIPT_MARKER + "', ROW_COUNT(), UNIX_TIMESTAMP(SYSDATE(6));\n"
+            if index < len(statements):
+                script += statements[index] + "\n;\n"
+        output, error = self.run_session(self._get_command() + ["--skip-column-names", "--database=" + database],
+                                         script)
+
+        markers = [line.split("\t") for line in output.splitlines() if line.startswith(SCRIPT_MARKER)]
+        results = []
+        for index, lines in enumerate(get_script_sections(output)[:len(markers) - 1]):
+            _, _, start_time = markers[index]
+            _, affected_rows, end_time = markers[index + 1]
+            results.append(
+                StatementResult(rows=len(lines),
+                                affected_rows=None if int(affected_rows) < 0 else int(affected_rows),
+                                elapsed_time=float(end_time) - float(start_time)))
+
+        return results, error
+
+    def explain(self, database: str, query: str, analyze: bool) -> Optional[PlanNode]:
+        if analyze and not _READ_QUERY_PATTERN.match(query):
+            log.info("[vim-database] MySQL can only analyze a SELECT query")
+            return None
 
-    def delete(self, database: str, table: str, condition: Tuple[str, str]) -> bool:
-        condition_column, condition_value = condition
-        delete_query = "DELETE FROM " + table + " WHERE " + condition_column + " = " + condition_value
+        # EXPLAIN ANALYZE prints the TREE format, the estimated plan uses the same format so both are parsed alike
+        result = self._run_query(("EXPLAIN ANALYZE " if analyze else "EXPLAIN FORMAT=TREE ") + query,
+                                 ["--skip-column-names", "--raw", "--database=" + database])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        root = PlanNode(operation="QUERY PLAN")
+        # Parent nodes by indentation
+        parents = [(-1, root)]
+        for line in result.data.splitlines():
+            match = _PLAN_NODE_PATTERN.match(line)
+            if match is None:
+                continue
+
+            indent, operation, cost, estimated_rows, actual_time, actual_rows, loops = match.groups()
+            full_scan = _FULL_SCAN_PATTERN.match(operation)
+            node = PlanNode(operation=operation,
+                            relation=None if full_scan is None else full_scan.group(1),
+                            cost=None if cost is None else float(cost),
+                            estimated_rows=None if estimated_rows is None else float(estimated_rows),
+                            actual_rows=None if actual_rows is None else float(actual_rows),
+                            actual_time=None if actual_time is None else float(actual_time),
+                            loops=None if loops is None else int(loops),
+                            full_scan=full_scan is not None)
+            if full_scan is not None and node.estimated_rows is not None:
+                # The estimated rows of a table scan are the rows of the table
+                node.table_rows = int(node.estimated_rows)
+
+            while parents[-1][0] >= len(indent):
+                parents.pop()
+            parents[-1][1].children.append(node)
+            parents.append((len(indent), node))
+
+        return root
+
+    def run_query_with_timeout(self, database: str, query: str, timeout: int) -> Optional[list]:
+        # The SET statement prints nothing in batch mode, MAX_EXECUTION_TIME only applies to SELECT statements
+        return self.run_query(database, "SET SESSION MAX_EXECUTION_TIME = " + str(timeout * 1000) + "; " + query)
+
+    def get_change_token(self, database: str, table: Optional[str] = None) -> Optional[str]:
+        query = "SELECT COUNT(*), MAX(UPDATE_TIME), MAX(CREATE_TIME) FROM information_schema.TABLES " \
+                "WHERE TABLE_SCHEMA = '" + database + "'"
+        if table is not None:
+            query += " AND TABLE_NAME = '" + table + "'"
+        # MySQL 8 caches the table statistics of information_schema for a day, older versions have no such cache
+        for prefix in ("SET SESSION information_schema_stats_expiry = 0; ", ""):
+            result = self._run_query(prefix + query, ["--skip-column-names"])
+            if not result.error:
+                return result.data.strip()
+
+        return None
+
+    def get_replication_lag(self) -> Optional[float]:
+        # SHOW REPLICA STATUS replaces SHOW SLAVE STATUS since MySQL 8.0.22
+        for query in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+            result = self._run_query(query)
+            if result.error:
+                continue
+
+            lines = result.data.splitlines()
+            if len(lines) < 2:
+                # Not a replica
+                return 0
+            status = dict(zip(lines[0].split("\t"), lines[1].split("\t")))
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            return float(lag) if lag is not None and lag.isdigit() else None
+
+        return None
+
+    def get_sample_source(self, table: str, sample: TableSample) -> Optional[str]:
+        # The whole table is thinned by a seeded hash of the primary key, which keeps the same rows whatever the order
+        # of the scan. A table without one is thinned by a seeded RAND()
+        seed = str(sample.seed)
+        if sample.primary_key is None:
+            condition = "RAND(" + seed + ") < " + "{:g}".format(sample.rate / 100)
+        else:
+            condition = "CRC32(CONCAT(" + sample.primary_key + ", '-" + seed + "')) % 1000000 < " + \
+                        "{:g}".format(sample.rate * 10000)
+        return "(SELECT * FROM " + table + " WHERE " + condition + ") AS " + table
+
+    def open_session(self, database: str) -> Optional[QuerySession]:
+        # The batch mode stops on the first error, the marker is printed as a column name and a value
+        return QuerySession(self._get_command() + ["--database=" + database], None,
+                            "SELECT '" + SESSION_MARKER + "';", 2)
+
+    def get_export_command(self, database: str, query: str, export_format: ExportFormat) -> Tuple[list, Optional[dict]]:
+        # SELECT ... INTO OUTFILE writes on the server host, the batch output is streamed row by row instead
+        return self._get_command() + ["--quick", "--database=" + database, "-e", query], None
+
+    def get_export_records(self, lines: Iterator[str], export_format: ExportFormat,
+                           null_value: str = "") -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        headers = None
+        for line in lines:
+            values = [
+                None if value == "NULL" else _BATCH_ESCAPE_PATTERN.sub(
+                    lambda match: _BATCH_ESCAPES.get(match.group(1), match.group(1)), value)
+                for value in line.rstrip("\n").split("\t")
+            ]
+            if headers is None:
+                headers = values
+                if export_format is ExportFormat.JSONL:
+                    continue
+
+            if export_format is ExportFormat.JSONL:
+                yield json.dumps(dict(zip(headers, values)), ensure_ascii=False) + "\n"
+            else:
+                writer.writerow([null_value if value is None else value for value in values])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    def import_rows(self, database: str, table: str, columns: list,
+                    rows: Iterator[list]) -> Optional[ImportResult]:
+        file_descriptor, path = tempfile.mkstemp(prefix="vim-database-", suffix=".csv")
+        try:
+            num_rows = 0
+            with os.fdopen(file_descriptor, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file, lineterminator="\n")
+                for row in rows:
+                    writer.writerow(["" if value is None else value for value in row])
+                    num_rows += 1
+
+            # The values go through user variables so that empty values are loaded as NULL
+            variables = ["@column_" + str(index) for index in range(len(columns))]
+            assignments = [column + " = NULLIF(" + variable + ", '')" for column, variable in zip(columns, variables)]
+            load_query = "LOAD DATA LOCAL INFILE " + quote(path) + " INTO TABLE " + table + " CHARACTER SET utf8mb4 " \
+                         "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' " \
+                         "LINES TERMINATED BY '\\n' (" + ", ".join(variables) + ") SET " + ", ".join(assignments)
+            # LOCAL turns the errors into warnings, the rows the server skips are only found in the affected rows
+            result = self._run_query(load_query + "; SELECT ROW_COUNT(); SHOW WARNINGS",
+                                     ["--local-infile=1", "--skip-column-names", "--database=" + database])
+        finally:
+            os.remove(path)
 
-        result = self._run_query(delete_query, ["--database=" + database])
         if result.error:
             log.info("[vim-database] " + result.data)
-            return False
+            return None
 
-        return True
+        lines = result.data.splitlines()
+        loaded_rows = int(lines[0])
+        if loaded_rows == num_rows:
+            return ImportResult(rows=loaded_rows)
+
+        # The code and message of each warning, its level is dropped
+        messages = [": ".join(line.split("\t", 2)[1:]) for line in lines[1:]]
+        return ImportResult(rows=loaded_rows, messages=messages)
 
     def get_primary_key(self, database: str, table: str) -> Optional[str]:
         get_primary_key_query = \
@@ -1,10 +1,46 @@
+import csv
+import json
 import os
-from typing import Optional, Tuple
-
-from .sql_client import SqlClient, CommandResult
+import re
+import subprocess
+from typing import Iterator, Optional, Tuple
+
+from .query_session import SESSION_MARKER, QuerySession
+from .sql_client import (
+    ExportFormat,
+    ImportResult,
+    SqlClient,
+    CommandResult,
+    PlanNode,
+    StatementResult,
+    TableSample,
+    SCRIPT_MARKER,
+    get_script_sections,
+    like_pattern,
+    quote,
+)
 from ..storages.connection import Connection
 from ..utils.log import log
 
+_COMMAND_TAG_PATTERN = re.compile(r"^(?:INSERT \d+|UPDATE|DELETE|MERGE) (\d+)$")
+_FOOTER_PATTERN = re.compile(r"^\((\d+) rows?\)$")
+_TIMING_PATTERN = re.compile(r"^Time: ([\d.]+) ms")
+_PLAN_DETAILS = (
+    "Index Cond",
+    "Recheck Cond",
+    "Hash Cond",
+    "Merge Cond",
+    "Join Filter",
+    "Filter",
+    "Rows Removed by Filter",
+    "Sort Key",
+    "Sort Method",
+    "Group Key",
+    "Shared Hit Blocks",
+    "Shared Read Blocks",
+    "Temp Written Blocks",
+)
+
 
 class PostgreSqlClient(SqlClient):
 
@@ -12,29 +48,52 @@ class PostgreSqlClient(SqlClient):
         SqlClient.__init__(self, connection)
 
     def _run_query(self, query: str, options: list = []) -> CommandResult:
-        return self.run_command([
+        return self.run_command(self._get_command() + ["-c", query] + options, self._get_environment())
+
+    def _run_script(self, script: str, options: list = []) -> CommandResult:
+        return self.run_command(self._get_command() + ["--file=-"] + options, self._get_environment(), script)
+
+    def _get_command(self) -> list:
+        return [
             "psql",
             "--host=" + self.connection.host,
             "--port=" + self.connection.port,
             "--username=" + self.connection.username,
             "--pset=footer",
-            "-c",
-            query,
-        ] + options, dict(os.environ, PGPASSWORD=self.connection.password, PGCONNECT_TIMEOUT="10"))
+        ]
+
+    def _get_environment(self) -> dict:
+        return dict(os.environ, PGPASSWORD=self.connection.password, PGCONNECT_TIMEOUT="10")
 
-    def get_databases(self) -> list:
+    def get_databases(self) -> Optional[list]:
         result = self._run_query("SELECT datname FROM pg_database WHERE datistemplate = false", ["--tuples-only"])
         if result.error:
             log.info("[vim-database] " + ". ".join(result.data.splitlines()))
-            return list()
+            return None
 
         return list(map(lambda database: database.strip(), result.data.splitlines()))
 
-    def get_tables(self, database: str) -> list:
+    def get_tables(self, database: str) -> Optional[list]:
         result = self._run_query(
-            "SELECT tablename "
+            "SELECT schemaname || \'.\' || tablename "
             "FROM pg_catalog.pg_tables "
-            "WHERE schemaname != \'pg_catalog\' AND schemaname != \'information_schema\'",
+            "WHERE schemaname != \'pg_catalog\' AND schemaname != \'information_schema\' "
+            "ORDER BY schemaname, tablename",
+            ["--tuples-only", "--dbname=" + database])
+
+        if result.error:
+            log.info("[vim-database] " + ". ".join(result.data.splitlines()))
+            return None
+
+        return list(map(lambda table: table.strip(), result.data.splitlines()))
+
+    def search_tables(self, database: str, pattern: Optional[str], limit: int, offset: int) -> list:
+        result = self._run_query(
+            "SELECT schemaname || \'.\' || tablename "
+            "FROM pg_catalog.pg_tables "
+            "WHERE schemaname != \'pg_catalog\' AND schemaname != \'information_schema\' "
+            "AND schemaname || \'.\' || tablename ILIKE \'" + like_pattern(pattern) + "\' "
+            "ORDER BY schemaname, tablename LIMIT " + str(limit) + " OFFSET " + str(offset),
             ["--tuples-only", "--dbname=" + database])
 
         if result.error:
@@ -52,7 +111,8 @@ class PostgreSqlClient(SqlClient):
         result = self._run_query(
             "SELECT column_name, column_default, is_nullable, data_type "
             "FROM information_schema.columns "
-            "WHERE table_name = \'" + table + "\'", ["--tuples-only", "--dbname=" + database])
+            "WHERE " + _table_condition(table, "table_schema", "table_name") + " "
+            "ORDER BY ordinal_position", ["--tuples-only", "--dbname=" + database])
 
         if result.error:
             log.info("[vim-database] " + ". ".join(result.data.splitlines()))
@@ -68,8 +128,64 @@ class PostgreSqlClient(SqlClient):
 
         return data
 
+    def get_schemas(self, database: str) -> list:
+        result = self._run_query(
+            "SELECT schema_name "
+            "FROM information_schema.schemata "
+            "WHERE schema_name != \'pg_catalog\' AND schema_name != \'information_schema\' "
+            "AND schema_name NOT LIKE \'pg_toast%\' AND schema_name NOT LIKE \'pg_temp%\' "
+            "ORDER BY schema_name", ["--tuples-only", "--dbname=" + database])
+
+        if result.error:
+            log.info("[vim-database] " + ". ".join(result.data.splitlines()))
+            return list()
+
+        return list(map(lambda schema: schema.strip(), result.data.splitlines()))
+
+    def get_columns(self, database: str, table: str) -> Optional[list]:
+        return self._run_catalog_query(
+            # The value of an identity column is generated like a default, a serial column defaults to nextval()
+            database, "SELECT column_name, data_type, is_nullable, "
+            "CASE WHEN is_identity = 'YES' THEN 'GENERATED AS IDENTITY' ELSE column_default END "
+            "FROM information_schema.columns "
+            "WHERE " + _table_condition(table, "table_schema", "table_name") + " "
+            "ORDER BY ordinal_position")
+
+    def get_indexes(self, database: str, table: str) -> Optional[list]:
+        return self._run_catalog_query(
+            database, "SELECT ic.relname, "
+            "string_agg(a.attname, \', \' ORDER BY array_position(i.indkey::int2[], a.attnum)), "
+            "CASE WHEN i.indisunique THEN \'YES\' ELSE \'NO\' END, "
+            "pg_relation_size(i.indexrelid), COALESCE(s.idx_scan, 0) "
+            "FROM pg_index i "
+            "JOIN pg_class ic ON ic.oid = i.indexrelid "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "LEFT JOIN pg_stat_all_indexes s ON s.indexrelid = i.indexrelid "
+            "WHERE i.indrelid = \'" + table + "\'::regclass "
+            "GROUP BY ic.relname, i.indisunique, i.indexrelid, s.idx_scan ORDER BY ic.relname")
+
+    def get_foreign_keys(self, database: str, table: str) -> Optional[list]:
+        return self._run_catalog_query(
+            database, "SELECT c.conname, a.attname, c.confrelid::regclass, af.attname "
+            "FROM pg_constraint c "
+            "CROSS JOIN LATERAL unnest(c.conkey, c.confkey) AS k(attnum, fattnum) "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum "
+            "JOIN pg_attribute af ON af.attrelid = c.confrelid AND af.attnum = k.fattnum "
+            "WHERE c.contype = \'f\' AND c.conrelid = \'" + table + "\'::regclass "
+            "ORDER BY c.conname")
+
+    def _run_catalog_query(self, database: str, query: str) -> Optional[list]:
+        result = self._run_query(query, ["--tuples-only", "--dbname=" + database])
+        if result.error:
+            log.info("[vim-database] " + ". ".join(result.data.splitlines()))
+            return None
+
+        return list(map(lambda line: [column.strip() for column in line.split("|")], result.data.splitlines()))
+
     def run_query(self, database: str, query: str) -> Optional[list]:
-        result = self._run_query(query, ["--dbname=" + database])
+        return self._get_query_rows(self._run_query(query, ["--dbname=" + database]))
+
+    def _get_query_rows(self, result: CommandResult) -> Optional[list]:
         if result.error:
             log.info("[vim-database] " + ". ".join(result.data.splitlines()))
             return None
@@ -96,10 +212,6 @@ class PostgreSqlClient(SqlClient):
 
         return True
 
-    def copy(self, database: str, table: str, unique_columns: list, new_unique_column_values: list) -> bool:
-        log.info("[vim-database] Not supported for psql")
-        return False
-
     def delete(self, database: str, table: str, condition: Tuple[str, str]) -> bool:
         condition_column, condition_value = condition
         delete_query = "DELETE FROM " + table + " WHERE " + condition_column + " = " + condition_value
@@ -111,6 +223,179 @@ class PostgreSqlClient(SqlClient):
 
         return True
 
+    def run_transaction(self, database: str, statements: list) -> Optional[int]:
+        script = "".join(statement + ";\n" for statement in statements)
+        result = self._run_script(
+            script, ["--single-transaction", "--set=ON_ERROR_STOP=1", "--tuples-only", "--dbname=" + database])
+        if result.error:
+            log.info("[vim-database] " + ". ".join(result.data.splitlines()))
+            return None
+
+        # Every statement prints its command tag, eg: "DELETE 3" or "INSERT 0 3"
+        affected_rows = 0
+        for line in result.data.splitlines():
+            command_tag = _COMMAND_TAG_PATTERN.match(line)
+            if command_tag is not None:
+                affected_rows += int(command_tag.group(1))
+
+        return affected_rows
+
+    def run_script(self, database: str, statements: list) -> Tuple[list, Optional[str]]:
+        # The result footer gives the row count, the command tag the affected rows and \timing the run time
+        script = "\\timing on\n"
+        for index, statement in enumerate(statements):
+            script += "\\echo " + SCRIPT_MARKER + " " + str(index) + "\n" + statement + "\n;\n"
+        output, error = self.run_session(
+            self._get_command() +
+            ["--no-align", "--pset=footer=on", "--set=ON_ERROR_STOP=1", "--file=-", "--dbname=" + database], script,
+            self._get_environment())
+
+        sections = get_script_sections(output)
+        if error is not None:
+            # psql stops after the failing statement, its output is the last section
+            sections = sections[:-1]
+
+        results = []
+        for lines in sections:
+            rows = 0
+            affected_rows = None
+            elapsed_time = None
+            for line in lines:
+                footer = _FOOTER_PATTERN.match(line)
+                command_tag = _COMMAND_TAG_PATTERN.match(line)
+                timing = _TIMING_PATTERN.match(line)
+                if footer is not None:
+                    rows = int(footer.group(1))
+                elif command_tag is not None:
+                    affected_rows = int(command_tag.group(1))
+                elif timing is not None:
+                    elapsed_time = float(timing.group(1)) / 1000
+            results.append(StatementResult(rows=rows, affected_rows=affected_rows, elapsed_time=elapsed_time))
+
+        return results, error
+
+    def explain(self, database: str, query: str, analyze: bool) -> Optional[PlanNode]:
+        options = ["--quiet", "--tuples-only", "--no-align", "--set=ON_ERROR_STOP=1", "--dbname=" + database]
+        if analyze:
+            # ANALYZE runs the statement, the transaction is rolled back so an analyzed UPDATE changes nothing
+            result = self._run_script(
+                "BEGIN;\nEXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query + "\n;\nROLLBACK;\n", options)
+        else:
+            result = self._run_query("EXPLAIN (FORMAT JSON) " + query, options)
+        if result.error:
+            log.info("[vim-database] " + ". ".join(result.data.splitlines()))
+            return None
+
+        explain_result = json.loads(result.data)[0]
+        root = _parse_plan(explain_result["Plan"])
+        for key in ("Planning Time", "Execution Time"):
+            if key in explain_result:
+                root.details.append(key + ": " + str(explain_result[key]) + " ms")
+
+        full_scans = root.get_full_scans()
+        if full_scans:
+            # The planner statistics give the size of the scanned tables
+            relations = ", ".join(quote(node.relation) for node in full_scans)
+            table_rows = self._run_catalog_query(
+                database, "SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class "
+                "WHERE oid IN (SELECT to_regclass(name) FROM unnest(ARRAY[" + relations + "]) AS name)")
+            table_rows = dict(table_rows or [])
+            for node in full_scans:
+                if node.relation in table_rows:
+                    node.table_rows = int(table_rows[node.relation])
+
+        return root
+
+    def run_query_with_timeout(self, database: str, query: str, timeout: int) -> Optional[list]:
+        # The timeout is set for the session, a SET in the query string does not apply to the query before PostgreSQL 13
+        environment = dict(self._get_environment(), PGOPTIONS="-c statement_timeout=" + str(timeout * 1000))
+        return self._get_query_rows(
+            self.run_command(self._get_command() + ["-c", query, "--dbname=" + database], environment))
+
+    def get_change_token(self, database: str, table: Optional[str] = None) -> Optional[str]:
+        # The tuple counters of the statistics collector, the number of tables changes with the schema
+        stat_tables = "pg_stat_user_tables" if table is None else \
+            "pg_stat_all_tables WHERE relid = to_regclass(" + quote(table) + ")"
+        result = self._run_query(
+            "SELECT COUNT(*), SUM(n_tup_ins), SUM(n_tup_upd), SUM(n_tup_del), SUM(n_live_tup) FROM " + stat_tables,
+            ["--dbname=" + database, "--tuples-only", "--no-align"])
+        return None if result.error else result.data.strip()
+
+    def get_replication_lag(self) -> Optional[float]:
+        # The last replayed transaction is old when the primary is idle, a replica which replayed all it received is
+        # not late
+        result = self._run_query(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END",
+            ["--dbname=" + self.connection.database, "--tuples-only", "--no-align"])
+        try:
+            return None if result.error else float(result.data.strip())
+        except ValueError:
+            return None
+
+    def get_sample_source(self, table: str, sample: TableSample) -> Optional[str]:
+        # SYSTEM sampling reads random pages instead of the whole table, BERNOULLI reads the whole table
+        return table + " TABLESAMPLE " + ("BERNOULLI" if sample.row_sampling else "SYSTEM") + " (" + \
+            "{:g}".format(sample.rate) + ") REPEATABLE (" + str(sample.seed) + ")"
+
+    def open_session(self, database: str) -> Optional[QuerySession]:
+        return QuerySession(
+            self._get_command() + ["--quiet", "--set=ON_ERROR_STOP=1", "--file=-", "--dbname=" + database],
+            self._get_environment(), "\\echo " + SESSION_MARKER)
+
+    def get_session_query(self, query: str) -> str:
+        return "COPY (" + query.strip().rstrip(";") + ") TO STDOUT WITH (FORMAT csv, HEADER);"
+
+    def get_export_command(self, database: str, query: str, export_format: ExportFormat) -> Tuple[list, Optional[dict]]:
+        query = query.strip().rstrip(";")
+        if export_format is ExportFormat.JSONL:
+            # FETCH_COUNT makes psql read the result through a cursor instead of loading all the rows
+            return self._get_command() + [
+                "--tuples-only",
+                "--no-align",
+                "--set=FETCH_COUNT=10000",
+                "--dbname=" + database,
+                "-c",
+                "SELECT row_to_json(export_query) FROM (" + query + ") export_query",
+            ], self._get_environment()
+
+        return self._get_command() + [
+            "--dbname=" + database,
+            "-c",
+            "COPY (" + query + ") TO STDOUT WITH (FORMAT csv, HEADER)",
+        ], self._get_environment()
+
+    def import_rows(self, database: str, table: str, columns: list,
+                    rows: Iterator[list]) -> Optional[ImportResult]:
+        # COPY is a single statement, the rows are loaded at once or not at all
+        command = self._get_command() + [
+            "--set=ON_ERROR_STOP=1",
+            "--dbname=" + database,
+            "-c",
+            "COPY " + table + " (" + ", ".join(columns) + ") FROM STDIN WITH (FORMAT csv)",
+        ]
+        with subprocess.Popen(command,
+                              stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              text=True,
+                              env=self._get_environment()) as process:
+            try:
+                # An unquoted empty value is NULL in the csv format of COPY
+                csv.writer(process.stdin, lineterminator="\n").writerows(
+                    ["" if value is None else value for value in row] for row in rows)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            output, error = process.communicate()
+
+        if process.returncode != 0:
+            log.info("[vim-database] " + ". ".join(error.splitlines()))
+            return None
+
+        # psql prints the command tag, COPY followed by the number of rows
+        return ImportResult(rows=int(output.split()[-1]))
+
     def get_primary_key(self, database: str, table: str) -> Optional[str]:
         get_primary_key_query = "SELECT a.attname " \
                                 "FROM pg_index i " \
@@ -137,8 +422,9 @@ class PostgreSqlClient(SqlClient):
 
     def get_template_insert_query(self, database: str, table: str) -> Optional[list]:
         result = self._run_query(
-            "SELECT column_name, column_default, is_nullable FROM information_schema.columns WHERE table_name = \'" +
-            table + "\'", ["--tuples-only", "--dbname=" + database])
+            "SELECT column_name, column_default, is_nullable FROM information_schema.columns WHERE " +
+            _table_condition(table, "table_schema", "table_name") + " ORDER BY ordinal_position",
+            ["--tuples-only", "--dbname=" + database])
 
         if result.error:
             log.info("[vim-database] " + ". ".join(result.data.splitlines()))
@@ -178,3 +464,38 @@ class PostgreSqlClient(SqlClient):
         insert_query.append(")")
 
         return insert_query
+
+
+def _table_condition(table: str, schema_column: str, table_column: str) -> str:
+    # Tables are listed with their schema (schema.table) so same name tables in different schemas can be told apart
+    if "." not in table:
+        return table_column + " = \'" + table + "\'"
+
+    schema, table = table.split(".", 1)
+    return schema_column + " = \'" + schema + "\' AND " + table_column + " = \'" + table + "\'"
+
+
+def _parse_plan(plan: dict) -> PlanNode:
+    operation = plan["Node Type"]
+    if "Index Name" in plan:
+        operation += " using " + plan["Index Name"]
+    relation = plan.get("Relation Name")
+    if relation is not None:
+        operation += " on " + relation + (" " + plan["Alias"] if plan.get("Alias", relation) != relation else "")
+
+    details = []
+    for key in _PLAN_DETAILS:
+        value = plan.get(key)
+        if value:
+            details.append(key + ": " + (", ".join(value) if isinstance(value, list) else str(value)))
+
+    return PlanNode(operation=operation,
+                    relation=relation,
+                    details=details,
+                    cost=plan.get("Total Cost"),
+                    estimated_rows=plan.get("Plan Rows"),
+                    actual_rows=plan.get("Actual Rows"),
+                    actual_time=plan.get("Actual Total Time"),
+                    loops=plan.get("Actual Loops"),
+                    full_scan=plan["Node Type"] == "Seq Scan",
+                    children=[_parse_plan(child) for child in plan.get("Plans", [])])
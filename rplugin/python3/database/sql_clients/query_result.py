@@ -0,0 +1,114 @@
+import atexit
+import csv
+import io
+import mmap
+import tempfile
+from array import array
+from itertools import islice
+from typing import IO, Optional
+from weakref import WeakSet
+
+# Spilled results which are still open, their files are closed when Neovim exits
+_open_results = WeakSet()
+# Rows between two offsets of the index of a spilled result, the rows in between are found by parsing forward
+_INDEX_INTERVAL = 256
+
+
+class QueryResult:
+    # CSV records of a query result, kept in memory up to spill_size bytes and spilled to a temporary file past it.
+    # The file is memory-mapped once the result is complete, only the rows which are read get parsed
+
+    def __init__(self, spill_size: int, max_size: int):
+        self.headers: Optional[list] = None
+        self.size = 0
+        # The result was larger than max_size, the remaining rows were not fetched
+        self.truncated = False
+        self._spill_size = spill_size
+        self._max_size = max_size
+        self._records = []
+        self._file: Optional[IO[bytes]] = None
+        self._spilled_rows = 0
+        # Offset of every _INDEX_INTERVAL-th row in the file, a sparse index keeps the memory of a large result small
+        self._offsets = array("Q")
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return self._spilled_rows if self._file is not None else len(self._records)
+
+    def is_spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, record: str) -> bool:
+        if self.headers is None:
+            self.headers = _parse_record(record)
+            return True
+
+        data = record.encode("utf-8")
+        if self.size + len(data) > self._max_size:
+            self.truncated = True
+            return False
+
+        self.size += len(data)
+        if self._file is None and self.size > self._spill_size:
+            self._spill()
+        if self._file is None:
+            self._records.append(record)
+        else:
+            self._write(data)
+        return True
+
+    def complete(self) -> None:
+        if self._file is None or self.size == 0:
+            return
+
+        self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_rows(self, start: int = 0, end: Optional[int] = None) -> list:
+        end = len(self) if end is None else min(end, len(self))
+        if self._file is None:
+            return [_parse_record(record) for record in self._records[start:end]]
+
+        if start >= end:
+            return []
+
+        # The records are parsed from the indexed row before start up to the indexed row after end
+        first_offset = start // _INDEX_INTERVAL
+        last_offset = (end - 1) // _INDEX_INTERVAL + 1
+        data_end = self._offsets[last_offset] if last_offset < len(self._offsets) else self.size
+        data = self._mmap[self._offsets[first_offset]:data_end].decode("utf-8")
+        skipped_rows = first_offset * _INDEX_INTERVAL
+        return list(islice(csv.reader(io.StringIO(data, newline="")), start - skipped_rows, end - skipped_rows))
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        _open_results.discard(self)
+
+    def _spill(self) -> None:
+        # The file is removed by the system when it is closed, or when the process dies
+        self._file = tempfile.TemporaryFile(prefix="vim-database-")
+        for record in self._records:
+            self._write(record.encode("utf-8"))
+        self._records = []
+        _open_results.add(self)
+
+    def _write(self, data: bytes) -> None:
+        if self._spilled_rows % _INDEX_INTERVAL == 0:
+            self._offsets.append(self._file.tell())
+        self._spilled_rows += 1
+        self._file.write(data)
+
+
+def _parse_record(record: str) -> list:
+    return next(csv.reader([record]), [])
+
+
+@atexit.register
+def _close_results() -> None:
+    for result in list(_open_results):
+        result.close()
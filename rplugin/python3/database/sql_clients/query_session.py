@@ -0,0 +1,113 @@
+import subprocess
+from collections import deque
+from queue import Empty, Queue
+from threading import Thread
+from time import monotonic
+from typing import IO, Optional
+
+from ..utils.log import log
+
+# Printed after every query to find the end of its output
+SESSION_MARKER = "__vim_database_session__"
+
+
+class QuerySession:
+    # A client process kept open between the queries, so polling does not start a process every time. The clients stop
+    # on the first error, a failed query ends the session and the next query starts a new one
+
+    def __init__(self, command: list, environment: Optional[dict], marker_statement: str, marker_lines: int = 1):
+        self._command = command
+        self._environment = environment
+        self._marker_statement = marker_statement
+        # Lines printed by the marker statement, eg: the column name and the value of a SELECT
+        self._marker_lines = marker_lines
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: Optional[Queue] = None
+        self._errors: deque = deque(maxlen=20)
+        self._errors_reader: Optional[Thread] = None
+
+    def run(self, script: str, timeout: float) -> Optional[list]:
+        # The lines printed by the script, None when it failed or did not end before the timeout
+        if self._process is None or self._process.poll() is not None:
+            try:
+                self._start()
+            except OSError as e:
+                log.info("[vim-database] " + str(e))
+                self._process = None
+                return None
+
+        # The session may be closed meanwhile by another thread, it then reads the end of the output
+        process, lines_queue, errors_reader = self._process, self._lines, self._errors_reader
+        try:
+            process.stdin.write(script + "\n" + self._marker_statement + "\n")
+            process.stdin.flush()
+        except OSError:
+            self.close()
+            return None
+
+        deadline = monotonic() + timeout
+        lines = []
+        marker_lines = 0
+        while marker_lines < self._marker_lines:
+            try:
+                line = lines_queue.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                log.info("[vim-database] The session did not answer in " + str(timeout) + "s")
+                self.close()
+                return None
+
+            if line is None:
+                # The client exited, its error is the last thing it printed
+                process.wait()
+                errors_reader.join(1)
+                log.info("[vim-database] " + (". ".join(error.rstrip() for error in self._errors) or "Session closed"))
+                self.close()
+                return None
+            if marker_lines or line.startswith(SESSION_MARKER):
+                marker_lines += 1
+            else:
+                lines.append(line)
+
+        return lines
+
+    def close(self) -> None:
+        if self._process is None:
+            return
+
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process = None
+
+    def _start(self) -> None:
+        self.close()
+        self._process = subprocess.Popen(self._command,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE,
+                                         text=True,
+                                         env=self._environment)
+        # Every process gets its own queue, the lines of a killed process are not read by the next one
+        self._lines = Queue()
+        self._errors.clear()
+        Thread(target=_read_lines, args=(self._process.stdout, self._lines), daemon=True).start()
+        self._errors_reader = Thread(target=read_errors, args=(self._process.stderr, self._errors), daemon=True)
+        self._errors_reader.start()
+
+
+def _read_lines(stream: IO[str], lines: Queue) -> None:
+    for line in stream:
+        lines.put(line)
+    stream.close()
+    lines.put(None)
+
+
+def read_errors(stream: IO[str], errors: deque) -> None:
+    # The stream is drained so a verbose client never blocks on a full pipe
+    for line in stream:
+        errors.append(line)
+    stream.close()
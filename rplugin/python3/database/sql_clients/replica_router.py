@@ -0,0 +1,123 @@
+import re
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional
+
+from .sql_client import SqlClient
+from ..utils.log import log
+from ..utils.sql_splitter import split_statements
+
+# Reads of the catalog and of the data, they go to the replica while it is healthy. The change token stays on the
+# primary, the replay of a PostgreSQL standby does not move the statistics counters it is made of
+_READ_METHODS = {
+    "get_databases", "get_tables", "search_tables", "describe_table", "get_schemas", "get_columns", "get_indexes",
+    "get_foreign_keys", "get_primary_key", "get_unique_columns", "get_template_insert_query",
+    "get_column_declarations", "open_session"
+}
+# Writes, the reads which follow them go to the primary until the replica has caught up
+_WRITE_METHODS = {
+    "update", "delete", "delete_rows", "copy_rows", "delete_table", "import_rows", "run_transaction", "run_script"
+}
+# Methods taking a (database, query) which go to the replica when the query only reads
+_QUERY_METHODS = {"run_query", "run_query_with_timeout", "stream_query", "export"}
+_READ_ONLY_KEYWORDS = {"select", "values", "table", "show", "describe", "desc"}
+# Reads which lock rows or write their result
+_LOCKING_READ_PATTERN = re.compile(r"\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b|\binto\b", re.IGNORECASE)
+# Seconds between two checks of the replication lag
+_CHECK_INTERVAL = 30
+
+
+class ReplicaRouter:
+    # Sends the reads to the replica of the connection and everything else to the primary, the reads go back to the
+    # primary while the replica is unreachable or lags more than max_lag seconds, and for max_lag seconds after a write
+    # so the session reads its own writes
+
+    def __init__(self, primary: SqlClient, replica: SqlClient, max_lag: int):
+        self.connection = primary.connection
+        self._primary = primary
+        self._replica = replica
+        self._max_lag = max_lag
+        self._lock = Lock()
+        self._healthy = False
+        self._checked_at = None
+        self._written_at = None
+        self._change_tokens = dict()
+
+    def __getattr__(self, name: str) -> Any:
+        # The client is picked when the method is called, the lag check blocks and runs in the executor
+        if name in _READ_METHODS:
+            return self._route_read(name)
+        if name in _QUERY_METHODS:
+            return self._route_query(name)
+        if name in _WRITE_METHODS:
+            return self._route_write(name)
+
+        # Plans and the helpers of the commands
+        return getattr(self._primary, name)
+
+    def get_change_token(self, database: str, table: Optional[str] = None) -> Optional[str]:
+        token = self._primary.get_change_token(database, table)
+        with self._lock:
+            previous_token = self._change_tokens.get((database, table))
+            self._change_tokens[(database, table)] = token
+        # A change seen on the primary is read from the primary until the replica has it
+        if previous_token is not None and token != previous_token:
+            self._set_written()
+        return token
+
+    def get_read_client(self) -> SqlClient:
+        with self._lock:
+            if self._written_at is not None and monotonic() - self._written_at < self._max_lag:
+                # The replica may not have the last write yet
+                return self._primary
+            if self._checked_at is None or monotonic() - self._checked_at > _CHECK_INTERVAL:
+                lag = self._replica.get_replication_lag()
+                healthy = lag is not None and lag <= self._max_lag
+                # The routing is reported when it changes, or when the replica can not be used from the start
+                if healthy != self._healthy if self._checked_at is not None else not healthy:
+                    log.info("[vim-database] Reads of " + self.connection.name + " go to the " +
+                             ("replica" if healthy else "primary, the replica is " +
+                              ("unreachable" if lag is None else "{:.0f}".format(lag) + "s behind")))
+                self._healthy = healthy
+                self._checked_at = monotonic()
+
+            return self._replica if self._healthy else self._primary
+
+    def _route_read(self, name: str) -> Callable[..., Any]:
+
+        def read(*args: Any) -> Any:
+            return getattr(self.get_read_client(), name)(*args)
+
+        return read
+
+    def _route_write(self, name: str) -> Callable[..., Any]:
+
+        def write(*args: Any) -> Any:
+            try:
+                return getattr(self._primary, name)(*args)
+            finally:
+                self._set_written()
+
+        return write
+
+    def _route_query(self, name: str) -> Callable[..., Any]:
+
+        def run(database: str, query: str, *args: Any) -> Any:
+            if self._is_read_only(query):
+                return getattr(self.get_read_client(), name)(database, query, *args)
+
+            try:
+                return getattr(self._primary, name)(database, query, *args)
+            finally:
+                self._set_written()
+
+        return run
+
+    def _set_written(self) -> None:
+        with self._lock:
+            self._written_at = monotonic()
+
+    def _is_read_only(self, query: str) -> bool:
+        statements = split_statements(query, self.connection.connection_type.name.lower())
+        return bool(statements) and all(statement.keyword in _READ_ONLY_KEYWORDS for statement in statements) and \
+            _LOCKING_READ_PATTERN.search(query) is None
@@ -1,9 +1,17 @@
 import abc
+import csv
+import re
 import subprocess
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from threading import Thread
+from typing import Iterator, Optional, Tuple
 
+from .query_result import QueryResult
+from .query_session import QuerySession, read_errors
 from ..storages.connection import Connection
+from ..utils.log import log
 
 
 @dataclass(frozen=True)
@@ -12,27 +20,214 @@ class CommandResult:
     data: str
 
 
+class ExportFormat(Enum):
+    CSV = 1
+    JSONL = 2
+
+
+@dataclass(frozen=False)
+class ExportProgress:
+    rows: int = 0
+    bytes: int = 0
+
+
+@dataclass(frozen=True)
+class StatementResult:
+    rows: int
+    # None when the client does not report it
+    affected_rows: Optional[int]
+    # Seconds, None when the client does not report it
+    elapsed_time: Optional[float]
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    rows: int
+    # Messages of the database about the rows it skipped without failing the import
+    messages: list = field(default_factory=list)
+
+
+@dataclass(frozen=False)
+class PlanNode:
+    operation: str
+    relation: Optional[str] = None
+    # Conditions, keys and buffer usages of the node
+    details: list = field(default_factory=list)
+    cost: Optional[float] = None
+    estimated_rows: Optional[float] = None
+    # The actual values are only known when the query was analyzed, they are averaged over the loops
+    actual_rows: Optional[float] = None
+    actual_time: Optional[float] = None
+    loops: Optional[int] = None
+    full_scan: bool = False
+    # Estimated size of the table read by a full scan
+    table_rows: Optional[int] = None
+    children: list = field(default_factory=list)
+
+    def get_estimate_error(self) -> Optional[float]:
+        # How many times the estimated rows are off, positive when the planner over-estimated
+        if self.estimated_rows is None or self.actual_rows is None:
+            return None
+
+        estimated_rows = max(self.estimated_rows, 1)
+        actual_rows = max(self.actual_rows, 1)
+        return estimated_rows / actual_rows if estimated_rows >= actual_rows else -actual_rows / estimated_rows
+
+    def get_full_scans(self) -> list:
+        full_scans = [self] if self.full_scan else []
+        for child in self.children:
+            full_scans.extend(child.get_full_scans())
+
+        return full_scans
+
+
+@dataclass(frozen=True)
+class TableSample:
+    # Percentage of the table
+    rate: float
+    # The same seed gives the same sample, so the pages of a sample do not overlap
+    seed: int
+    # Sample rows instead of pages when the engine can do both
+    row_sampling: bool
+    primary_key: Optional[str]
+
+
+_CHUNK_SIZE = 1000
+_INTEGER_TYPE_PATTERN = re.compile(r"^(?:(?:tiny|small|medium|big)?int(?:eger|\d)?|(?:small|big)?serial\d?)\b")
+_REAL_TYPE_PATTERN = re.compile(r"^(?:real|float\d?|double)\b")
+# Types whose values do not compare or print the same in SQLite, eg: decimals lose their trailing zeros, booleans
+# print as t and f, enums sort by their position
+_UNMATCHED_TYPE_PATTERN = re.compile(r"^(?:decimal|numeric|dec|fixed|money|bool(?:ean)?|bit|varbit|enum|set|array|"
+                                     r"user-defined|jsonb)\b")
+# Printed before every statement of a script to find the output of each statement
+SCRIPT_MARKER = "__vim_database__"
+
+
+def quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def get_column_declaration(data_type: str) -> Optional[str]:
+    data_type = data_type.lower()
+    if _INTEGER_TYPE_PATTERN.match(data_type):
+        # Unsigned big integers overflow the SQLite integers
+        return None if data_type.startswith("bigint") and "unsigned" in data_type else "INTEGER"
+    if _REAL_TYPE_PATTERN.match(data_type):
+        return "REAL"
+    if _UNMATCHED_TYPE_PATTERN.match(data_type):
+        return None
+    return "TEXT"
+
+
+def literal(value: str) -> str:
+    return value if value == "NULL" else quote(value)
+
+
+def delete_statements(table: str, primary_key: str, primary_key_values: list) -> list:
+    # One statement per chunk so huge selections don't hit the statement length limits
+    statements = []
+    for index in range(0, len(primary_key_values), _CHUNK_SIZE):
+        chunk = primary_key_values[index:index + _CHUNK_SIZE]
+        statements.append("DELETE FROM " + table + " WHERE " + primary_key + " IN (" + ", ".join(map(quote, chunk)) +
+                          ")")
+
+    return statements
+
+
+def copy_statements(table: str, columns: list, primary_key: str, primary_key_values: list, expressions: dict) -> list:
+    # The new values of the unique columns are computed by the server, a blank expression leaves the column default
+    insert_columns = [column for column in columns if expressions.get(column, column)]
+    select_columns = [expressions.get(column, column) for column in insert_columns]
+    statements = []
+    for index in range(0, len(primary_key_values), _CHUNK_SIZE):
+        chunk = primary_key_values[index:index + _CHUNK_SIZE]
+        statements.append("INSERT INTO " + table + " (" + ", ".join(insert_columns) + ") SELECT " +
+                          ", ".join(select_columns) + " FROM " + table + " WHERE " + primary_key + " IN (" +
+                          ", ".join(map(quote, chunk)) + ")")
+
+    return statements
+
+
+def insert_statements(table: str, rows: list) -> list:
+    # Consecutive rows with the same columns are inserted by one multi-row statement
+    statements = []
+    columns = None
+    values = []
+    for row in rows + [None]:
+        row_columns = None if row is None else tuple(row.keys())
+        if values and (row_columns != columns or len(values) >= _CHUNK_SIZE):
+            statements.append("INSERT INTO " + table + " (" + ", ".join(columns) + ") VALUES " + ", ".join(values))
+            values = []
+        if row is not None:
+            columns = row_columns
+            values.append("(" + ", ".join(map(literal, row.values())) + ")")
+
+    return statements
+
+
+def get_script_sections(output: str) -> list:
+    # The lines printed after each marker, the lines before the first marker are dropped
+    sections = []
+    for line in output.splitlines():
+        if line.startswith(SCRIPT_MARKER):
+            sections.append(list())
+        elif sections:
+            sections[-1].append(line)
+
+    return sections
+
+
+def like_pattern(pattern: Optional[str]) -> str:
+    if not pattern:
+        return "%"
+
+    # Search for the pattern anywhere in the name unless a wildcard is given
+    pattern = pattern.replace("'", "''")
+    return pattern if "%" in pattern else "%" + pattern + "%"
+
+
 class SqlClient(metaclass=abc.ABCMeta):
 
     def __init__(self, connection: Connection):
         self.connection = connection
 
-    def run_command(self, command: list, environment: dict = None) -> CommandResult:
+    def run_command(self, command: list, environment: dict = None, input: Optional[str] = None) -> CommandResult:
         if environment is None:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, input=input)
         else:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=environment)
+            result = subprocess.run(command,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    text=True,
+                                    env=environment,
+                                    input=input)
         if result.returncode == 0:
             return CommandResult(error=False, data=result.stdout.rstrip())
 
         return CommandResult(error=True, data=result.stderr.rstrip())
 
+    def run_session(self, command: list, script: str, environment: dict = None) -> Tuple[str, Optional[str]]:
+        # The output of the statements run before an error is still needed, so both streams are returned
+        result = subprocess.run(command,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 text=True,
+                                 env=environment,
+                                 input=script)
+        return result.stdout, None if result.returncode == 0 else result.stderr.rstrip() or "Failed to run the script"
+
     @abc.abstractmethod
-    def get_databases(self) -> list:
+    def get_databases(self) -> Optional[list]:
+        # None when the databases could not be read
         pass
 
     @abc.abstractmethod
-    def get_tables(self, database: str) -> list:
+    def get_tables(self, database: str) -> Optional[list]:
+        # None when the tables could not be read
+        pass
+
+    @abc.abstractmethod
+    def search_tables(self, database: str, pattern: Optional[str], limit: int, offset: int) -> list:
         pass
 
     @abc.abstractmethod
@@ -44,11 +239,23 @@ class SqlClient(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def run_query(self, database: str, query: str) -> Optional[list]:
+    def get_schemas(self, database: str) -> list:
         pass
 
     @abc.abstractmethod
-    def copy(self, database: str, table: str, unique_columns: list, new_unique_column_values: list) -> bool:
+    def get_columns(self, database: str, table: str) -> Optional[list]:
+        pass
+
+    @abc.abstractmethod
+    def get_indexes(self, database: str, table: str) -> Optional[list]:
+        pass
+
+    @abc.abstractmethod
+    def get_foreign_keys(self, database: str, table: str) -> Optional[list]:
+        pass
+
+    @abc.abstractmethod
+    def run_query(self, database: str, query: str) -> Optional[list]:
         pass
 
     @abc.abstractmethod
@@ -59,6 +266,151 @@ class SqlClient(metaclass=abc.ABCMeta):
     def delete(self, database: str, table: str, condition: Tuple[str, str]) -> bool:
         pass
 
+    @abc.abstractmethod
+    def run_transaction(self, database: str, statements: list) -> Optional[int]:
+        pass
+
+    @abc.abstractmethod
+    def run_script(self, database: str, statements: list) -> Tuple[list, Optional[str]]:
+        # Runs the statements one after another in one session and stops on the first error, returns the results of
+        # the statements which succeeded and the error of the failing one
+        pass
+
+    @abc.abstractmethod
+    def explain(self, database: str, query: str, analyze: bool) -> Optional[PlanNode]:
+        pass
+
+    def run_query_with_timeout(self, database: str, query: str, timeout: int) -> Optional[list]:
+        # The query is cancelled by the server after timeout seconds, when the server has a statement timeout
+        return self.run_query(database, query)
+
+    @abc.abstractmethod
+    def get_change_token(self, database: str, table: Optional[str] = None) -> Optional[str]:
+        # A cheap value which changes when the data of the database (or of the table) changes, None when it is unknown
+        pass
+
+    def get_replication_lag(self) -> Optional[float]:
+        # Seconds the server lags behind its primary, 0 when it is not a replica and None when it is unreachable or its
+        # replication is stopped
+        return None
+
+    def get_sample_source(self, table: str, sample: TableSample) -> Optional[str]:
+        # The FROM clause source reading a sample of the table, None when sampling is not supported. The sample must
+        # cover the whole table at the rate of the sample, the facets scale its counts by the rate
+        return None
+
+    def get_column_declarations(self, database: str, table: str) -> Optional[dict]:
+        # The SQLite type of every column holding its values with the comparisons of the server, None for the columns
+        # no type matches
+        columns = self.get_columns(database, table)
+        if columns is None:
+            return None
+
+        return {column[0]: get_column_declaration(column[1]) for column in columns}
+
+    def is_like_case_sensitive(self, declarations: dict) -> Optional[bool]:
+        # Whether LIKE tells the case apart on the columns of the declarations, None when it depends on the column
+        return True
+
+    def delete_rows(self, database: str, table: str, primary_key: str, primary_key_values: list) -> Optional[int]:
+        return self.run_transaction(database, delete_statements(table, primary_key, primary_key_values))
+
+    def copy_rows(self, database: str, table: str, columns: list, primary_key: str, primary_key_values: list,
+                  expressions: dict) -> Optional[int]:
+        return self.run_transaction(database,
+                                    copy_statements(table, columns, primary_key, primary_key_values, expressions))
+
+    def export(self, database: str, query: str, path: str, export_format: ExportFormat,
+               progress: ExportProgress) -> bool:
+        command, environment = self.get_export_command(database, query, export_format)
+        # The rows are written as they arrive, nothing but the current record is kept in memory
+        with open(path, "w", newline="", encoding="utf-8") as file, \
+                subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                 env=environment) as process:
+            errors_reader, errors = _read_process_errors(process)
+            header = export_format is ExportFormat.CSV
+            for record in self.get_export_records(process.stdout, export_format):
+                file.write(record)
+                progress.bytes += len(record.encode("utf-8"))
+                if header:
+                    header = False
+                else:
+                    progress.rows += 1
+            return_code = process.wait()
+            errors_reader.join()
+
+        if return_code != 0:
+            log.info("[vim-database] " + ". ".join(error.rstrip() for error in errors))
+            return False
+
+        return True
+
+    def stream_query(self, database: str, query: str, spill_size: int, max_size: int) -> Optional[QueryResult]:
+        # The rows are read as CSV records like an export, the result spills to disk past spill_size bytes
+        command, environment = self.get_export_command(database, query, ExportFormat.CSV)
+        result = QueryResult(spill_size, max_size)
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                              env=environment) as process:
+            errors_reader, errors = _read_process_errors(process)
+            # NULL is kept apart from the empty values, like in the rows of run_query
+            for record in self.get_export_records(process.stdout, ExportFormat.CSV, "NULL"):
+                if not result.append(record):
+                    process.kill()
+                    break
+            return_code = process.wait()
+            errors_reader.join()
+
+        if return_code != 0 and not result.truncated:
+            result.close()
+            log.info("[vim-database] " + ". ".join(error.rstrip() for error in errors))
+            return None
+
+        result.complete()
+        return result
+
+    def open_session(self, database: str) -> Optional[QuerySession]:
+        # A client process kept open for small repeated queries, None when the client can not keep one
+        return None
+
+    def get_session_query(self, query: str) -> str:
+        return query.strip().rstrip(";") + ";"
+
+    def run_session_query(self, session: QuerySession, query: str, timeout: float) -> Optional[list]:
+        # The rows like run_query, read as CSV records like an export
+        lines = session.run(self.get_session_query(query), timeout)
+        if lines is None:
+            return None
+
+        return [
+            next(csv.reader([record]), []) for record in self.get_export_records(iter(lines), ExportFormat.CSV, "NULL")
+        ]
+
+    @abc.abstractmethod
+    def get_export_command(self, database: str, query: str, export_format: ExportFormat) -> Tuple[list, Optional[dict]]:
+        pass
+
+    @abc.abstractmethod
+    def import_rows(self, database: str, table: str, columns: list,
+                    rows: Iterator[list]) -> Optional[ImportResult]:
+        pass
+
+    def get_export_records(self, lines: Iterator[str], export_format: ExportFormat,
+                           null_value: str = "") -> Iterator[str]:
+        # The CSV value written for NULL, when the client tells NULL from an empty value
+        if export_format is ExportFormat.JSONL:
+            yield from lines
+            return
+
+        # A quoted CSV value may span several lines, a record ends when its quotes are balanced
+        record = ""
+        for line in lines:
+            record += line
+            if record.count("\"") % 2 == 0:
+                yield record
+                record = ""
+        if record:
+            yield record
+
     @abc.abstractmethod
     def get_primary_key(self, database: str, table: str) -> Optional[str]:
         pass
@@ -70,3 +422,11 @@ class SqlClient(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def get_template_insert_query(self, database: str, table: str) -> Optional[list]:
         pass
+
+
+def _read_process_errors(process: subprocess.Popen) -> Tuple[Thread, deque]:
+    # stderr is drained while stdout is read, a client filling the stderr pipe would block before stdout ends
+    errors = deque(maxlen=20)
+    errors_reader = Thread(target=read_errors, args=(process.stderr, errors), daemon=True)
+    errors_reader.start()
+    return errors_reader, errors
@@ -1,5 +1,8 @@
+from dataclasses import replace
+
 from .mysql_client import MySqlClient
 from .psql_client import PostgreSqlClient
+from .replica_router import ReplicaRouter
 from .sql_client import SqlClient
 from .sqlite_client import SqliteClient
 from ..storages.connection import Connection, ConnectionType
@@ -9,6 +12,19 @@ class SqlClientFactory(object):
 
     @staticmethod
     def create(connection: Connection) -> SqlClient:
+        client = SqlClientFactory._create(connection)
+        if not connection.read_host or connection.connection_type == ConnectionType.SQLITE:
+            return client
+
+        replica_connection = replace(connection,
+                                     host=connection.read_host,
+                                     port=connection.read_port or connection.port,
+                                     read_host=None)
+        replica = SqlClientFactory._create(replica_connection)
+        return ReplicaRouter(client, replica, connection.read_max_lag)
+
+    @staticmethod
+    def _create(connection: Connection) -> SqlClient:
         if connection.connection_type == ConnectionType.SQLITE:
             return SqliteClient(connection)
         if connection.connection_type == ConnectionType.MYSQL:
@@ -1,29 +1,70 @@
-from typing import Optional, Tuple
-
-from .sql_client import SqlClient
+import os
+import re
+import sqlite3
+from time import monotonic
+from typing import Iterator, Optional, Tuple
+
+from .query_session import SESSION_MARKER, QuerySession
+from .sql_client import (
+    ExportFormat,
+    ImportResult,
+    SqlClient,
+    PlanNode,
+    StatementResult,
+    TableSample,
+    SCRIPT_MARKER,
+    get_script_sections,
+    like_pattern,
+)
 from ..storages.connection import Connection
 from ..utils.log import log
 
+_TIMER_PATTERN = re.compile(r"^Run Time: real ([\d.]+)")
+_CHANGES_PATTERN = re.compile(r"^changes: +\d+ +total_changes: +(\d+)$")
+_FULL_SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\S+)(?: AS \S+)?$")
+_READ_QUERY_PATTERN = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+# Table and alias of the FROM and JOIN clauses, recent SQLite versions name a scanned table by its alias
+# The hashed values are kept on 31 bits, their products with 31-bit multipliers do not overflow
+_HASH_MASK = "2147483647"
+_TABLE_ALIAS_PATTERN = re.compile(r"(?:\bfrom|\bjoin|,)\s*([\w.\"]+)\s+(?:as\s+)?(\w+)", re.IGNORECASE)
+
 
 class SqliteClient(SqlClient):
 
     def __init__(self, connection: Connection):
         SqlClient.__init__(self, connection)
 
-    def get_databases(self) -> list:
+    def get_databases(self) -> Optional[list]:
         result = self.run_command(["sqlite3", self.connection.database, ".database"])
         if result.error:
             log.info("[vim-database] " + result.data)
-            return list()
-        return list([result.data.split()[-1]])
+            return None
+        # Recent sqlite versions append the access mode: "main: /path/to/file.db r/w"
+        database = result.data.splitlines()[0].split(":", 1)[-1].strip()
+        if database.endswith(" r/w") or database.endswith(" r/o"):
+            database = database[:-4]
+        return list([database])
 
-    def get_tables(self, database: str) -> list:
+    def get_tables(self, database: str) -> Optional[list]:
         result = self.run_command(["sqlite3", database, ".table"])
         if result.error:
             log.info("[vim-database] " + result.data)
-            return list()
+            return None
         return result.data.split()
 
+    def search_tables(self, database: str, pattern: Optional[str], limit: int, offset: int) -> list:
+        search_tables_query = \
+            "SELECT name " \
+            "FROM sqlite_master " \
+            "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' " \
+            "AND name LIKE '" + like_pattern(pattern) + "' " \
+            "ORDER BY name LIMIT " + str(limit) + " OFFSET " + str(offset)
+        result = self.run_command(["sqlite3", database, search_tables_query])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return list()
+        return result.data.splitlines()
+
     def delete_table(self, database: str, table: str) -> None:
         delete_table_query = "DROP TABLE " + table
         result = self.run_command(["sqlite3", database, delete_table_query])
@@ -44,6 +85,69 @@ class SqliteClient(SqlClient):
 
         return list(map(lambda data: data.split("|"), lines))
 
+    def get_schemas(self, database: str) -> list:
+        # SQLite has no schema level
+        return list()
+
+    def get_columns(self, database: str, table: str) -> Optional[list]:
+        table_info = self.describe_table(database, table)
+        if table_info is None:
+            return None
+
+        headers = table_info[0]
+        name_index = headers.index("name")
+        type_index = headers.index("type")
+        not_null_index = headers.index("notnull")
+        default_value_index = headers.index("dflt_value")
+
+        return [[
+            column[name_index], column[type_index], "NO" if column[not_null_index] == "1" else "YES",
+            column[default_value_index]
+        ] for column in table_info[1:]]
+
+    def get_column_declarations(self, database: str, table: str) -> Optional[dict]:
+        # The workspace is a SQLite database, the columns are declared as they are
+        columns = self.get_columns(database, table)
+        return None if columns is None else {column[0]: column[1] for column in columns}
+
+    def is_like_case_sensitive(self, declarations: dict) -> Optional[bool]:
+        return False
+
+    def get_indexes(self, database: str, table: str) -> Optional[list]:
+        # The size comes from the dbstat table when sqlite3 is built with it, an INTEGER PRIMARY KEY is the rowid
+        # index of the table
+        result = None
+        for size in ("(SELECT SUM(pgsize) FROM dbstat WHERE name = il.name)", "''"):
+            get_indexes_query = \
+                "SELECT il.name, group_concat(ii.name, ', '), CASE WHEN il.\"unique\" THEN 'YES' ELSE 'NO' END, " + \
+                size + ", '' " \
+                "FROM pragma_index_list('" + table + "') il " \
+                "JOIN pragma_index_info(il.name) ii " \
+                "GROUP BY il.name " \
+                "UNION ALL " \
+                "SELECT 'PRIMARY KEY', name, 'YES', '', '' FROM pragma_table_info('" + table + "') " \
+                "WHERE pk = 1 AND lower(type) = 'integer' " \
+                "AND (SELECT COUNT(*) FROM pragma_table_info('" + table + "') WHERE pk > 0) = 1 " \
+                "ORDER BY 1"
+            result = self.run_command(["sqlite3", database, get_indexes_query])
+            if not result.error:
+                break
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return list(map(lambda data: data.split("|"), result.data.splitlines()))
+
+    def get_foreign_keys(self, database: str, table: str) -> Optional[list]:
+        get_foreign_keys_query = \
+            "SELECT 'fk_' || id, \"from\", \"table\", \"to\" FROM pragma_foreign_key_list('" + table + "')"
+        result = self.run_command(["sqlite3", database, get_foreign_keys_query])
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return list(map(lambda data: data.split("|"), result.data.splitlines()))
+
     def run_query(self, database: str, query: str) -> Optional[list]:
         result = self.run_command(["sqlite3", database, "--header", query])
         if result.error:
@@ -67,10 +171,6 @@ class SqliteClient(SqlClient):
 
         return True
 
-    def copy(self, database: str, table: str, unique_columns: list, new_unique_column_values: list) -> bool:
-        log.info("[vim-database] Not supported for sqlite")
-        return False
-
     def delete(self, database: str, table: str, condition: Tuple[str, str]) -> bool:
         condition_column, condition_value = condition
         delete_query = "DELETE FROM " + table + " WHERE " + condition_column + " = " + condition_value
@@ -82,6 +182,156 @@ class SqliteClient(SqlClient):
 
         return True
 
+    def run_transaction(self, database: str, statements: list) -> Optional[int]:
+        script = "BEGIN;\n" + "".join(statement + ";\n" for statement in statements)
+        script += "SELECT total_changes();\nCOMMIT;\n"
+        # Bail out on the first error, the open transaction is rolled back when sqlite3 exits
+        result = self.run_command(["sqlite3", "-bail", database], input=script)
+        if result.error:
+            log.info("[vim-database] " + result.data)
+            return None
+
+        return int(result.data.splitlines()[-1])
+
+    def run_script(self, database: str, statements: list) -> Tuple[list, Optional[str]]:
+        # Every statement is followed by its run time and the change counters of the connection
+        script = ".bail on\n.headers on\n.timer on\n.changes on\n"
+        for index, statement in enumerate(statements):
+            script += ".print " + SCRIPT_MARKER + " " + str(index) + "\n" + statement + "\n;\n"
+        output, error = self.run_session(["sqlite3", database], script)
+
+        results = []
+        total_changes = 0
+        for lines in get_script_sections(output):
+            elapsed_time = None
+            changes = None
+            rows = []
+            for line in lines:
+                timer = _TIMER_PATTERN.match(line)
+                if timer is not None:
+                    elapsed_time = float(timer.group(1))
+                    continue
+                changes = _CHANGES_PATTERN.match(line) or changes
+                if changes is None:
+                    rows.append(line)
+
+            if changes is None:
+                # The statement failed before sqlite3 printed its counters
+                break
+            # changes() keeps the count of the last INSERT, UPDATE or DELETE, the total tells if this statement changed
+            # any row
+            affected_rows = int(changes.group(1)) - total_changes
+            total_changes += affected_rows
+            results.append(
+                StatementResult(rows=max(len(rows) - 1, 0),
+                                affected_rows=affected_rows,
+                                elapsed_time=elapsed_time))
+
+        return results, error
+
+    def explain(self, database: str, query: str, analyze: bool) -> Optional[PlanNode]:
+        if analyze and not _READ_QUERY_PATTERN.match(query):
+            log.info("[vim-database] SQLite can only analyze a SELECT query")
+            return None
+
+        connection = sqlite3.connect(database)
+        try:
+            # The rows are (id, parent id, unused, detail), the top level steps have 0 as parent
+            nodes = {0: PlanNode(operation="QUERY PLAN")}
+            aliases = {alias: table for table, alias in _TABLE_ALIAS_PATTERN.findall(query)}
+            for node_id, parent_id, _, detail in connection.execute("EXPLAIN QUERY PLAN " + query):
+                full_scan = _FULL_SCAN_PATTERN.match(detail)
+                relation = None if full_scan is None else full_scan.group(1)
+                # An alias is counted through its table, a name which is not an alias is the table itself
+                if relation is not None and relation in aliases and _get_table_rows(connection, relation) is None:
+                    relation = aliases[relation]
+                node = PlanNode(operation=detail, relation=relation, full_scan=full_scan is not None)
+                if full_scan is not None:
+                    node.table_rows = _get_table_rows(connection, relation)
+                nodes[node_id] = node
+                nodes.get(parent_id, nodes[0]).children.append(node)
+
+            root = nodes[0]
+            if analyze:
+                # SQLite has no per step statistics, the whole query is run and timed
+                start_time = monotonic()
+                root.actual_rows = sum(1 for _ in connection.execute(query))
+                root.actual_time = (monotonic() - start_time) * 1000
+                root.loops = 1
+        except sqlite3.Error as error:
+            log.info("[vim-database] " + str(error))
+            return None
+        finally:
+            connection.close()
+
+        return root
+
+    def get_change_token(self, database: str, table: Optional[str] = None) -> Optional[str]:
+        # Every commit writes the database file, or the WAL file in WAL mode. The data_version pragma only sees the
+        # changes of other connections than its own, so a new sqlite3 process can not use it
+        tokens = []
+        for file_path in (database, database + "-wal"):
+            try:
+                stat = os.stat(file_path)
+                # The file change counter of the header, a commit may not change the modification time
+                with open(file_path, "rb") as file:
+                    header = file.read(32)
+            except OSError:
+                continue
+            tokens.append(str(stat.st_mtime_ns) + ":" + str(stat.st_size) + ":" + header[24:32].hex())
+
+        return ",".join(tokens) if tokens else None
+
+    def get_sample_source(self, table: str, sample: TableSample) -> Optional[str]:
+        # The whole table is thinned by a seeded hash of the rowid, random() can not be seeded
+        row_hash = _mix_hash(_mix_hash("rowid & " + _HASH_MASK, 1103515245, sample.seed, 16), 1597334677,
+                             sample.seed * 40503 % 2147483648, 15)
+        return "(SELECT * FROM " + table + " WHERE " + row_hash + " % 1000000 < " + \
+               "{:g}".format(sample.rate * 10000) + ") AS " + table
+
+    def open_session(self, database: str) -> Optional[QuerySession]:
+        # -bail makes the client exit on the first error
+        return QuerySession(["sqlite3", "-bail", "-csv", "-header", database], None, ".print " + SESSION_MARKER)
+
+    def get_export_command(self, database: str, query: str, export_format: ExportFormat) -> Tuple[list, Optional[dict]]:
+        if export_format is ExportFormat.JSONL:
+            return ["sqlite3", "-json", database, query], None
+
+        return ["sqlite3", "-csv", "-header", database, query], None
+
+    def get_export_records(self, lines: Iterator[str], export_format: ExportFormat,
+                           null_value: str = "") -> Iterator[str]:
+        if export_format is not ExportFormat.JSONL:
+            yield from super().get_export_records(lines, export_format, null_value)
+            return
+
+        # The json mode prints a JSON array with one object per line
+        for line in lines:
+            line = line.rstrip("\n")
+            if line.startswith("["):
+                line = line[1:]
+            if line.endswith(",") or line.endswith("]"):
+                line = line[:-1]
+            if line:
+                yield line + "\n"
+
+    def import_rows(self, database: str, table: str, columns: list,
+                    rows: Iterator[list]) -> Optional[ImportResult]:
+        insert_query = "INSERT INTO " + table + " (" + ", ".join(columns) + ") VALUES (" + \
+                       ", ".join("?" for _ in columns) + ")"
+        connection = sqlite3.connect(database)
+        try:
+            # The connection context manager commits the rows at once or rolls them all back
+            with connection:
+                cursor = connection.executemany(insert_query, rows)
+        except sqlite3.Error as error:
+            log.info("[vim-database] " + str(error))
+            return None
+        finally:
+            connection.close()
+
+        return ImportResult(rows=cursor.rowcount)
+
     def get_primary_key(self, database: str, table: str) -> Optional[str]:
         table_info = self.describe_table(database, table)
         if table_info is None:
@@ -147,3 +397,21 @@ class SqliteClient(SqlClient):
         insert_query.append(")")
 
         return insert_query
+
+
+def _get_table_rows(connection: sqlite3.Connection, table: str) -> Optional[int]:
+    # The largest rowid is a cheap upper bound of the row count, WITHOUT ROWID tables have no estimate
+    try:
+        rows, = connection.execute("SELECT MAX(rowid) FROM " + table).fetchone()
+    except sqlite3.Error:
+        return None
+
+    return rows or 0
+
+
+def _mix_hash(value: str, multiplier: int, seed: int, shift: int) -> str:
+    # A multiply-add round followed by an xorshift, which breaks the lattice of a linear hash. SQLite has no XOR: a ^ b
+    # is (a | b) - (a & b), and its bitwise operators share one precedence so every one is parenthesized
+    product = "((" + value + ") * " + str(multiplier) + " + " + str(seed) + " & " + _HASH_MASK + ")"
+    shifted = "(" + product + " >> " + str(shift) + ")"
+    return "((" + product + " | " + shifted + ") - (" + product + " & " + shifted + "))"
@@ -0,0 +1,98 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+from ..sql_clients.sql_client import copy_statements, delete_statements, insert_statements, literal
+
+
+@dataclass(frozen=False)
+class Changeset:
+    table: str
+    primary_key: str
+    # Number of fetched rows, the staged copies are appended after them
+    base_rows: int
+    # Row index -> fetched row, kept to find the row in the database and to revert the edits
+    originals: Dict[int, list] = field(default_factory=dict)
+    # Row index -> changed columns
+    updates: Dict[int, Dict[str, str]] = field(default_factory=dict)
+    deletes: Dict[int, str] = field(default_factory=dict)
+    # Primary key of the source row and the expressions of the new unique values, in the order of the appended rows
+    copies: list = field(default_factory=list)
+    # Columns of the new rows
+    inserts: list = field(default_factory=list)
+
+    def __len__(self) -> int:
+        updates = [row_idx for row_idx in self.updates if row_idx not in self.deletes]
+        return len(updates) + len(self.deletes) + len(self.copies) + len(self.inserts)
+
+    def is_copy(self, row_idx: int) -> bool:
+        return row_idx >= self.base_rows
+
+    def get_highlights(self) -> Dict[int, str]:
+        highlights = {row_idx: "DiffChange" for row_idx in self.updates}
+        highlights.update({row_idx: "DiffDelete" for row_idx in self.deletes})
+        highlights.update({self.base_rows + copy_idx: "DiffAdd" for copy_idx in range(len(self.copies))})
+        return highlights
+
+    def get_statements(self, headers: list, primary_key_idx: int) -> list:
+        # Copies sharing the same expressions are cloned together
+        copies: Dict[tuple, list] = dict()
+        for primary_key_value, expressions in self.copies:
+            copies.setdefault(tuple(expressions.items()), list()).append(primary_key_value)
+        statements = []
+        for expressions, primary_key_values in copies.items():
+            statements.extend(copy_statements(self.table, headers, self.primary_key, primary_key_values,
+                                              dict(expressions)))
+
+        # Deleted rows go first so their unique values can be reused by the other changes
+        statements.extend(delete_statements(self.table, self.primary_key, list(self.deletes.values())))
+
+        # One statement per row covering all of its changed columns
+        for row_idx, columns in self.updates.items():
+            if row_idx in self.deletes:
+                continue
+            assignments = ", ".join(column + " = " + literal(value) for column, value in columns.items())
+            statements.append("UPDATE " + self.table + " SET " + assignments + " WHERE " + self.primary_key + " = " +
+                              literal(self.originals[row_idx][primary_key_idx]))
+
+        statements.extend(insert_statements(self.table, self.inserts))
+
+        return statements
+
+
+def diff_rows(table: str, primary_key: str, headers: list, rows: list, edited_headers: list,
+              edited_rows: list) -> Changeset:
+    # Rows are matched by primary key, so reordered or sorted lines are not changes
+    primary_key_idx = headers.index(primary_key)
+    edited_primary_key_idx = edited_headers.index(primary_key)
+    column_indices = [headers.index(header) for header in edited_headers]
+    row_indices = {row[primary_key_idx].strip(): row_idx for row_idx, row in enumerate(rows)}
+
+    changeset = Changeset(table=table, primary_key=primary_key, base_rows=len(rows))
+    matched_rows = set()
+    for edited_row in edited_rows:
+        primary_key_value = edited_row[edited_primary_key_idx]
+        row_idx = row_indices.get(primary_key_value) if primary_key_value else None
+        if row_idx is None:
+            # Blank columns are left to their default values
+            changeset.inserts.append(
+                {header: value for header, value in zip(edited_headers, edited_row) if value != ""})
+            continue
+        if row_idx in matched_rows:
+            raise ValueError("Duplicate primary key " + primary_key_value)
+
+        matched_rows.add(row_idx)
+        row = rows[row_idx]
+        columns = {
+            header: value for header, column_idx, value in zip(edited_headers, column_indices, edited_row)
+            if row[column_idx].strip() != value
+        }
+        if columns:
+            changeset.originals[row_idx] = row
+            changeset.updates[row_idx] = columns
+
+    for row_idx, row in enumerate(rows):
+        if row_idx not in matched_rows:
+            changeset.deletes[row_idx] = row[primary_key_idx]
+
+    return changeset
+
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from enum import Enum
+from time import monotonic
+from typing import Optional
+
+from pynvim.api.buffer import Buffer
+
+_JOB_STATUSES = {1: "Running", 2: "Done", 3: "Failed"}
+
+
+class JobStatus(Enum):
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+    def to_string(self) -> str:
+        return _JOB_STATUSES[self.value]
+
+
+@dataclass(frozen=False)
+class QueryJob:
+    job_id: int
+    connection_name: str
+    database: str
+    query: str
+    buffer: Buffer
+    start_time: float
+    end_time: Optional[float] = None
+    status: JobStatus = JobStatus.RUNNING
+    rows: Optional[int] = None
+
+    def get_elapsed_time(self) -> float:
+        return (monotonic() if self.end_time is None else self.end_time) - self.start_time
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator, Optional, Tuple
+
+from ..storages.connection import Connection
+
+
+class NodeKind(Enum):
+    CONNECTION = 1
+    DATABASE = 2
+    SCHEMA = 3
+    TABLE = 4
+    COLUMNS = 5
+    INDEXES = 6
+    FOREIGN_KEYS = 7
+    ITEM = 8
+
+
+@dataclass(frozen=False)
+class TreeNode:
+    kind: NodeKind
+    label: str
+    connection: Connection
+    database: Optional[str] = None
+    schema: Optional[str] = None
+    table: Optional[str] = None
+    # None until the children are loaded, loaded children are kept when the node is collapsed
+    children: Optional[list] = None
+    expanded: bool = False
+    loading: bool = False
+
+    def is_expandable(self) -> bool:
+        return self.kind is not NodeKind.ITEM
+
+
+def create_tree(connections: list) -> list:
+    return [
+        TreeNode(kind=NodeKind.CONNECTION, label=connection.name, connection=connection) for connection in connections
+    ]
+
+
+def render_tree(nodes: list) -> Tuple[list, list]:
+    lines = []
+    visible_nodes = []
+    for depth, node in _walk(nodes, 0):
+        if not node.is_expandable():
+            icon = "  "
+        else:
+            icon = "▾ " if node.expanded else "▸ "
+        line = "  " * depth + icon + node.label
+        if node.loading:
+            line += " (loading...)"
+        elif node.expanded and node.children is not None and not node.children:
+            line += " (empty)"
+        lines.append(line)
+        visible_nodes.append(node)
+
+    return lines, visible_nodes
+
+
+def _walk(nodes: list, depth: int) -> Iterator[Tuple[int, TreeNode]]:
+    for node in nodes:
+        yield depth, node
+        if node.expanded and node.children:
+            yield from _walk(node.children, depth + 1)
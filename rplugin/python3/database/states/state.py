@@ -1,9 +1,16 @@
+from asyncio import Task
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
+from .changeset import Changeset
+from .query_job import QueryJob
+from .table_profile import TableProfile
+from .table_tail import TableTail
+from .workspace import Workspace
 from ..concurrents.executors import run_in_executor
-from ..sql_clients.sql_client import SqlClient
+from ..sql_clients.query_result import QueryResult
+from ..sql_clients.sql_client import SqlClient, TableSample
 from ..sql_clients.sql_client_factory import SqlClientFactory
 from ..storages.connection import (
     Connection,
@@ -17,6 +24,11 @@ class Mode(Enum):
     TABLE = 3
     QUERY = 4
     TABLE_INFO = 5
+    TREE = 6
+    JOBS = 7
+    PROFILE = 8
+    FACETS = 9
+    TAIL = 10
 
 
 @dataclass(frozen=False)
@@ -26,16 +38,51 @@ class State:
     selected_connection: Optional[Connection]
     sql_client: Optional[SqlClient]
     databases: list
+    databases_cache: dict
     selected_database: Optional[str]
     tables: list
+    tables_cache: dict
+    tables_page: int
+    tree: list
+    tree_nodes: list
+    table_indexes: dict
+    found_tables: list
+    # The query of the found tables, rendering them changes the prompt buffer which searches again
+    found_tables_query: Optional[str]
+    primary_keys: dict
+    # (connection name, database, table) -> indexes of the table
+    index_catalog: dict
     selected_table: Optional[str]
     table_data: Optional[Tuple[list, list]]
+    workspace: Workspace
+    # Table of the workspace holding all the rows of the table view or of the user query result
+    local_table: Optional[str]
+    # Rows of the user query result spilled to disk, they are shown page by page
+    query_result: Optional[QueryResult]
+    changeset: Optional[Changeset]
+    editing_table: bool
     filtered_tables: Optional[str]
     filtered_columns: set[str]
     query_conditions: Optional[str]
+    # Set by the filter guard to narrow a filter which would scan a large table
+    rows_limit: Optional[int]
+    # The table is browsed through a random sample
+    sample: Optional[TableSample]
+    # (connection name, database, table, predicate shape) -> rows of the large table scanned by the filter, or None
+    filter_verdicts: dict
     order: Optional[Tuple[str, str]]
+    # (connection name, database, source, columns) -> profile of the columns
+    profiles: dict
+    profile: Optional[TableProfile]
+    # The faceted column and its (value, count, is null) rows
+    facets: Optional[Tuple[str, list]]
+    # Polls the change token of the shown table and refreshes its rows
+    auto_refresh: Optional[Task]
+    tail: Optional[TableTail]
     user_query: bool
+    last_query: Optional[str]
     current_page: int
+    jobs: Dict[int, QueryJob]
 
     def load_default_connection(self):
         if self.connections:
@@ -47,23 +94,70 @@ class State:
             self.selected_database = self.selected_connection.database
             self.sql_client = SqlClientFactory.create(self.selected_connection)
 
+    def reset_table_view(self) -> None:
+        self.query_conditions = None
+        self.rows_limit = None
+        self.sample = None
+        self.filtered_columns.clear()
+        self.order = None
+        self.current_page = 1
+
+    def invalidate_connection_cache(self, connection_name: str) -> None:
+        self.databases_cache.pop(connection_name, None)
+        for cache_key in [cache_key for cache_key in self.tables_cache if cache_key[0] == connection_name]:
+            del self.tables_cache[cache_key]
+            self.table_indexes.pop(cache_key, None)
+        for cache_key in [cache_key for cache_key in self.primary_keys if cache_key[0] == connection_name]:
+            del self.primary_keys[cache_key]
+        for cache_key in [cache_key for cache_key in self.index_catalog if cache_key[0] == connection_name]:
+            del self.index_catalog[cache_key]
+        for cache_key in [cache_key for cache_key in self.filter_verdicts if cache_key[0] == connection_name]:
+            del self.filter_verdicts[cache_key]
+        for cache_key in [cache_key for cache_key in self.profiles if cache_key[0] == connection_name]:
+            del self.profiles[cache_key]
+
 
 async def init_state() -> State:
     state = State(mode=Mode.CONNECTION,
                   connections=list(),
                   selected_connection=None,
                   databases=list(),
+                  databases_cache=dict(),
                   selected_database=None,
                   sql_client=None,
                   tables=list(),
+                  tables_cache=dict(),
+                  tables_page=1,
+                  tree=list(),
+                  tree_nodes=list(),
+                  table_indexes=dict(),
+                  found_tables=list(),
+                  found_tables_query=None,
+                  primary_keys=dict(),
+                  index_catalog=dict(),
                   selected_table=None,
                   table_data=None,
+                  workspace=Workspace(),
+                  local_table=None,
+                  query_result=None,
+                  changeset=None,
+                  editing_table=False,
                   filtered_tables=None,
                   filtered_columns=set(),
                   query_conditions=None,
+                  rows_limit=None,
+                  sample=None,
+                  filter_verdicts=dict(),
                   order=None,
+                  profiles=dict(),
+                  profile=None,
+                  facets=None,
+                  auto_refresh=None,
+                  tail=None,
                   user_query=False,
-                  current_page=1)
+                  last_query=None,
+                  current_page=1,
+                  jobs=dict())
 
     def _get_connections() -> list:
         return list(get_connections())
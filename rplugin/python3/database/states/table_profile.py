@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+from time import time
+
+
+@dataclass(frozen=True)
+class TableProfile:
+    table: str
+    # The profiled rows: the table, or the rows of the table view
+    source: str
+    columns: tuple
+    # Column name to lowercase data type
+    column_types: dict
+    total_rows: str
+    # Column, nulls, distinct, min, max, top value, top count
+    rows: list
+    profiled_at: float
+
+    def get_age(self) -> float:
+        return time() - self.profiled_at
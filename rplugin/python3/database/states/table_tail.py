@@ -0,0 +1,24 @@
+from asyncio import Task
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from ..sql_clients.query_session import QuerySession
+
+
+@dataclass(frozen=False)
+class TableTail:
+    table: str
+    primary_key: str
+    primary_key_idx: int
+    # Filter of the table view when the tail started
+    conditions: Optional[str]
+    headers: list
+    # The last rows by primary key, the oldest ones are dropped
+    rows: deque
+    # Widths of the rendered columns, new rows are appended as long as they fit
+    column_widths: list
+    last_value: Optional[str]
+    # None once the session failed, every poll then runs its own query
+    session: Optional[QuerySession]
+    task: Optional[Task] = None
@@ -0,0 +1,122 @@
+import re
+import sqlite3
+from collections import deque
+from threading import Lock
+from typing import Optional, Tuple
+
+# Results of user queries kept in the workspace, the oldest ones are dropped
+_MAX_RESULTS = 10
+
+
+class Workspace:
+    # In-memory SQLite database holding fetched rows, so they can be sorted, filtered and joined without the server
+
+    def __init__(self):
+        self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self._lock = Lock()
+        self._results = deque()
+        self._result_number = 0
+        # Tables whose LIKE tells the case apart, like on their server
+        self._case_sensitive_tables = set()
+
+    def load_table(self, table: str, headers: list, rows: list, declarations: dict,
+                   case_sensitive_like: Optional[bool]) -> Optional[str]:
+        # None when a column can not be compared like on the server, its rows are then filtered by the server
+        column_types = [declarations.get(header) for header in headers]
+        if None in column_types or case_sensitive_like is None:
+            return None
+
+        name = re.sub(r"\W", "_", table)
+        self._load(name, headers, rows, column_types)
+        if case_sensitive_like:
+            self._case_sensitive_tables.add(name)
+        else:
+            self._case_sensitive_tables.discard(name)
+        return name
+
+    def load_result(self, headers: list, rows: list) -> str:
+        self._result_number += 1
+        name = "result_" + str(self._result_number)
+        self._load(name, headers, rows)
+
+        self._results.append(name)
+        if len(self._results) > _MAX_RESULTS:
+            self.drop(self._results.popleft())
+        return name
+
+    def drop(self, name: str) -> None:
+        self._case_sensitive_tables.discard(name)
+        with self._lock:
+            self._connection.execute("DROP TABLE IF EXISTS " + _quote_identifier(name))
+
+    def run_query(self, query: str, table: Optional[str] = None) -> Tuple[Optional[list], Optional[str]]:
+        # The LIKE of a query on a loaded table follows the server of the table
+        case_sensitive_like = table in self._case_sensitive_tables
+        with self._lock:
+            try:
+                self._connection.execute("PRAGMA case_sensitive_like = " + ("ON" if case_sensitive_like else "OFF"))
+                cursor = self._connection.execute(query)
+                rows = cursor.fetchall()
+            except sqlite3.Error as e:
+                return None, str(e)
+
+        if cursor.description is None:
+            return list(), None
+        headers = [column[0] for column in cursor.description]
+        return [headers] + [[_to_text(value) for value in row] for row in rows], None
+
+    def _load(self, name: str, headers: list, rows: list, column_types: Optional[list] = None) -> None:
+        quoted_name = _quote_identifier(name)
+        # Duplicated headers (eg: SELECT * of a join) get a suffix
+        columns = []
+        for header in headers:
+            column = header
+            while column in columns:
+                column += "_"
+            columns.append(column)
+
+        column_types = [""] * len(columns) if column_types is None else column_types
+        # The typed columns convert the text themselves, the columns without a type keep the values as they are loaded
+        converters = [_from_null if column_type else _from_text for column_type in column_types]
+
+        with self._lock:
+            self._connection.execute("DROP TABLE IF EXISTS " + quoted_name)
+            self._connection.execute("CREATE TABLE " + quoted_name + " (" + ", ".join(
+                _quote_identifier(column) + ("" if not column_type else " " + column_type)
+                for column, column_type in zip(columns, column_types)) + ")")
+            self._connection.executemany(
+                "INSERT INTO " + quoted_name + " VALUES (" + ", ".join("?" * len(columns)) + ")",
+                ([converter(value) for converter, value in zip(converters, row)] + [None] * (len(columns) - len(row))
+                 for row in rows))
+            self._connection.commit()
+
+
+def _quote_identifier(identifier: str) -> str:
+    return "\"" + identifier.replace("\"", "\"\"") + "\""
+
+
+def _from_null(value: str) -> Optional[str]:
+    return None if value == "NULL" else value
+
+
+def _from_text(value: str):
+    # Numbers are loaded as numbers when they print back the same, so they sort and compare as numbers
+    if value == "NULL":
+        return None
+    try:
+        number = int(value)
+        if str(number) == value:
+            return number
+    except ValueError:
+        try:
+            number = float(value)
+            if repr(number) == value:
+                return number
+        except ValueError:
+            pass
+
+    return value
+
+
+def _to_text(value) -> str:
+    return "NULL" if value is None else str(value)
@@ -27,6 +27,11 @@ class Connection:
     username: Optional[str]
     password: Optional[str]
     database: Optional[str]
+    # Replica serving the reads, the defaults are class attributes so the connections stored without them still load
+    read_host: Optional[str] = None
+    read_port: Optional[str] = None
+    # Seconds of replication lag after which the reads go back to the primary
+    read_max_lag: int = 30
 
 
 def store_connection(connection: Connection) -> None:
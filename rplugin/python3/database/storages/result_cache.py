@@ -0,0 +1,85 @@
+import os
+import pickle
+from dataclasses import dataclass
+from hashlib import sha1
+from os import path
+from time import time
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    key: tuple
+    # The result is stale when the change token of the database is not the same anymore
+    change_token: str
+    created_at: float
+    rows: list
+
+
+def get_cached_result(key: tuple, change_token: str, ttl: int) -> Optional[CachedResult]:
+    file_path = _get_result_file_path(key)
+    try:
+        with open(file_path, "rb") as file:
+            cached_result = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+
+    if cached_result.key != key or cached_result.change_token != change_token or \
+            time() - cached_result.created_at > ttl:
+        _remove(file_path)
+        return None
+
+    # The modification time orders the results for the eviction
+    os.utime(file_path)
+    return cached_result
+
+
+def store_result(key: tuple, change_token: str, rows: list, max_size: int) -> None:
+    folder_path = _get_result_folder_path()
+    # Other Neovim instances share the cache, the file is replaced at once
+    file_path = _get_result_file_path(key)
+    temporary_file_path = file_path + "." + str(os.getpid())
+    try:
+        os.makedirs(folder_path, exist_ok=True)
+        with open(temporary_file_path, "wb") as file:
+            pickle.dump(CachedResult(key=key, change_token=change_token, created_at=time(), rows=rows), file)
+        os.replace(temporary_file_path, file_path)
+    except OSError:
+        _remove(temporary_file_path)
+        return
+
+    _evict(folder_path, max_size)
+
+
+def _evict(folder_path: str, max_size: int) -> None:
+    # The least recently used results are removed until the cache fits in max_size bytes
+    entries = []
+    with os.scandir(folder_path) as files:
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, file_path in sorted(entries):
+        if total_size <= max_size:
+            break
+        _remove(file_path)
+        total_size -= size
+
+
+def _remove(file_path: str) -> None:
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def _get_result_file_path(key: tuple) -> str:
+    return path.join(_get_result_folder_path(), sha1(repr(key).encode("utf-8")).hexdigest())
+
+
+def _get_result_folder_path() -> str:
+    return path.join(path.expanduser("~"), ".vim-database", "results")
@@ -58,6 +58,7 @@ async def select_connection(settings: UserConfig, state: State) -> None:
 
     state.selected_connection = state.connections[connection_idx]
     state.selected_database = state.selected_connection.database
+    state.tables_page = 1
     state.sql_client = SqlClientFactory.create(state.selected_connection)
 
     # Update connections table
@@ -86,6 +87,7 @@ async def edit_connection(configs: UserConfig, state: State) -> None:
     # Delete old connection
     await run_in_executor(partial(remove_connection, old_connection))
     del state.connections[connection_idx]
+    state.invalidate_connection_cache(old_connection.name)
 
     # Store the new connection
     await run_in_executor(partial(store_connection, connection))
@@ -114,6 +116,7 @@ async def delete_connection(settings: UserConfig, state: State) -> None:
     await run_in_executor(partial(remove_connection, connection))
 
     del state.connections[connection_idx]
+    state.invalidate_connection_cache(connection.name)
     if connection.name == state.selected_connection.name:
         state.load_default_connection()
 
@@ -134,10 +137,12 @@ def _get_connections_from_state(state: State) -> Tuple[list, list, int]:
             connection.connection_type.to_string(), "" if connection.host is None else connection.host,
             "" if connection.port is None else connection.port,
             "" if connection.username is None else connection.username,
-            "" if connection.password is None else connection.password, connection.database
+            "" if connection.password is None else connection.password, connection.database,
+            "" if connection.read_host is None else connection.read_host + ":" + connection.read_port
         ])
 
-    return ["Name", "Type", "Host", "Port", "Username", "Password", "Database"], connections, selected_idx
+    return ["Name", "Type", "Host", "Port", "Username", "Password", "Database", "Read replica"], connections, \
+        selected_idx
 
 
 def _get_connection_idx(state: State) -> Optional[int]:
@@ -191,6 +196,16 @@ def _new_mysql_or_postgresql_connection(connection_type: ConnectionType,
     database = get_input("Database: ", connection.database if connection else "")
     if not database:
         return None
+    # The replica is optional, its port defaults to the port of the primary
+    read_host = get_input("Read replica host (optional): ", connection.read_host or "" if connection else "")
+    read_port = None
+    read_max_lag = Connection.read_max_lag
+    if read_host:
+        read_port = get_input("Read replica port: ", connection.read_port or port if connection else port)
+        read_max_lag = get_input("Read replica max lag (seconds): ",
+                                 str(connection.read_max_lag if connection else read_max_lag))
+        if not read_port or not read_max_lag.isdigit():
+            return None
 
     return Connection(name=name,
                       connection_type=connection_type,
@@ -198,7 +213,10 @@ def _new_mysql_or_postgresql_connection(connection_type: ConnectionType,
                       port=port,
                       username=username,
                       password=password,
-                      database=database)
+                      database=database,
+                      read_host=read_host or None,
+                      read_port=read_port,
+                      read_max_lag=int(read_max_lag))
 
 
 def _new_connection() -> Optional[Connection]:
@@ -1,22 +1,34 @@
 from functools import partial
 from typing import Optional, Tuple
 
-from .shared.get_primary_key_value import get_primary_key_value
+from .shared.get_current_cell_value import get_current_cell_value
+from .shared.get_indexes import get_condition_columns, warn_unindexed_columns
+from .shared.get_primary_key_value import get_primary_key_index, get_primary_key_value
+from .shared.large_tables import create_sample, get_scanned_rows
 from ..concurrents.executors import run_in_executor
 from ..configs.config import UserConfig
+from ..states.changeset import Changeset, diff_rows
 from ..states.state import Mode, State
 from ..transitions.shared.get_current_row_idx import get_current_row_idx
-from ..transitions.shared.show_ascii_table import show_ascii_table
-from ..transitions.shared.show_table_data import show_table_data
+from ..transitions.shared.show_table_data import (
+    confirm_discard_changes,
+    show_local_table_data,
+    show_table_data,
+    show_table_rows,
+)
+from ..utils.ascii_table import parse_ascii_table
 from ..utils.log import log
 from ..utils.nvim import (
     async_call,
+    choose,
     confirm,
     get_input,
+    get_visual_selection_rows,
 )
 from ..views.database_window import (
-    get_current_database_window_line,
-    get_current_database_window_cursor,
+    get_database_window_content,
+    is_database_window_modified,
+    set_database_window_editable,
 )
 
 
@@ -24,6 +36,9 @@ async def delete_row(configs: UserConfig, state: State) -> None:
     row_idx = await async_call(partial(get_current_row_idx, state))
     if row_idx is None:
         return
+    if configs.staged_edits:
+        await _stage_deletes(configs, state, row_idx, row_idx)
+        return
     headers, rows = state.table_data
 
     primary_key, primary_key_value = await get_primary_key_value(state, row_idx)
@@ -40,7 +55,42 @@ async def delete_row(configs: UserConfig, state: State) -> None:
     if delete_success:
         del rows[row_idx]
         state.table_data = (headers, rows)
-        await show_ascii_table(configs, headers, rows)
+        # The local copy of the table is stale
+        state.local_table = None
+        await show_table_rows(configs, state)
+
+
+async def delete_rows(configs: UserConfig, state: State) -> None:
+    start_idx, end_idx = await async_call(partial(_get_selected_row_range, state))
+    if start_idx > end_idx:
+        return
+    if configs.staged_edits:
+        await _stage_deletes(configs, state, start_idx, end_idx)
+        return
+
+    primary_key, primary_key_idx = await get_primary_key_index(state)
+    if primary_key is None:
+        return
+
+    headers, rows = state.table_data
+    primary_key_values = [row[primary_key_idx] for row in rows[start_idx:end_idx + 1]]
+    ans = await async_call(
+        partial(confirm, "Do you want to delete " + str(len(primary_key_values)) + " row(s) from " +
+                state.selected_table + "?"))
+    if not ans:
+        return
+
+    deleted_rows = await run_in_executor(
+        partial(state.sql_client.delete_rows, state.selected_database, state.selected_table, primary_key,
+                primary_key_values))
+    if deleted_rows is None:
+        return
+
+    del rows[start_idx:end_idx + 1]
+    state.table_data = (headers, rows)
+    state.local_table = None
+    await show_table_rows(configs, state)
+    log.info("[vim-database] " + str(deleted_rows) + " row(s) deleted")
 
 
 async def copy_row(configs: UserConfig, state: State) -> None:
@@ -51,50 +101,28 @@ async def copy_row(configs: UserConfig, state: State) -> None:
     if row_idx is None:
         return
 
-    headers, rows = state.table_data
-    row = rows[row_idx][:]
-
-    ans = await async_call(partial(confirm, "Do you want to copy this row?"))
-    if not ans:
-        return
+    await _copy_rows(configs, state, row_idx, row_idx)
 
-    header_map = dict()
-    for header_idx, header in enumerate(headers):
-        header_map[header] = header_idx
 
-    unique_column_names = await run_in_executor(
-        partial(state.sql_client.get_unique_columns, state.selected_database, state.selected_table))
-    if len(unique_column_names) == 0:
-        log.info("[vim-database] No unique column found")
-        return
-
-    unique_columns = []
-    new_unique_column_values = []
-    for unique_column in unique_column_names:
-        new_unique_column_value = await async_call(partial(get_input, "New unique value " + unique_column + ": "))
-        if new_unique_column_value:
-            unique_columns.append((unique_column, row[header_map[unique_column]]))
-            new_unique_column_values.append(new_unique_column_value)
-            row[header_map[unique_column]] = new_unique_column_value
-        else:
-            return
+async def copy_rows(configs: UserConfig, state: State) -> None:
+    start_idx, end_idx = await async_call(partial(_get_selected_row_range, state))
+    if start_idx > end_idx:
+        return
 
-    copy_result = await run_in_executor(
-        partial(state.sql_client.copy, state.selected_database, state.selected_table, unique_columns,
-                new_unique_column_values))
-    if copy_result:
-        rows.append(row)
-        state.table_data = (headers, rows)
-        await show_ascii_table(configs, headers, rows)
+    await _copy_rows(configs, state, start_idx, end_idx)
 
 
 async def edit_row(configs: UserConfig, state: State) -> None:
-    edit_column, edit_value, row_idx, column_idx = await _get_current_cell_value(state)
+    edit_column, edit_value, row_idx, column_idx = await get_current_cell_value(state)
     if edit_column is None:
         return
 
     new_value = await async_call(partial(get_input, "Edit column " + edit_column + ": ", edit_value))
     if new_value and new_value != edit_value:
+        if configs.staged_edits:
+            await _stage_update(configs, state, row_idx, column_idx, new_value)
+            return
+
         primary_key, primary_key_value = await get_primary_key_value(state, row_idx)
         if primary_key is None:
             return
@@ -113,12 +141,144 @@ async def edit_row(configs: UserConfig, state: State) -> None:
             data_headers, data_rows = state.table_data
             data_rows[row_idx][column_idx] = new_value
             state.table_data = (data_headers, data_rows)
-            await show_ascii_table(configs, data_headers, data_rows)
+            state.local_table = None
+            await show_table_rows(configs, state)
+
+
+async def commit_changes(configs: UserConfig, state: State) -> None:
+    if not state.changeset:
+        log.info("[vim-database] No pending changes")
+        return
+
+    changeset = state.changeset
+    _, primary_key_idx = await get_primary_key_index(state)
+    if primary_key_idx is None:
+        return
+
+    headers, rows = state.table_data
+    statements = changeset.get_statements(headers, primary_key_idx)
+    ans = await async_call(
+        partial(confirm, "Do you want to commit " + str(len(changeset)) + " pending change(s) to " + changeset.table +
+                "?"))
+    if not ans:
+        return
+
+    affected_rows = await run_in_executor(
+        partial(state.sql_client.run_transaction, state.selected_database, statements))
+    if affected_rows is None:
+        # Nothing was applied, the changes stay pending
+        return
+
+    state.changeset = None
+    if changeset.copies:
+        # The values of the copied rows are generated by the server
+        await show_table_data(configs, state, state.selected_table)
+    else:
+        for row_idx in sorted(changeset.deletes, reverse=True):
+            del rows[row_idx]
+        await show_table_rows(configs, state)
+    log.info("[vim-database] " + str(len(changeset)) + " change(s) committed")
+
+
+async def discard_changes(configs: UserConfig, state: State) -> None:
+    if not state.changeset:
+        log.info("[vim-database] No pending changes")
+        return
+
+    changeset = state.changeset
+    _, rows = state.table_data
+    for row_idx, original in changeset.originals.items():
+        rows[row_idx] = original
+    del rows[changeset.base_rows:]
+    state.changeset = None
+    await show_table_rows(configs, state)
+    log.info("[vim-database] " + str(len(changeset)) + " change(s) discarded")
+
+
+async def edit_table(configs: UserConfig, state: State) -> None:
+    if state.editing_table:
+        ans = not await async_call(is_database_window_modified) or await async_call(
+            partial(confirm, "Discard the changes of " + state.selected_table + "?"))
+        if ans:
+            await _stop_editing_table(configs, state)
+            await show_table_rows(configs, state)
+        return
+
+    if state.changeset:
+        log.info("[vim-database] Commit or discard the pending changes first")
+        return
+
+    primary_key, _ = await get_primary_key_index(state)
+    if primary_key is None:
+        return
+    if state.filtered_columns and primary_key not in state.filtered_columns:
+        log.info("[vim-database] The primary key column " + primary_key + " must be shown to edit the table")
+        return
+
+    state.editing_table = True
+    await async_call(partial(set_database_window_editable, configs, state.selected_table))
+    log.info("[vim-database] Editing " + state.selected_table + ", write the buffer to apply the changes")
+
+
+async def write_table(configs: UserConfig, state: State) -> None:
+    if not state.editing_table:
+        return
+
+    lines = await async_call(get_database_window_content)
+    if lines is None:
+        return
+
+    try:
+        edited_headers, edited_rows = parse_ascii_table(lines)
+    except ValueError as error:
+        log.info("[vim-database] " + str(error))
+        return
+
+    headers, rows = state.table_data
+    shown_headers = [header for header in headers if not state.filtered_columns or header in state.filtered_columns]
+    if edited_headers != shown_headers:
+        log.info("[vim-database] The table header can not be changed")
+        return
+
+    primary_key, primary_key_idx = await get_primary_key_index(state)
+    if primary_key is None:
+        return
+
+    try:
+        changeset = diff_rows(state.selected_table, primary_key, headers, rows, edited_headers, edited_rows)
+    except ValueError as error:
+        log.info("[vim-database] " + str(error))
+        return
+
+    if not changeset:
+        await _stop_editing_table(configs, state)
+        log.info("[vim-database] No changes")
+        return
+
+    statements = changeset.get_statements(headers, primary_key_idx)
+    ans = await async_call(
+        partial(
+            confirm, "Update " + str(len(changeset.updates)) + ", insert " + str(len(changeset.inserts)) +
+            " and delete " + str(len(changeset.deletes)) + " row(s) of " + state.selected_table + "?"))
+    if not ans:
+        return
+
+    affected_rows = await run_in_executor(
+        partial(state.sql_client.run_transaction, state.selected_database, statements))
+    if affected_rows is None:
+        # Nothing was applied, the buffer is kept for another try
+        return
+
+    await _stop_editing_table(configs, state)
+    await show_table_data(configs, state, state.selected_table)
+    log.info("[vim-database] " + str(len(changeset)) + " change(s) applied")
 
 
 async def filter_columns(configs: UserConfig, state: State) -> None:
     if state.mode != Mode.QUERY or state.user_query:
         return
+    if not await confirm_discard_changes(state):
+        return
 
     filtered_columns = await async_call(partial(get_input, "Filter columns: ", ", ".join(state.filtered_columns)))
     filtered_columns = filtered_columns if filtered_columns is None else filtered_columns.strip()
@@ -132,19 +292,28 @@ async def filter_columns(configs: UserConfig, state: State) -> None:
 
 
 async def order(configs: UserConfig, state: State, orientation: str) -> None:
-    if state.mode != Mode.QUERY or state.user_query:
+    if state.mode != Mode.QUERY or (state.user_query and state.local_table is None):
         return
 
-    order_column, _, _, _ = await _get_current_cell_value(state)
-    if order_column is None:
+    order_column, _, _, _ = await get_current_cell_value(state)
+    if order_column is None or not await confirm_discard_changes(state):
         return
 
     state.order = (order_column, orientation)
+    if await show_local_table_data(configs, state) or state.user_query:
+        return
+    await warn_unindexed_columns(state, [order_column], "ordering")
 
     await show_table_data(configs, state, state.selected_table)
 
 
 async def row_filter(configs: UserConfig, state: State) -> None:
+    if state.user_query and state.local_table is None:
+        log.info("[vim-database] The result is not in the local workspace, it can not be filtered")
+        return
+
+    if not await confirm_discard_changes(state):
+        return
 
     def get_filter_condition() -> Optional[str]:
         condition = state.query_conditions if state.query_conditions is not None else ""
@@ -153,12 +322,98 @@ async def row_filter(configs: UserConfig, state: State) -> None:
     filter_condition = await async_call(get_filter_condition)
     filter_condition = filter_condition if filter_condition is None else filter_condition.strip()
     if filter_condition:
+        query_conditions = state.query_conditions
         state.current_page = 1
         state.query_conditions = filter_condition
+        state.rows_limit = None
+        if await show_local_table_data(configs, state) or state.user_query:
+            return
+        if configs.filter_guard and not await _guard_filter(configs, state):
+            state.query_conditions = query_conditions
+            return
+        headers, _ = state.table_data
+        await warn_unindexed_columns(state, get_condition_columns(filter_condition, headers), "filter")
         await show_table_data(configs, state, state.selected_table)
 
 
+async def clear_row_filter(configs: UserConfig, state: State) -> None:
+    if not await confirm_discard_changes(state):
+        return
+
+    state.query_conditions = None
+    state.rows_limit = None
+    log.info("[vim-database] Filter was cleared")
+    if not await show_local_table_data(configs, state) and not state.user_query:
+        await show_table_data(configs, state, state.selected_table)
+
+
+async def _guard_filter(configs: UserConfig, state: State) -> bool:
+    # The filter can be narrowed before it scans a large table
+    table = state.selected_table
+    table_rows = await get_scanned_rows(configs, state)
+    if table_rows is None:
+        return True
+
+    choices = ["&Continue", "&Tighter limit", "&Sample", "C&ancel"]
+    choice = await async_call(
+        partial(choose, "The filter scans the whole " + table + " table (~" + str(table_rows) + " rows)", choices))
+    choice = choices[choice - 1] if choice > 0 else "C&ancel"
+
+    if choice == "&Tighter limit":
+        rows_limit = await async_call(partial(get_input, "Rows limit: ", str(min(configs.rows_limit, 10))))
+        if not rows_limit or not rows_limit.strip().isdigit() or int(rows_limit) <= 0:
+            return False
+        state.rows_limit = int(rows_limit)
+    elif choice == "&Sample":
+        state.sample = await create_sample(configs, state, configs.large_table_rows * 100 / table_rows)
+        log.info("[vim-database] Filtering a " + "{:g}".format(state.sample.rate) + "% sample of " + table +
+                 ", press gs to stop sampling")
+
+    return choice != "C&ancel"
+
+
+async def toggle_sample(configs: UserConfig, state: State) -> None:
+    if state.mode != Mode.QUERY or state.user_query or not await confirm_discard_changes(state):
+        return
+
+    if state.sample is None:
+        state.sample = await create_sample(configs, state, configs.sample_rate)
+        log.info("[vim-database] Browsing a " + "{:g}".format(state.sample.rate) + "% sample of " +
+                 state.selected_table)
+    else:
+        state.sample = None
+        log.info("[vim-database] Stopped sampling " + state.selected_table)
+
+    state.current_page = 1
+    await show_table_data(configs, state, state.selected_table)
+
+
+async def change_sample_rate(configs: UserConfig, state: State) -> None:
+    if state.mode != Mode.QUERY or state.user_query or not await confirm_discard_changes(state):
+        return
+
+    sample_rate = configs.sample_rate if state.sample is None else state.sample.rate
+    sample_rate = await async_call(partial(get_input, "Sample rate (%): ", "{:g}".format(sample_rate)))
+    if not sample_rate:
+        return
+    try:
+        sample_rate = float(sample_rate)
+    except ValueError:
+        sample_rate = 0
+    if not 0 < sample_rate <= 100:
+        log.info("[vim-database] The sample rate must be a percentage greater than 0")
+        return
+
+    # A new rate draws a new sample
+    state.sample = await create_sample(configs, state, sample_rate)
+    state.current_page = 1
+    await show_table_data(configs, state, state.selected_table)
+
+
 async def next_page(configs: UserConfig, state: State) -> None:
+    if not await confirm_discard_changes(state):
+        return
+
     state.current_page += 1
     await show_table_data(configs, state, state.selected_table)
 
@@ -170,7 +425,7 @@ async def next_page(configs: UserConfig, state: State) -> None:
 
 
 async def previous_page(configs: UserConfig, state: State) -> None:
-    if state.current_page <= 1:
+    if state.current_page <= 1 or not await confirm_discard_changes(state):
         return
 
     state.current_page -= 1
@@ -179,30 +434,130 @@ async def previous_page(configs: UserConfig, state: State) -> None:
     log.info("[vim-database] Page " + str(state.current_page))
 
 
-def _get_current_row_and_column(state: State) -> Tuple[Optional[int], Optional[int]]:
-    row_cursor, column_cursor = get_current_database_window_cursor()
+async def _get_changeset(state: State) -> Optional[Changeset]:
+    if state.changeset is None:
+        primary_key, _ = await get_primary_key_index(state)
+        if primary_key is None:
+            return None
+
+        _, rows = state.table_data
+        state.changeset = Changeset(table=state.selected_table, primary_key=primary_key, base_rows=len(rows))
+
+    return state.changeset
+
 
+async def _copy_rows(configs: UserConfig, state: State, start_idx: int, end_idx: int) -> None:
+    primary_key, primary_key_idx = await get_primary_key_index(state)
+    if primary_key is None:
+        return
+
+    changeset = None
+    if configs.staged_edits:
+        changeset = await _get_changeset(state)
+        if changeset is None:
+            return
+        if any(changeset.is_copy(row_idx) or row_idx in changeset.updates for row_idx in range(start_idx, end_idx + 1)):
+            log.info("[vim-database] Commit the pending changes of the rows before copying them")
+            return
+
+    unique_columns = await run_in_executor(
+        partial(state.sql_client.get_unique_columns, state.selected_database, state.selected_table))
+    if unique_columns is None:
+        return
+
+    # The rows are cloned by the server, so the new unique values are SQL expressions evaluated for every copied row
+    # eg: id + 1000, email || '.copy' or nextval('users_id_seq')
+    expressions = dict()
+    for unique_column in dict.fromkeys(unique_columns):
+        expression = await async_call(
+            partial(get_input, "New value of " + unique_column + " (SQL expression, empty for the default value): "))
+        expressions[unique_column] = expression.strip()
+
+    headers, rows = state.table_data
+    primary_key_values = [row[primary_key_idx] for row in rows[start_idx:end_idx + 1]]
+    new_values = ", ".join(column + " = " + (expression or "DEFAULT") for column, expression in expressions.items())
+    ans = await async_call(
+        partial(confirm, "Do you want to copy " + str(len(primary_key_values)) + " row(s)" +
+                (" with " + new_values if new_values else "") + "?"))
+    if not ans:
+        return
+
+    if changeset is not None:
+        for row_idx in range(start_idx, end_idx + 1):
+            row = rows[row_idx][:]
+            for column_idx, header in enumerate(headers):
+                if header in expressions:
+                    row[column_idx] = expressions[header] or "DEFAULT"
+            changeset.copies.append((rows[row_idx][primary_key_idx], expressions))
+            rows.append(row)
+        await show_table_rows(configs, state)
+        return
+
+    copied_rows = await run_in_executor(
+        partial(state.sql_client.copy_rows, state.selected_database, state.selected_table, headers, primary_key,
+                primary_key_values, expressions))
+    if copied_rows is None:
+        return
+
+    await show_table_data(configs, state, state.selected_table)
+    log.info("[vim-database] " + str(copied_rows) + " row(s) copied")
+
+
+async def _stage_deletes(configs: UserConfig, state: State, start_idx: int, end_idx: int) -> None:
+    changeset = await _get_changeset(state)
+    if changeset is None:
+        return
+
+    _, primary_key_idx = await get_primary_key_index(state)
     _, rows = state.table_data
-    row_size = len(rows)
+    row_indices = [row_idx for row_idx in range(start_idx, end_idx + 1) if not changeset.is_copy(row_idx)]
+    copy_indices = [row_idx for row_idx in range(start_idx, end_idx + 1) if changeset.is_copy(row_idx)]
+
+    # Deleting rows which are all staged for deletion unstages them
+    if row_indices and all(row_idx in changeset.deletes for row_idx in row_indices):
+        for row_idx in row_indices:
+            del changeset.deletes[row_idx]
+    else:
+        for row_idx in row_indices:
+            changeset.deletes[row_idx] = changeset.originals.get(row_idx, rows[row_idx])[primary_key_idx]
+
+    # Staged copies are not in the database yet, they are dropped right away
+    for row_idx in reversed(copy_indices):
+        del changeset.copies[row_idx - changeset.base_rows]
+        del rows[row_idx]
 
-    # Minus 4 for header of the table
-    row_idx = row_cursor - 4
-    line = get_current_database_window_line()
-    if row_idx < 0 or row_idx >= row_size or line is None or line[column_cursor] == '|':
-        return None, None
+    await show_table_rows(configs, state)
 
-    column_idx = 0
-    for i in range(column_cursor):
-        if line[i] == '|':
-            column_idx += 1
 
-    return row_idx, column_idx - 1
+async def _stage_update(configs: UserConfig, state: State, row_idx: int, column_idx: int, new_value: str) -> None:
+    changeset = await _get_changeset(state)
+    if changeset is None:
+        return
+    if changeset.is_copy(row_idx):
+        log.info("[vim-database] Staged copies can not be modified")
+        return
 
+    headers, rows = state.table_data
+    original = changeset.originals.setdefault(row_idx, rows[row_idx][:])
+    columns = changeset.updates.setdefault(row_idx, dict())
+    if new_value == original[column_idx]:
+        columns.pop(headers[column_idx], None)
+    else:
+        columns[headers[column_idx]] = new_value
+    if not columns:
+        del changeset.updates[row_idx]
+
+    rows[row_idx][column_idx] = new_value
+    await show_table_rows(configs, state)
+
+
+def _get_selected_row_range(state: State) -> Tuple[int, int]:
+    start_row, end_row = get_visual_selection_rows()
+    _, rows = state.table_data
+    # Minus 4 for header of the table, rows outside of the table body are ignored
+    return max(start_row - 4, 0), min(end_row - 4, len(rows) - 1)
 
-async def _get_current_cell_value(state: State) -> Tuple[Optional[str], Optional[str], Optional[int], Optional[int]]:
-    row, column = await async_call(partial(_get_current_row_and_column, state))
-    if row is None:
-        return None, None, None, None
 
-    data_headers, data_rows = state.table_data
-    return data_headers[column], data_rows[row][column], row, column
+async def _stop_editing_table(configs: UserConfig, state: State) -> None:
+    state.editing_table = False
+    await async_call(partial(set_database_window_editable, configs, None))
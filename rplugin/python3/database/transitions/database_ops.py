@@ -1,6 +1,9 @@
 from functools import partial
 from typing import Optional, Tuple
 
+from pynvim.api.window import Window
+
+from .shared.revalidate import revalidate
 from ..concurrents.executors import run_in_executor
 from ..configs.config import UserConfig
 from ..sql_clients.sql_client_factory import SqlClientFactory
@@ -15,6 +18,7 @@ from ..utils.nvim import (
 from ..views.database_window import (
     open_database_window,
     get_current_database_window_row,
+    is_database_window_open,
 )
 
 
@@ -26,11 +30,34 @@ async def show_databases(configs: UserConfig, state: State) -> None:
     state.mode = Mode.DATABASE
     window = await async_call(partial(open_database_window, configs))
 
-    state.databases = await run_in_executor(state.sql_client.get_databases)
+    connection = state.selected_connection
+    sql_client = state.sql_client
+    cached_databases = state.databases_cache.get(connection.name)
+    if cached_databases is None:
+        databases = await run_in_executor(sql_client.get_databases)
+        state.databases = databases or []
+        if databases is not None:
+            state.databases_cache[connection.name] = databases
+        await _render_databases(window, state)
+        return
 
-    database_headers, database_rows, selected_index = _get_databases_from_state(state)
-    await async_call(partial(render, window, ascii_table(database_headers, database_rows)))
-    await async_call(partial(set_cursor, window, (selected_index + 4, 0)))
+    # Render the last known databases right away and refresh them in the background
+    state.databases = cached_databases
+    await _render_databases(window, state)
+
+    async def apply(databases: list) -> None:
+        state.databases_cache[connection.name] = databases
+        if state.mode != Mode.DATABASE or state.selected_connection is not connection or state.databases == databases:
+            return
+        if not await async_call(is_database_window_open):
+            return
+
+        state.databases = databases
+        database_headers, database_rows, _ = _get_databases_from_state(state)
+        window = await async_call(partial(open_database_window, configs))
+        await async_call(partial(render, window, ascii_table(database_headers, database_rows)))
+
+    revalidate(("databases", connection.name), sql_client.get_databases, apply)
 
 
 async def select_database(configs: UserConfig, state: State) -> None:
@@ -39,6 +66,7 @@ async def select_database(configs: UserConfig, state: State) -> None:
         return
 
     state.selected_database = state.databases[database_idx]
+    state.tables_page = 1
     state.sql_client = SqlClientFactory.create(state.selected_connection)
 
     # Update databases table
@@ -50,6 +78,12 @@ async def select_database(configs: UserConfig, state: State) -> None:
     await show_databases(configs, state)
 
 
+async def _render_databases(window: Window, state: State) -> None:
+    database_headers, database_rows, selected_index = _get_databases_from_state(state)
+    await async_call(partial(render, window, ascii_table(database_headers, database_rows)))
+    await async_call(partial(set_cursor, window, (selected_index + 4, 0)))
+
+
 def _get_database_index(state: State) -> Optional[int]:
     row = get_current_database_window_row()
     database_size = len(state.databases)
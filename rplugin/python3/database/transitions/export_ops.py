@@ -0,0 +1,79 @@
+import os
+from asyncio import ensure_future, wait
+from functools import partial
+from time import monotonic
+from typing import Optional, Tuple
+
+from .shared.show_table_data import get_table_query
+from .table_ops import get_table_idx
+from ..concurrents.executors import run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client import ExportFormat, ExportProgress
+from ..states.state import Mode, State
+from ..utils.log import log
+from ..utils.nvim import (
+    async_call,
+    get_input,
+)
+
+_JSONL_EXTENSIONS = (".jsonl", ".ndjson", ".json")
+# Seconds between two progress reports
+_PROGRESS_INTERVAL = 2
+
+
+async def export(configs: UserConfig, state: State, path: Optional[str]) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    query, name = await _get_export_query(state)
+    if query is None:
+        log.info("[vim-database] Nothing to export, select a table or run a query first")
+        return
+
+    if not path:
+        path = await async_call(partial(get_input, "Export to: ", name + ".csv"))
+        if not path:
+            return
+
+    path = os.path.abspath(os.path.expanduser(path.strip()))
+    export_format = ExportFormat.JSONL if path.lower().endswith(_JSONL_EXTENSIONS) else ExportFormat.CSV
+    progress = ExportProgress()
+    # The export can take a while, it keeps running when the plugin is used for something else
+    export_task = partial(state.sql_client.export, state.selected_database, query, path, export_format, progress)
+
+    async def run() -> None:
+        start_time = monotonic()
+        task = ensure_future(run_in_executor(export_task))
+        while not task.done():
+            await wait([task], timeout=_PROGRESS_INTERVAL)
+            if not task.done():
+                log.info("[vim-database] Exporting " + name + ": " + _format_progress(progress, start_time))
+
+        if task.result():
+            log.info("[vim-database] Exported " + name + " to " + path + ": " + _format_progress(progress, start_time))
+
+    log.info("[vim-database] Exporting " + name + " to " + path)
+    run_in_background(run())
+
+
+async def _get_export_query(state: State) -> Tuple[Optional[str], str]:
+    if state.mode == Mode.QUERY and state.user_query:
+        return state.last_query, "query"
+
+    if state.mode == Mode.QUERY and state.selected_table is not None:
+        # Same rows as the table view, without the paging
+        return get_table_query(state, state.selected_table), state.selected_table
+
+    if state.mode == Mode.TABLE:
+        table_idx = await async_call(partial(get_table_idx, state))
+        if table_idx is not None:
+            table = state.tables[table_idx]
+            return "SELECT * FROM " + table, table
+
+    return None, ""
+
+
+def _format_progress(progress: ExportProgress, start_time: float) -> str:
+    return str(progress.rows) + " rows, " + "{:.1f}".format(progress.bytes / (1024 * 1024)) + " MB in " + \
+        "{:.1f}".format(monotonic() - start_time) + "s"
@@ -0,0 +1,103 @@
+from functools import partial
+from typing import Optional
+
+from .shared.get_current_cell_value import get_current_cell_value
+from .shared.large_tables import create_sample, get_scanned_rows
+from .shared.show_table_data import confirm_discard_changes, get_table_source, show_table_data
+from ..concurrents.executors import run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client import quote
+from ..states.state import Mode, State
+from ..utils.ascii_table import ascii_table
+from ..utils.log import log
+from ..utils.nvim import (
+    async_call,
+    render,
+    set_cursor,
+)
+from ..views.database_window import get_current_database_window_row, open_database_window
+
+
+async def show_column_facets(configs: UserConfig, state: State) -> None:
+    if state.mode != Mode.QUERY or state.user_query:
+        return
+
+    column, _, _, _ = await get_current_cell_value(state)
+    if column is not None:
+        await _query_facets(configs, state, column)
+
+
+async def refresh_facets(configs: UserConfig, state: State) -> None:
+    if state.facets is not None:
+        column, _ = state.facets
+        await _query_facets(configs, state, column)
+
+
+async def show_facets(configs: UserConfig, state: State) -> None:
+    column, facets = state.facets
+    state.mode = Mode.FACETS
+    rows = [["NULL" if is_null else value, count] for value, count, is_null in facets]
+    window = await async_call(partial(open_database_window, configs))
+    await async_call(partial(render, window, ascii_table([column, "Count"], rows)))
+    await async_call(partial(set_cursor, window, (4, 0)))
+
+
+async def select_facet(configs: UserConfig, state: State) -> None:
+    facet_idx = await async_call(partial(_get_facet_idx, state))
+    if facet_idx is None or not await confirm_discard_changes(state):
+        return
+
+    column, facets = state.facets
+    value, _, is_null = facets[facet_idx]
+    condition = column + (" IS NULL" if is_null else " = " + quote(value))
+    state.query_conditions = condition if state.query_conditions is None else \
+        "(" + state.query_conditions + ") AND " + condition
+    state.rows_limit = None
+    state.current_page = 1
+    await show_table_data(configs, state, state.selected_table)
+
+
+async def _query_facets(configs: UserConfig, state: State, column: str) -> None:
+    table = state.selected_table
+    sample = state.sample
+    if sample is None:
+        # The counts of a large table are estimated from a sample of about large_table_rows rows
+        table_rows = await get_scanned_rows(configs, state)
+        if table_rows is not None:
+            sample = await create_sample(configs, state, configs.large_table_rows * 100 / table_rows)
+    if sample is not None and state.sql_client.get_sample_source(table, sample) is None:
+        # The whole table is read, its counts are exact
+        sample = None
+
+    query = "SELECT " + column + ", COUNT(*), CASE WHEN " + column + " IS NULL THEN 1 ELSE 0 END FROM (" + \
+            get_table_source(state, table, sample) + ") vd_facets GROUP BY " + column + " ORDER BY 2 DESC LIMIT " + \
+            str(configs.rows_limit)
+    result = await run_in_executor(
+        partial(state.sql_client.run_query_with_timeout, state.selected_database, query, configs.facet_timeout))
+    if result is None:
+        log.info("[vim-database] The facets of " + column + " failed or took more than " +
+                 str(configs.facet_timeout) + "s")
+        return
+
+    facets = []
+    for row in result[1:]:
+        if len(row) != 3:
+            continue
+        value, count, is_null = row
+        # The sample thins the whole table at its rate, so the counts scale by it
+        if sample is not None and count.isdigit():
+            count = "~" + str(round(int(count) * 100 / sample.rate))
+        facets.append((value, count, is_null == "1"))
+
+    state.facets = (column, facets)
+    if sample is not None:
+        log.info("[vim-database] Counted the values of " + column + " in a " + "{:g}".format(sample.rate) +
+                 "% sample of " + table)
+    await show_facets(configs, state)
+
+
+def _get_facet_idx(state: State) -> Optional[int]:
+    _, facets = state.facets
+    # Minus 4 for header of the table
+    facet_idx = get_current_database_window_row() - 4
+    return None if facet_idx < 0 or facet_idx >= len(facets) else facet_idx
@@ -0,0 +1,206 @@
+import csv
+import os
+import re
+from dataclasses import dataclass
+from functools import partial
+from time import monotonic
+from typing import IO, Iterator, Optional, Tuple
+
+from .table_ops import get_table_idx
+from ..concurrents.executors import run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client import SqlClient
+from ..states.state import Mode, State
+from ..utils.log import log
+from ..utils.nvim import (
+    async_call,
+    confirm,
+    get_input,
+)
+
+_INTEGER_TYPE_PATTERN = re.compile(r"^((tiny|small|medium|big)?int(eger)?|(small|big)?serial)\b")
+_NUMERIC_TYPE_PATTERN = re.compile(r"^(numeric|decimal|real|float|double)\b")
+_INTEGER_PATTERN = re.compile(r"^[+-]?\d+$")
+
+
+@dataclass(frozen=False)
+class ImportProgress:
+    rows: int = 0
+    rejected_rows: int = 0
+
+
+@dataclass(frozen=True)
+class ImportColumn:
+    name: str
+    data_type: str
+    nullable: bool
+    # Position of the column in the CSV file
+    index: int
+
+
+async def import_csv(configs: UserConfig, state: State, path: Optional[str]) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    table = await _get_import_table(state)
+    if table is None:
+        table = await async_call(partial(get_input, "Import into table: "))
+        if not table:
+            return
+
+    if not path:
+        path = await async_call(partial(get_input, "Import from: ", table + ".csv"))
+        if not path:
+            return
+
+    path = os.path.abspath(os.path.expanduser(path.strip()))
+    if not os.path.isfile(path):
+        log.info("[vim-database] File not found: " + path)
+        return
+
+    table_columns = await run_in_executor(
+        partial(state.sql_client.get_columns, state.selected_database, table))
+    if not table_columns:
+        log.info("[vim-database] No column found for table " + table)
+        return
+
+    headers = await run_in_executor(partial(_read_header, path))
+    if headers is None:
+        log.info("[vim-database] The file is empty")
+        return
+
+    # CSV columns are mapped to the table columns by name, the unknown ones are skipped
+    columns_by_name = {column[0].lower(): column for column in table_columns}
+    columns = []
+    ignored_headers = []
+    for index, header in enumerate(headers):
+        column = columns_by_name.pop(header.strip().lower(), None)
+        if column is None:
+            ignored_headers.append(header)
+        else:
+            name, data_type, nullable, _ = column
+            columns.append(ImportColumn(name=name, data_type=data_type.lower(), nullable=nullable == "YES",
+                                        index=index))
+    if not columns:
+        log.info("[vim-database] No column of " + table + " found in the file header")
+        return
+
+    # Identity, serial and AUTO_INCREMENT keys are reported with a default
+    missing_columns = [name for name, _, nullable, default in columns_by_name.values() if nullable == "NO" and not
+                       (default and default != "NULL")]
+    if missing_columns:
+        log.info("[vim-database] Missing required column(s): " + ", ".join(missing_columns))
+        return
+
+    ans = await async_call(
+        partial(
+            confirm, "Import " + os.path.basename(path) + " into " + table + " (" +
+            ", ".join(column.name for column in columns) + ")" +
+            (", ignored column(s): " + ", ".join(ignored_headers) if ignored_headers else "") + "?"))
+    if not ans:
+        return
+
+    sql_client = state.sql_client
+    database = state.selected_database
+    report_path = path + ".errors"
+
+    async def run() -> None:
+        start_time = monotonic()
+        progress = ImportProgress()
+        imported = await run_in_executor(
+            partial(_import_rows, sql_client, database, table, path, columns, report_path, progress))
+        elapsed_time = monotonic() - start_time
+
+        message = "Imported " + str(progress.rows) + " rows into " + table if imported else \
+            "Failed to import " + os.path.basename(path) + ", no row was imported"
+        message += " in " + "{:.1f}".format(elapsed_time) + "s"
+        if imported:
+            message += " (" + str(int(progress.rows / max(elapsed_time, 0.001))) + " rows/s)"
+        if progress.rejected_rows:
+            message += ", " + str(progress.rejected_rows) + " rejected row(s) reported in " + report_path
+        log.info("[vim-database] " + message)
+
+    log.info("[vim-database] Importing " + os.path.basename(path) + " into " + table)
+    run_in_background(run())
+
+
+async def _get_import_table(state: State) -> Optional[str]:
+    if state.mode == Mode.QUERY and not state.user_query:
+        return state.selected_table
+
+    if state.mode == Mode.TABLE:
+        table_idx = await async_call(partial(get_table_idx, state))
+        if table_idx is not None:
+            return state.tables[table_idx]
+
+    return None
+
+
+def _read_header(path: str) -> Optional[list]:
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        return next(csv.reader(file), None)
+
+
+def _import_rows(sql_client: SqlClient, database: str, table: str, path: str, columns: list, report_path: str,
+                 progress: ImportProgress) -> bool:
+    with open(path, newline="", encoding="utf-8-sig") as file, open(report_path, "w", encoding="utf-8") as report:
+        reader = csv.reader(file)
+        num_headers = len(next(reader))
+        result = sql_client.import_rows(database, table, [column.name for column in columns],
+                                        _validate_rows(reader, num_headers, columns, report, progress))
+        if result is not None and result.rows < progress.rows:
+            # The database skipped rows without failing the import
+            skipped_rows = progress.rows - result.rows
+            progress.rows = result.rows
+            progress.rejected_rows += skipped_rows
+            report.write(str(skipped_rows) + " row(s) rejected by the database\n")
+            report.writelines(message + "\n" for message in result.messages)
+
+    if progress.rejected_rows == 0:
+        os.remove(report_path)
+
+    return result is not None
+
+
+def _validate_rows(reader: Iterator[list], num_headers: int, columns: list, report: IO[str],
+                   progress: ImportProgress) -> Iterator[list]:
+    # Invalid rows are reported and skipped before they reach the database, empty values are loaded as NULL
+    for row in reader:
+        if not row:
+            continue
+
+        error = None
+        values = []
+        if len(row) != num_headers:
+            error = "expected " + str(num_headers) + " values, found " + str(len(row))
+        else:
+            for column in columns:
+                value, error = _validate_value(row[column.index], column)
+                if error is not None:
+                    break
+                values.append(value)
+
+        if error is not None:
+            progress.rejected_rows += 1
+            report.write("line " + str(reader.line_num) + ": " + error + "\n")
+            continue
+
+        progress.rows += 1
+        yield values
+
+
+def _validate_value(value: str, column: ImportColumn) -> Tuple[Optional[str], Optional[str]]:
+    if value == "":
+        return None, None if column.nullable else column.name + " can not be NULL"
+
+    if _INTEGER_TYPE_PATTERN.match(column.data_type) and not _INTEGER_PATTERN.match(value):
+        return None, column.name + " is not an integer: " + value
+
+    if _NUMERIC_TYPE_PATTERN.match(column.data_type):
+        try:
+            float(value)
+        except ValueError:
+            return None, column.name + " is not a number: " + value
+
+    return value, None
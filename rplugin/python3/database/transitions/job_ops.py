@@ -0,0 +1,160 @@
+from asyncio import ensure_future, wait
+from functools import partial
+from itertools import count, cycle
+from time import monotonic
+from typing import Optional
+
+from .query_ops import get_statement_summary, get_statements
+from ..concurrents.executors import get_transition_lock, run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..states.query_job import JobStatus, QueryJob
+from ..states.state import Mode, State
+from ..utils.ascii_table import ascii_table
+from ..utils.log import log
+from ..utils.sql_splitter import find_statement
+from ..utils.nvim import (
+    async_call,
+    confirm,
+    set_cursor,
+    render,
+)
+from ..views.database_window import (
+    get_current_database_window_row,
+    is_database_window_open,
+    open_database_window,
+)
+from ..views.job_window import (
+    create_job_buffer,
+    delete_job_buffer,
+    open_job_buffer,
+    render_job_buffer,
+)
+from ..views.query_window import close_query_window
+
+_SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+# Seconds between two frames of the spinner
+_SPINNER_INTERVAL = 0.1
+_job_ids = count(1)
+
+
+async def run_query_job(configs: UserConfig, state: State, selection: bool) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    statements, offset = await get_statements(state, selection)
+    if selection and len(statements) > 1:
+        log.info("[vim-database] A job runs a single statement, select one statement or use the cursor")
+        return
+
+    statement = find_statement(statements, offset)
+    if statement is None:
+        return
+
+    job_id = next(_job_ids)
+    buffer = await async_call(partial(create_job_buffer, job_id))
+    job = QueryJob(job_id=job_id,
+                   connection_name=state.selected_connection.name,
+                   database=state.selected_database,
+                   query=statement.text,
+                   buffer=buffer,
+                   start_time=monotonic())
+    state.jobs[job_id] = job
+    await async_call(close_query_window)
+
+    # The job keeps its own client, the plugin can switch to another connection meanwhile
+    sql_client = state.sql_client
+
+    async def run() -> None:
+        task = ensure_future(run_in_executor(partial(sql_client.run_query, job.database, job.query)))
+        for frame in cycle(_SPINNER_FRAMES):
+            await wait([task], timeout=_SPINNER_INTERVAL)
+            if task.done():
+                break
+            await async_call(
+                partial(render_job_buffer, buffer, [
+                    frame + " Running for " + _format_elapsed_time(job) + " on " + job.connection_name + "/" +
+                    job.database, ""
+                ] + job.query.splitlines()))
+
+        query_result: Optional[list] = task.result()
+        job.end_time = monotonic()
+        if query_result is None:
+            job.status = JobStatus.FAILED
+            message = "Job #" + str(job_id) + " failed after " + _format_elapsed_time(job)
+            lines = [message + ", see the messages for the error", ""] + job.query.splitlines()
+        elif len(query_result) < 2:
+            job.status = JobStatus.DONE
+            job.rows = 0
+            message = "Job #" + str(job_id) + " executed in " + _format_elapsed_time(job)
+            lines = [message, ""] + job.query.splitlines()
+        else:
+            job.status = JobStatus.DONE
+            job.rows = len(query_result) - 1
+            message = "Job #" + str(job_id) + " returned " + str(job.rows) + " row(s) in " + _format_elapsed_time(job)
+            lines = [message + " on " + job.connection_name + "/" + job.database, ""] + \
+                ascii_table(query_result[0], query_result[1:])
+
+        await async_call(partial(render_job_buffer, buffer, lines))
+        log.info("[vim-database] " + message + ", :VDJobs to open the result")
+        # The job list is redrawn between two transitions, while it is still the view of the window
+        async with get_transition_lock():
+            if state.mode == Mode.JOBS and await async_call(is_database_window_open):
+                await show_jobs(configs, state)
+
+    log.info("[vim-database] Job #" + str(job_id) + " started")
+    run_in_background(run())
+
+
+async def show_jobs(configs: UserConfig, state: State) -> None:
+    window = await async_call(partial(open_database_window, configs))
+    state.mode = Mode.JOBS
+
+    rows = [[
+        str(job.job_id), job.connection_name, job.database,
+        job.status.to_string(),
+        _format_elapsed_time(job), "" if job.rows is None else str(job.rows),
+        get_statement_summary(job.query)
+    ] for job in state.jobs.values()]
+    await async_call(
+        partial(render, window, ascii_table(["#", "Connection", "Database", "Status", "Time", "Rows", "Query"], rows)))
+    await async_call(partial(set_cursor, window, (4, 0)))
+
+
+async def open_job(_: UserConfig, state: State) -> None:
+    job = await async_call(partial(_get_current_job, state))
+    if job is None:
+        return
+
+    opened = await async_call(partial(open_job_buffer, job.buffer))
+    if not opened:
+        log.info("[vim-database] The result of job #" + str(job.job_id) + " was closed")
+
+
+async def delete_job(configs: UserConfig, state: State) -> None:
+    job = await async_call(partial(_get_current_job, state))
+    if job is None:
+        return
+
+    if job.status is JobStatus.RUNNING:
+        log.info("[vim-database] Job #" + str(job.job_id) + " is still running")
+        return
+
+    ans = await async_call(partial(confirm, "Do you want to delete job #" + str(job.job_id) + " and its result?"))
+    if not ans:
+        return
+
+    del state.jobs[job.job_id]
+    await async_call(partial(delete_job_buffer, job.buffer))
+    await show_jobs(configs, state)
+
+
+def _get_current_job(state: State) -> Optional[QueryJob]:
+    jobs = list(state.jobs.values())
+    # Minus 4 for header of the table
+    job_idx = get_current_database_window_row() - 4
+    return None if job_idx < 0 or job_idx >= len(jobs) else jobs[job_idx]
+
+
+def _format_elapsed_time(job: QueryJob) -> str:
+    return "{:.1f}".format(job.get_elapsed_time()) + "s"
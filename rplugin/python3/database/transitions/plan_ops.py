@@ -0,0 +1,89 @@
+from functools import partial
+from typing import Tuple
+
+from .query_ops import get_statement_summary, get_statements
+from ..concurrents.executors import run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client import PlanNode
+from ..states.state import State
+from ..utils.log import log
+from ..utils.nvim import async_call
+from ..utils.sql_splitter import find_statement
+from ..views.plan_window import show_plan_window
+from ..views.query_window import close_query_window
+
+# Estimated rows which are this many times off the actual rows are highlighted
+_ESTIMATE_ERROR_THRESHOLD = 10
+
+
+async def explain(configs: UserConfig, state: State, selection: bool, analyze: bool) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    statements, offset = await get_statements(state, selection)
+    if selection and len(statements) > 1:
+        log.info("[vim-database] Select one statement to explain")
+        return
+
+    statement = find_statement(statements, offset)
+    if statement is None:
+        return
+
+    plan = await run_in_executor(
+        partial(state.sql_client.explain, state.selected_database, statement.text, analyze))
+    if plan is None:
+        return
+
+    lines = [("EXPLAIN ANALYZE " if analyze else "EXPLAIN ") + get_statement_summary(statement.text), ""]
+    highlights = dict()
+    _render_plan_node(plan, 0, configs.large_table_rows, lines, highlights)
+
+    await async_call(close_query_window)
+    await async_call(partial(show_plan_window, lines, highlights))
+
+
+def _render_plan_node(node: PlanNode, depth: int, large_table_rows: int, lines: list, highlights: dict) -> None:
+    indent = "  " * depth
+    annotations, highlight = _get_plan_node_annotations(node, large_table_rows)
+    if highlight is not None:
+        highlights[len(lines)] = highlight
+    lines.append(indent + "-> " + node.operation + ("  " + "  ".join(annotations) if annotations else ""))
+
+    for detail in node.details:
+        lines.append(indent + "     " + detail)
+    for child in node.children:
+        _render_plan_node(child, depth + 1, large_table_rows, lines, highlights)
+
+
+def _get_plan_node_annotations(node: PlanNode, large_table_rows: int) -> Tuple[list, str]:
+    annotations = []
+    highlight = None
+    if node.cost is not None:
+        annotations.append("cost=" + "{:.2f}".format(node.cost))
+    if node.actual_time is not None:
+        annotations.append("time=" + "{:.3f}".format(node.actual_time) + "ms")
+    if node.actual_rows is not None:
+        annotations.append("rows=" + _format_rows(node.actual_rows) +
+                           ("" if node.estimated_rows is None else " (estimated " + _format_rows(node.estimated_rows) +
+                            ")"))
+    elif node.estimated_rows is not None:
+        annotations.append("estimated rows=" + _format_rows(node.estimated_rows))
+    if node.loops is not None and node.loops != 1:
+        annotations.append("loops=" + str(node.loops))
+
+    estimate_error = node.get_estimate_error()
+    if estimate_error is not None and abs(estimate_error) >= _ESTIMATE_ERROR_THRESHOLD:
+        annotations.append("[estimate " + "{:.1f}".format(abs(estimate_error)) + "x " +
+                           ("over" if estimate_error > 0 else "under") + "]")
+        highlight = "WarningMsg"
+
+    if node.full_scan and node.table_rows is not None and node.table_rows >= large_table_rows:
+        annotations.append("[full scan of ~" + _format_rows(node.table_rows) + " rows]")
+        highlight = "ErrorMsg"
+
+    return annotations, highlight
+
+
+def _format_rows(rows: float) -> str:
+    return str(int(rows)) if rows == int(rows) else "{:.1f}".format(rows)
@@ -0,0 +1,191 @@
+import re
+from dataclasses import replace
+from functools import partial
+from time import monotonic, time
+from typing import Optional, Tuple
+
+from .shared.get_current_cell_value import get_current_cell_value
+from .shared.show_table_data import get_table_source, show_table_data
+from .table_ops import get_table_idx
+from ..concurrents.executors import run_in_executor
+from ..configs.config import UserConfig
+from ..states.state import Mode, State
+from ..states.table_profile import TableProfile
+from ..utils.ascii_table import ascii_table
+from ..utils.log import log
+from ..utils.nvim import (
+    async_call,
+    render,
+    set_cursor,
+)
+from ..views.database_window import get_current_database_window_row, open_database_window
+
+# Types which can not be compared, only their nulls are counted
+_UNORDERED_TYPE_PATTERN = re.compile(r"^(jsonb?|xml|bytea|(tiny|medium|long)?blob|bool(ean)?|array|user-defined|point|"
+                                     r"line|lseg|box|path|polygon|circle|tsvector|tsquery|geometry|uuid|bit|varbit|"
+                                     r"macaddr8?|\w*range)\b")
+_PROFILE_HEADERS = ["Column", "Nulls", "Distinct", "Min", "Max", "Top value", "Top count"]
+# Values of a column in the profile query: nulls, distinct, min and max
+_COLUMN_VALUES = 4
+_MAX_VALUE_LENGTH = 40
+
+
+async def profile(configs: UserConfig, state: State) -> None:
+    if state.mode == Mode.PROFILE:
+        # The top value of the column under the cursor
+        await _profile_top_value(configs, state)
+    elif state.mode == Mode.TABLE:
+        table_idx = await async_call(partial(get_table_idx, state))
+        if table_idx is None:
+            return
+        # Every column of the whole table
+        table = state.tables[table_idx]
+        await _profile_columns(configs, state, table, table, None, False)
+    elif state.mode == Mode.QUERY and not state.user_query:
+        column, _, _, _ = await get_current_cell_value(state)
+        if column is None:
+            return
+        # The column of the table view, with its filter and sample
+        table = state.selected_table
+        await _profile_columns(configs, state, table, "(" + get_table_source(state, table) + ") vd_profile",
+                               (column, ), False)
+
+
+async def refresh_profile(configs: UserConfig, state: State) -> None:
+    if state.profile is not None:
+        await _profile_columns(configs, state, state.profile.table, state.profile.source, state.profile.columns, True)
+
+
+async def show_profiled_table(configs: UserConfig, state: State) -> None:
+    if state.profile is None:
+        return
+
+    if state.profile.table != state.selected_table:
+        state.reset_table_view()
+    await show_table_data(configs, state, state.profile.table)
+
+
+async def show_profile(configs: UserConfig, state: State) -> None:
+    state.mode = Mode.PROFILE
+    table_profile = state.profile
+    window = await async_call(partial(open_database_window, configs))
+    await async_call(partial(render, window, ascii_table(_PROFILE_HEADERS, [list(row) for row in table_profile.rows])))
+    await async_call(partial(set_cursor, window, (4, 0)))
+
+
+async def _profile_columns(configs: UserConfig, state: State, table: str, source: str, columns: Optional[tuple],
+                           refresh: bool) -> None:
+    table_columns = await run_in_executor(partial(state.sql_client.get_columns, state.selected_database, table))
+    if not table_columns:
+        log.info("[vim-database] No column found for table " + table)
+        return
+
+    column_types = {column[0]: column[1].lower() for column in table_columns}
+    if columns is None:
+        columns = tuple(column_types)
+
+    cache_key = (state.selected_connection.name, state.selected_database, source, columns)
+    table_profile = state.profiles.get(cache_key)
+    if table_profile is not None and (refresh or table_profile.get_age() > configs.profile_ttl):
+        table_profile = None
+
+    if table_profile is None:
+        start_time = monotonic()
+        query = _get_profile_query(source, columns, column_types)
+        result = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
+        if not result or len(result) < 2:
+            return
+
+        values = result[1]
+        if len(values) != 1 + len(columns) * _COLUMN_VALUES:
+            log.info("[vim-database] Can not parse the profile of " + table)
+            return
+
+        rows = _get_profile_rows(columns, values)
+        # The top value needs a grouped pass of its own, it is only computed right away for a single column
+        if len(columns) == 1:
+            rows[0] = rows[0][:1 + _COLUMN_VALUES] + await _get_top_value(state, source, columns[0], column_types)
+        table_profile = TableProfile(table=table,
+                                     source=source,
+                                     columns=columns,
+                                     column_types=column_types,
+                                     total_rows=values[0],
+                                     rows=rows,
+                                     profiled_at=time())
+        state.profiles[cache_key] = table_profile
+        log.info("[vim-database] Profiled " + str(len(columns)) + " column(s) of " + table + " over " +
+                 table_profile.total_rows + " rows in " + "{:.1f}".format(monotonic() - start_time) + "s" +
+                 ("" if len(columns) == 1 else ", press gp on a column for its top value"))
+    else:
+        log.info("[vim-database] Profile of " + table + " over " + table_profile.total_rows + " rows from " +
+                 str(int(table_profile.get_age())) + "s ago, press r to refresh it")
+
+    state.profile = table_profile
+    await show_profile(configs, state)
+
+
+async def _profile_top_value(configs: UserConfig, state: State) -> None:
+    table_profile = state.profile
+    # Minus 4 for header of the table
+    row_idx = await async_call(get_current_database_window_row) - 4
+    if table_profile is None or row_idx < 0 or row_idx >= len(table_profile.rows):
+        return
+
+    rows = list(table_profile.rows)
+    column = table_profile.columns[row_idx]
+    rows[row_idx] = rows[row_idx][:1 + _COLUMN_VALUES] + \
+        await _get_top_value(state, table_profile.source, column, table_profile.column_types)
+    state.profile = replace(table_profile, rows=rows)
+    state.profiles[(state.selected_connection.name, state.selected_database, table_profile.source,
+                    table_profile.columns)] = state.profile
+
+    window = await async_call(partial(open_database_window, configs))
+    await async_call(partial(render, window, ascii_table(_PROFILE_HEADERS, [list(row) for row in rows])))
+    await async_call(partial(set_cursor, window, (row_idx + 4, 0)))
+
+
+async def _get_top_value(state: State, source: str, column: str, column_types: dict) -> Tuple[str, str]:
+    # The most frequent value and its count, from a grouped pass over the column
+    if _UNORDERED_TYPE_PATTERN.match(column_types.get(column, "")):
+        return "", ""
+
+    query = "SELECT " + column + ", COUNT(*) FROM " + source + " WHERE " + column + " IS NOT NULL GROUP BY " + \
+        column + " ORDER BY 2 DESC LIMIT 1"
+    result = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
+    if not result or len(result) < 2 or len(result[1]) != 2:
+        return "", ""
+
+    top_value, top_count = result[1]
+    return _shorten(top_value), top_count
+
+
+def _get_profile_query(source: str, columns: tuple, column_types: dict) -> str:
+    # One pass computes the counts and bounds of every column
+    aggregates = ["COUNT(*)"]
+    for column in columns:
+        aggregates.append("COUNT(*) - COUNT(" + column + ")")
+        if _UNORDERED_TYPE_PATTERN.match(column_types.get(column, "")):
+            aggregates += ["NULL"] * (_COLUMN_VALUES - 1)
+            continue
+
+        aggregates += ["COUNT(DISTINCT " + column + ")", "MIN(" + column + ")", "MAX(" + column + ")"]
+
+    return "SELECT " + ", ".join(aggregates) + " FROM " + source
+
+
+def _get_profile_rows(columns: tuple, values: list) -> list:
+    # The top value and count are left empty until they are computed
+    total_rows = int(values[0]) if values[0].isdigit() else 0
+    rows = []
+    for column_idx, column in enumerate(columns):
+        nulls, distinct, min_value, max_value = values[1 + column_idx * _COLUMN_VALUES:1 +
+                                                       (column_idx + 1) * _COLUMN_VALUES]
+        if total_rows and nulls.isdigit():
+            nulls += " (" + "{:.1f}".format(int(nulls) * 100 / total_rows) + "%)"
+        rows.append((column, nulls, distinct, _shorten(min_value), _shorten(max_value), "", ""))
+
+    return rows
+
+
+def _shorten(value: str) -> str:
+    return value if len(value) <= _MAX_VALUE_LENGTH else value[:_MAX_VALUE_LENGTH - 3] + "..."
@@ -1,13 +1,18 @@
 import re
 from functools import partial
+from time import monotonic, time
+from typing import Optional, Tuple
 
 from .data_ops import show_table_data
 from .database_ops import show_databases
+from .shared.cached_query import get_cached_rows, store_cached_rows
 from .shared.get_current_row_idx import get_current_row_idx
 from .shared.get_primary_key_value import get_primary_key_value
 from .table_ops import (show_tables)
 from ..concurrents.executors import run_in_executor
 from ..configs.config import UserConfig
+from ..sql_clients.query_result import QueryResult
+from ..sql_clients.sql_client import StatementResult
 from ..states.state import Mode, State
 from ..transitions.shared.show_ascii_table import show_ascii_table
 from ..utils.log import log
@@ -15,29 +20,92 @@ from ..utils.nvim import (
     async_call,
     render,
 )
+from ..utils.sql_splitter import Statement, find_statement, split_statements
 from ..views.query_window import (
     open_query_window,
     close_query_window,
-    get_query,
+    get_query_script,
+    get_selected_query,
 )
 
+# Statements whose rows are streamed like an export
+_STREAMED_KEYWORDS = {"select", "values", "table"}
+# Statements which return rows, their affected row count is not shown
+_QUERY_KEYWORDS = {"select", "with", "values", "table", "show", "describe", "desc", "explain", "pragma"}
+_STATEMENT_SUMMARY_WIDTH = 60
 
-async def run_query(configs: UserConfig, state: State) -> None:
+
+async def run_query(configs: UserConfig, state: State, selection: bool) -> None:
     if not state.connections:
         log.info("[vim-database] No connection found")
         return
 
-    query = await async_call(get_query)
-    if query is None:
+    statements, offset = await get_statements(state, selection)
+    if selection and len(statements) > 1:
+        # A selection of several statements runs as a script
+        await _run_statements(configs, state, statements)
         return
 
-    query_result = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
-    if query_result is None:
+    statement = find_statement(statements, offset)
+    if statement is not None:
+        await _run_statement(configs, state, statement)
+
+
+async def run_script(configs: UserConfig, state: State) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
         return
 
+    statements, _ = await get_statements(state, False)
+    if statements:
+        await _run_statements(configs, state, statements)
+
+
+async def get_statements(state: State, selection: bool, dialect: Optional[str] = None) -> Tuple[list, int]:
+    # The statements of the selection or of the whole query buffer, and the offset of the cursor
+    if selection:
+        script = await async_call(get_selected_query)
+        offset = 0
+    else:
+        script, offset = await async_call(get_query_script) or (None, 0)
+    if script is None:
+        return list(), 0
+
+    if dialect is None:
+        dialect = state.selected_connection.connection_type.name.lower()
+    return split_statements(script, dialect), offset
+
+
+async def _run_statement(configs: UserConfig, state: State, statement: Statement) -> None:
+    query = statement.text
+    cached_result, cache_entry = (None, None) if statement.keyword not in _STREAMED_KEYWORDS else \
+        await get_cached_rows(configs, state, query)
+    if cached_result is not None:
+        query_result = cached_result.rows
+    elif statement.keyword in _STREAMED_KEYWORDS:
+        # The rows are streamed, a large result spills to disk instead of filling the memory
+        result = await run_in_executor(
+            partial(state.sql_client.stream_query, state.selected_database, query, configs.spill_size,
+                    configs.result_max_size))
+        if result is None:
+            return
+        if result.is_spilled():
+            await async_call(close_query_window)
+            await _show_spilled_result(configs, state, result, query)
+            return
+        query_result = [] if result.headers is None else [result.headers] + result.get_rows()
+        result.close()
+        # A result cut at result_max_size misses rows, it is not cached
+        if not result.truncated:
+            await store_cached_rows(configs, cache_entry, query_result)
+    else:
+        query_result = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
+        if query_result is None:
+            return
+
     await async_call(close_query_window)
 
-    if len(query_result) < 2 and not query.lower().startswith("select "):
+    if len(query_result) < 2 and statement.keyword != "select":
         log.info("[vim-database] Query executed successfully")
 
         if state.mode == Mode.DATABASE and state.databases:
@@ -55,11 +123,140 @@ async def run_query(configs: UserConfig, state: State) -> None:
         table_name = matches.group(0).strip()
         query_result = [[table_name]]
 
+    await _show_query_result(configs, state, query_result, query)
+    if cached_result is not None:
+        log.info("[vim-database] Result cached " + str(int(time() - cached_result.created_at)) +
+                 "s ago, the database has not changed since")
+
+
+async def run_local_query(configs: UserConfig, state: State, selection: bool) -> None:
+    # The statement runs on the workspace, it can sort, group and join the results fetched from any connection
+    statements, offset = await get_statements(state, selection, "sqlite")
+    statement = find_statement(statements, offset)
+    if statement is None:
+        return
+
+    query_result, error = await run_in_executor(partial(state.workspace.run_query, statement.text))
+    if query_result is None:
+        log.info("[vim-database] " + error)
+        return
+
+    await async_call(close_query_window)
+    if not query_result:
+        log.info("[vim-database] Query executed successfully")
+        return
+
+    await _show_query_result(configs, state, query_result, None)
+
+
+async def change_result_page(configs: UserConfig, state: State, step: int) -> None:
+    result = state.query_result
+    if result is None:
+        return
+
+    num_pages = max((len(result) + configs.rows_limit - 1) // configs.rows_limit, 1)
+    if not 1 <= state.current_page + step <= num_pages:
+        return
+
+    state.current_page += step
+    await _show_result_page(configs, state)
+    log.info("[vim-database] Page " + str(state.current_page) + "/" + str(num_pages))
+
+
+async def _show_query_result(configs: UserConfig, state: State, query_result: list, query: Optional[str]) -> None:
+    headers, rows = query_result[0], query_result[1:]
+    _set_user_query(state, query)
+    state.table_data = (headers, rows)
+    await show_ascii_table(configs, headers, rows)
+
+    # The result is kept in the workspace to sort and filter it locally
+    if rows and len(rows) <= configs.workspace_rows:
+        state.local_table = await run_in_executor(partial(state.workspace.load_result, headers, rows))
+        log.info("[vim-database] " + str(len(rows)) + " row(s), kept in the local workspace as " + state.local_table)
+
+
+async def _show_spilled_result(configs: UserConfig, state: State, result: QueryResult, query: str) -> None:
+    _set_user_query(state, query)
+    state.query_result = result
+    await _show_result_page(configs, state)
+
+    log.info("[vim-database] " + str(len(result)) + " rows (" + "{:.1f}".format(result.size / (1024 * 1024)) +
+             " MB) spilled to disk" + (", truncated at g:vim_database_result_max_size" if result.truncated else "") +
+             ", press right-arrow/left-arrow to see the next/previous page")
+
+
+async def _show_result_page(configs: UserConfig, state: State) -> None:
+    # Only the rows of the page are read from the file
+    result = state.query_result
+    start = configs.rows_limit * (state.current_page - 1)
+    rows = await run_in_executor(partial(result.get_rows, start, start + configs.rows_limit))
+    state.table_data = (result.headers, rows)
+    await show_ascii_table(configs, result.headers, rows)
+
+
+def _set_user_query(state: State, query: Optional[str]) -> None:
+    if state.changeset:
+        log.info("[vim-database] Discarded " + str(len(state.changeset)) + " pending change(s)")
+    if state.query_result is not None:
+        state.query_result.close()
+        state.query_result = None
     state.selected_table = None
-    state.table_data = None
+    state.reset_table_view()
+    state.changeset = None
+    state.local_table = None
     state.mode = Mode.QUERY
     state.user_query = True
-    await show_ascii_table(configs, query_result[0], query_result[1:])
+    state.last_query = query
+
+
+async def _run_statements(configs: UserConfig, state: State, statements: list) -> None:
+    start_time = monotonic()
+    results, error = await run_in_executor(
+        partial(state.sql_client.run_script, state.selected_database, [statement.text for statement in statements]))
+    elapsed_time = monotonic() - start_time
+
+    await async_call(close_query_window)
+
+    rows = []
+    for index, statement in enumerate(statements):
+        result = results[index] if index < len(results) else None
+        if result is not None:
+            status = "OK"
+        elif index == len(results) and error is not None:
+            status = "ERROR"
+        else:
+            status = "SKIPPED"
+        rows.append([str(index + 1), get_statement_summary(statement.text)] + _get_result_columns(statement, result) +
+                    [status])
+
+    _set_user_query(state, None)
+    state.table_data = None
+    await show_ascii_table(configs, ["#", "Statement", "Rows", "Affected", "Time", "Status"], rows)
+
+    if error is not None:
+        log.info("[vim-database] Statement " + str(len(results) + 1) + " failed: " + ". ".join(error.splitlines()))
+    else:
+        log.info("[vim-database] Ran " + str(len(statements)) + " statement(s) in " + "{:.3f}".format(elapsed_time) +
+                 "s")
+
+
+def get_statement_summary(query: str) -> str:
+    summary = " ".join(query.split())
+    if len(summary) > _STATEMENT_SUMMARY_WIDTH:
+        summary = summary[:_STATEMENT_SUMMARY_WIDTH - 3] + "..."
+    return summary
+
+
+def _get_result_columns(statement: Statement, result: Optional[StatementResult]) -> list:
+    if result is None:
+        return ["", "", ""]
+
+    query = statement.keyword in _QUERY_KEYWORDS
+    rows = str(result.rows) if query or result.rows else ""
+    affected_rows = "" if result.affected_rows is None or (query and not result.affected_rows) else \
+        str(result.affected_rows)
+    elapsed_time = "" if result.elapsed_time is None else "{:.3f}".format(result.elapsed_time * 1000) + " ms"
+    return [rows, affected_rows, elapsed_time]
 
 
 async def show_insert_query(configs: UserConfig, state: State) -> None:
@@ -0,0 +1,84 @@
+from asyncio import current_task, sleep
+from functools import partial
+from time import strftime
+
+from .shared.show_table_data import fetch_table_data, get_auto_refresh_marker, get_shown_table_data
+from ..concurrents.executors import get_transition_lock, run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..states.state import Mode, State
+from ..utils.ascii_table import ascii_table
+from ..utils.log import log
+from ..utils.nvim import async_call
+from ..views.database_window import is_database_window_open, set_database_window_marker, update_database_window
+
+# The polling interval is doubled while the database window is hidden, up to this factor
+_MAX_BACKOFF = 8
+
+
+async def toggle_auto_refresh(configs: UserConfig, state: State) -> None:
+    if state.auto_refresh is not None:
+        state.auto_refresh.cancel()
+        state.auto_refresh = None
+        await async_call(partial(set_database_window_marker, "auto_refresh", None))
+        log.info("[vim-database] Auto-refresh stopped")
+        return
+
+    if state.mode != Mode.QUERY or state.user_query:
+        return
+
+    table = state.selected_table
+    change_token = await run_in_executor(
+        partial(state.sql_client.get_change_token, state.selected_database, table))
+    if change_token is None:
+        log.info("[vim-database] Can not tell when " + table + " changes, auto-refresh is not available")
+        return
+
+    state.auto_refresh = run_in_background(_auto_refresh(configs, state, table, change_token))
+    await async_call(partial(set_database_window_marker, "auto_refresh", get_auto_refresh_marker(configs)))
+    log.info("[vim-database] Auto-refresh of " + table + " every " + str(configs.auto_refresh_interval) +
+             "s, press gr again to stop it")
+
+
+async def _auto_refresh(configs: UserConfig, state: State, table: str, change_token: str) -> None:
+    connection = state.selected_connection
+    database = state.selected_database
+    sql_client = state.sql_client
+    interval = configs.auto_refresh_interval
+
+    def is_shown() -> bool:
+        return state.mode == Mode.QUERY and not state.user_query and state.selected_connection == connection and \
+            state.selected_database == database and state.selected_table == table
+
+    try:
+        while True:
+            await sleep(interval)
+            if not is_shown():
+                break
+            if not await async_call(is_database_window_open):
+                interval = min(interval * 2, configs.auto_refresh_interval * _MAX_BACKOFF)
+                continue
+            interval = configs.auto_refresh_interval
+
+            # The rows are only fetched again when the cheap change token moved
+            token = await run_in_executor(partial(sql_client.get_change_token, database, table))
+            if token is None or token == change_token:
+                continue
+
+            # The table is refreshed between two transitions, an edit prompt may be waiting on the rows as they are
+            async with get_transition_lock():
+                # The pending changes are not discarded, the table is refreshed once they are committed or discarded
+                if not is_shown() or state.changeset or state.editing_table:
+                    continue
+                if not await fetch_table_data(configs, state, table):
+                    continue
+                change_token = token
+
+                headers, rows = get_shown_table_data(state)
+                await async_call(partial(update_database_window, ascii_table(headers, rows)))
+                await async_call(
+                    partial(set_database_window_marker, "auto_refresh",
+                            get_auto_refresh_marker(configs) + ", updated at " + strftime("%H:%M:%S")))
+    finally:
+        if state.auto_refresh is current_task():
+            state.auto_refresh = None
+            await async_call(partial(set_database_window_marker, "auto_refresh", None))
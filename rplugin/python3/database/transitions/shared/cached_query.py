@@ -0,0 +1,35 @@
+from functools import partial
+from typing import Optional, Tuple
+
+from ...concurrents.executors import run_in_executor
+from ...configs.config import UserConfig
+from ...states.state import State
+from ...storages.result_cache import CachedResult, get_cached_result, store_result
+
+
+async def get_cached_rows(configs: UserConfig, state: State, query: str,
+                          table: Optional[str] = None) -> Tuple[Optional[CachedResult], Optional[tuple]]:
+    # The cached result of the query, or the entry to store its result with when the connection caches its results
+    connection = state.selected_connection
+    ttl = configs.result_cache.get(connection.name)
+    if not ttl:
+        return None, None
+
+    change_token = await run_in_executor(
+        partial(state.sql_client.get_change_token, state.selected_database, table))
+    if change_token is None:
+        return None, None
+
+    # The query is only trimmed, the whitespace of its string literals is part of it
+    key = (connection.connection_type.name, connection.host, connection.port, connection.username,
+           state.selected_database, query.strip().rstrip(";").rstrip())
+    cached_result = await run_in_executor(partial(get_cached_result, key, change_token, ttl))
+    return cached_result, (key, change_token)
+
+
+async def store_cached_rows(configs: UserConfig, entry: Optional[tuple], rows: list) -> None:
+    if entry is None:
+        return
+
+    key, change_token = entry
+    await run_in_executor(partial(store_result, key, change_token, rows, configs.result_cache_size))
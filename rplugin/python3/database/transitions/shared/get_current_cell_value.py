@@ -0,0 +1,35 @@
+from functools import partial
+from typing import Optional, Tuple
+
+from ...states.state import State
+from ...utils.nvim import async_call
+from ...views.database_window import get_current_database_window_cursor, get_current_database_window_line
+
+
+async def get_current_cell_value(state: State) -> Tuple[Optional[str], Optional[str], Optional[int], Optional[int]]:
+    row, column = await async_call(partial(_get_current_row_and_column, state))
+    if row is None:
+        return None, None, None, None
+
+    data_headers, data_rows = state.table_data
+    return data_headers[column], data_rows[row][column], row, column
+
+
+def _get_current_row_and_column(state: State) -> Tuple[Optional[int], Optional[int]]:
+    row_cursor, column_cursor = get_current_database_window_cursor()
+
+    _, rows = state.table_data
+    row_size = len(rows)
+
+    # Minus 4 for header of the table
+    row_idx = row_cursor - 4
+    line = get_current_database_window_line()
+    if row_idx < 0 or row_idx >= row_size or line is None or line[column_cursor] == '|':
+        return None, None
+
+    column_idx = 0
+    for i in range(column_cursor):
+        if line[i] == '|':
+            column_idx += 1
+
+    return row_idx, column_idx - 1
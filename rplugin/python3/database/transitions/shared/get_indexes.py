@@ -0,0 +1,43 @@
+import re
+from functools import partial
+from typing import Optional
+
+from ...concurrents.executors import run_in_executor
+from ...states.state import State
+from ...utils.log import log
+from ...utils.sql_splitter import get_query_shape
+
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+async def get_indexes(state: State, table: str, refresh: bool = False) -> Optional[list]:
+    cache_key = (state.selected_connection.name, state.selected_database, table)
+    indexes = None if refresh else state.index_catalog.get(cache_key)
+    if indexes is None:
+        indexes = await run_in_executor(partial(state.sql_client.get_indexes, state.selected_database, table))
+        if indexes is None:
+            return None
+        state.index_catalog[cache_key] = indexes
+
+    return indexes
+
+
+def get_condition_columns(condition: str, headers: list) -> list:
+    # The table columns named in the condition, the string literals are left out
+    identifiers = set(_IDENTIFIER_PATTERN.findall(get_query_shape(condition)))
+    return [header for header in headers if header.lower() in identifiers]
+
+
+async def warn_unindexed_columns(state: State, columns: list, usage: str) -> None:
+    if not columns:
+        return
+
+    indexes = await get_indexes(state, state.selected_table)
+    if indexes is None:
+        return
+
+    # Only the leading column of an index can serve a filter or an ordering on its own
+    leading_columns = {index[1].split(",")[0].strip().lower() for index in indexes}
+    if not any(column.lower() in leading_columns for column in columns):
+        log.info("[vim-database] No index of " + state.selected_table + " starts with " + ", ".join(columns) +
+                 ", the " + usage + " may scan the whole table")
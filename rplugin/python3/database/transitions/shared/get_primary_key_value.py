@@ -7,17 +7,30 @@ from ...utils.log import log
 
 
 async def get_primary_key_value(state: State, row: int) -> Tuple[Optional[str], Optional[str]]:
-    primary_key = await run_in_executor(
-        partial(state.sql_client.get_primary_key, state.selected_database, state.selected_table))
+    primary_key, primary_key_idx = await get_primary_key_index(state)
     if primary_key is None:
-        log.info("[vim-database] No primary key found for table " + state.selected_table)
         return None, None
 
-    headers, rows = state.table_data
+    _, rows = state.table_data
+    return primary_key, rows[row][primary_key_idx]
+
+
+async def get_primary_key_index(state: State) -> Tuple[Optional[str], Optional[int]]:
+    cache_key = (state.selected_connection.name, state.selected_database, state.selected_table)
+    primary_key = state.primary_keys.get(cache_key)
+    if primary_key is None:
+        primary_key = await run_in_executor(
+            partial(state.sql_client.get_primary_key, state.selected_database, state.selected_table))
+        if primary_key is None:
+            log.info("[vim-database] No primary key found for table " + state.selected_table)
+            return None, None
+        state.primary_keys[cache_key] = primary_key
+
+    headers, _ = state.table_data
 
     for header_idx, header in enumerate(headers):
         if header == primary_key:
-            return primary_key, rows[row][header_idx]
+            return primary_key, header_idx
 
-    # Not reachable
+    log.info("[vim-database] Primary key " + primary_key + " is not in the selected columns")
     return None, None
@@ -0,0 +1,41 @@
+from functools import partial
+from random import randrange
+from typing import Optional
+
+from .get_primary_key_value import get_primary_key_index
+from .show_table_data import get_table_query
+from ...concurrents.executors import run_in_executor
+from ...configs.config import UserConfig
+from ...sql_clients.sql_client import TableSample
+from ...states.state import State
+from ...utils.sql_splitter import get_query_shape
+
+
+async def get_scanned_rows(configs: UserConfig, state: State) -> Optional[int]:
+    # A cheap EXPLAIN tells if the table view scans a large table, the verdicts are cached by predicate shape
+    table = state.selected_table
+    cache_key = (state.selected_connection.name, state.selected_database, table,
+                 get_query_shape(state.query_conditions or ""))
+    if cache_key in state.filter_verdicts:
+        return state.filter_verdicts[cache_key]
+
+    query = get_table_query(state, table) + " LIMIT " + str(configs.rows_limit)
+    plan = await run_in_executor(partial(state.sql_client.explain, state.selected_database, query, False))
+    if plan is None:
+        # The filter is most likely invalid, running it reports the error
+        return None
+
+    full_scans = [
+        node.table_rows for node in plan.get_full_scans()
+        if node.table_rows is not None and node.table_rows >= configs.large_table_rows
+    ]
+    state.filter_verdicts[cache_key] = max(full_scans) if full_scans else None
+    return state.filter_verdicts[cache_key]
+
+
+async def create_sample(configs: UserConfig, state: State, sample_rate: float) -> TableSample:
+    primary_key, _ = await get_primary_key_index(state)
+    return TableSample(rate=max(min(sample_rate, 100), 0.01),
+                       seed=randrange(1, 1 << 31),
+                       row_sampling=configs.sample_method == "bernoulli",
+                       primary_key=primary_key)
@@ -0,0 +1,33 @@
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
+
+from ...concurrents.executors import get_transition_lock, run_in_background, run_in_executor
+from ...utils.nvim import async_call
+from ...views.database_window import set_database_window_marker
+
+_REFRESHING_MARKER = "refreshing..."
+_revalidating_keys: set = set()
+
+
+def revalidate(key: Hashable, fetch: Callable[[], Any], apply: Callable[[Any], Awaitable[None]]) -> None:
+    # Only one refresh per key at a time, repeated toggles reuse the running one. The cached rows are kept when fetch
+    # fails and returns None. apply runs between two transitions, it checks the view is still the one it refreshes
+    if key in _revalidating_keys:
+        return
+
+    _revalidating_keys.add(key)
+
+    async def run() -> None:
+        try:
+            await async_call(partial(set_database_window_marker, "refresh", _REFRESHING_MARKER))
+            fresh = await run_in_executor(fetch)
+            if fresh is None:
+                return
+
+            async with get_transition_lock():
+                await apply(fresh)
+        finally:
+            _revalidating_keys.discard(key)
+            await async_call(partial(set_database_window_marker, "refresh", None))
+
+    run_in_background(run())
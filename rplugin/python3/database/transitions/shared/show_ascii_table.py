@@ -8,7 +8,9 @@ from ...utils.nvim import (
     render,
 )
 from ...views.database_window import (
-    open_database_window,)
+    open_database_window,
+    set_database_window_marker,
+)
 
 
 async def show_ascii_table(configs: UserConfig, headers: list, rows: list) -> None:
@@ -16,3 +18,7 @@ async def show_ascii_table(configs: UserConfig, headers: list, rows: list) -> No
 
     await async_call(partial(render, window, ascii_table(headers, rows)))
     await async_call(partial(set_cursor, window, (4, 0)))
+    # The markers of the table view are set again by the table view
+    await async_call(partial(set_database_window_marker, "sample", None))
+    await async_call(partial(set_database_window_marker, "auto_refresh", None))
+    await async_call(partial(set_database_window_marker, "tail", None))
@@ -1,10 +1,19 @@
 from functools import partial
+from typing import Optional, Tuple
 
+from .cached_query import get_cached_rows, store_cached_rows
 from .show_ascii_table import show_ascii_table
 from ...concurrents.executors import run_in_executor
 from ...configs.config import UserConfig
+from ...sql_clients.sql_client import TableSample
 from ...states.state import Mode, State
 from ...utils.log import log
+from ...utils.nvim import async_call, confirm
+from ...views.database_window import (
+    set_database_window_editable,
+    set_database_window_highlights,
+    set_database_window_marker,
+)
 
 
 async def show_table_data(configs: UserConfig, state: State, table: str) -> None:
@@ -12,29 +21,153 @@ async def show_table_data(configs: UserConfig, state: State, table: str) -> None
         log.info("[vim-database] No connection found")
         return
 
-    query = "SELECT * FROM " + table
-    if state.query_conditions is not None:
-        query += " WHERE " + state.query_conditions
-    if state.order is not None:
-        ordering_column, order = state.order
-        query += " ORDER BY " + ordering_column + " " + order
-    query += " LIMIT " + str(configs.rows_limit)
-    query += " OFFSET " + str(configs.rows_limit * (state.current_page - 1))
+    if not await confirm_discard_changes(state):
+        return
 
-    table_content = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
-    if table_content is None:
+    if not await fetch_table_data(configs, state, table):
         # Error
         state.query_conditions = None
         return
 
+    if state.query_result is not None:
+        state.query_result.close()
+        state.query_result = None
+    state.changeset = None
+    state.mode = Mode.QUERY
+    state.user_query = False
+    if state.editing_table:
+        state.editing_table = False
+        await async_call(partial(set_database_window_editable, configs, None))
+
+    await show_table_rows(configs, state)
+
+
+async def fetch_table_data(configs: UserConfig, state: State, table: str) -> bool:
+    rows_limit = configs.rows_limit if state.rows_limit is None else state.rows_limit
+    query = get_table_query(state, table)
+    query += " LIMIT " + str(rows_limit)
+    query += " OFFSET " + str(rows_limit * (state.current_page - 1))
+
+    # The page is read from the result cache while the change token of the table is the same
+    cached_result, cache_entry = await get_cached_rows(configs, state, query, table)
+    if cached_result is not None:
+        table_content = cached_result.rows
+    else:
+        table_content = await run_in_executor(partial(state.sql_client.run_query, state.selected_database, query))
+        if table_content is None:
+            return False
+        await store_cached_rows(configs, cache_entry, table_content)
+
     table_empty = len(table_content) == 0
     headers = [table] if table_empty else table_content[0]
     rows = [] if table_empty else table_content[1:]
     state.selected_table = table
     state.table_data = (headers, rows)
-    state.mode = Mode.QUERY
-    state.user_query = False
+    # All the rows of the table are fetched, they are sorted and filtered locally until the table is fetched again
+    state.local_table = None
+    if not table_empty and state.query_conditions is None and state.sample is None and state.current_page == 1 and \
+            len(rows) < rows_limit:
+        declarations = await run_in_executor(
+            partial(state.sql_client.get_column_declarations, state.selected_database, table))
+        if declarations is not None:
+            state.local_table = await run_in_executor(
+                partial(state.workspace.load_table, table, headers, rows, declarations,
+                        state.sql_client.is_like_case_sensitive(declarations)))
+    return True
+
+
+async def show_local_table_data(configs: UserConfig, state: State) -> bool:
+    # The rows are sorted and filtered by the workspace when all of them were fetched, the pending changes must be
+    # discarded first
+    if state.local_table is None:
+        return False
+
+    query = "SELECT * FROM \"" + state.local_table + "\""
+    if state.query_conditions is not None:
+        query += " WHERE " + state.query_conditions
+    if state.order is not None:
+        ordering_column, order = state.order
+        query += " ORDER BY " + ordering_column + " " + order
+    if not state.user_query:
+        rows_limit = configs.rows_limit if state.rows_limit is None else state.rows_limit
+        query += " LIMIT " + str(rows_limit) + " OFFSET " + str(rows_limit * (state.current_page - 1))
+
+    table_content, error = await run_in_executor(partial(state.workspace.run_query, query, state.local_table))
+    if table_content is None:
+        # The server may understand the query, a user query result is only in the workspace
+        if state.user_query:
+            log.info("[vim-database] " + error)
+            state.query_conditions = None
+        return False
 
+    headers, rows = table_content[0], table_content[1:]
+    state.table_data = (headers, rows)
+    state.changeset = None
+    if state.user_query:
+        await show_ascii_table(configs, headers, rows)
+    else:
+        await show_table_rows(configs, state)
+    return True
+
+
+def get_table_query(state: State, table: str) -> str:
+    query = get_table_source(state, table)
+    if state.order is not None:
+        ordering_column, order = state.order
+        query += " ORDER BY " + ordering_column + " " + order
+
+    return query
+
+
+def get_table_source(state: State, table: str, sample: Optional[TableSample] = None) -> str:
+    # The rows of the table view, without the ordering and the paging
+    sample = state.sample if sample is None else sample
+    source = None if sample is None else state.sql_client.get_sample_source(table, sample)
+    query = "SELECT * FROM " + (table if source is None else source)
+    if state.query_conditions is not None:
+        query += " WHERE " + state.query_conditions
+
+    return query
+
+
+async def confirm_discard_changes(state: State) -> bool:
+    if not state.changeset:
+        state.changeset = None
+        return True
+
+    ans = await async_call(
+        partial(confirm,
+                "Discard " + str(len(state.changeset)) + " pending change(s) of " + state.changeset.table + "?"))
+    if ans:
+        state.changeset = None
+
+    return ans
+
+
+async def show_table_rows(configs: UserConfig, state: State) -> None:
+    headers, rows = get_shown_table_data(state)
+    await show_ascii_table(configs, headers, rows)
+
+    sample = state.sample
+    await async_call(
+        partial(set_database_window_marker, "sample", None if sample is None else "sample " +
+                "{:g}".format(sample.rate) + "% (" + ("rows" if sample.row_sampling else "pages") + ")"))
+    if state.auto_refresh is not None:
+        await async_call(partial(set_database_window_marker, "auto_refresh", get_auto_refresh_marker(configs)))
+
+    # Lines of the table body start after the 3 header lines
+    highlights = dict()
+    if state.changeset is not None:
+        highlights = {row_idx + 3: highlight for row_idx, highlight in state.changeset.get_highlights().items()}
+    await async_call(partial(set_database_window_highlights, "changeset", highlights))
+
+
+def get_auto_refresh_marker(configs: UserConfig) -> str:
+    return "auto-refresh " + str(configs.auto_refresh_interval) + "s"
+
+
+def get_shown_table_data(state: State) -> Tuple[list, list]:
+    headers, rows = state.table_data
     if state.filtered_columns:
         filtered_idx = \
             set([header_idx for header_idx, header in enumerate(headers) if header in state.filtered_columns])
@@ -42,4 +175,4 @@ async def show_table_data(configs: UserConfig, state: State, table: str) -> None
         rows = \
             list(map(lambda row: [column for column_idx, column in enumerate(row) if column_idx in filtered_idx], rows))
 
-    await show_ascii_table(configs, headers, rows)
+    return headers, rows
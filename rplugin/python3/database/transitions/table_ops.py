@@ -1,26 +1,34 @@
 import re
-from functools import partial
-from typing import Optional, Tuple
+from functools import lru_cache, partial
+from typing import Optional, Pattern, Tuple
 
-from .shared.show_ascii_table import show_ascii_table
+from pynvim.api.window import Window
+
+from .shared.get_indexes import get_indexes
+from .shared.revalidate import revalidate
 from .shared.show_table_data import show_table_data
 from ..concurrents.executors import run_in_executor
 from ..configs.config import UserConfig
 from ..states.state import Mode, State
 from ..utils.ascii_table import ascii_table
+from ..utils.fuzzy_index import FuzzyIndex
 from ..utils.log import log
 from ..utils.nvim import (
     async_call,
     confirm,
-    get_input,
     set_cursor,
     render,
+    render_lines,
     call_function,
 )
 from ..views.database_window import (
     open_database_window,
     get_current_database_window_row,
+    is_database_window_open,
 )
+from ..views.prompt_window import open_prompt_window, close_prompt_window, get_prompt_window
+
+_FIND_TABLE_LIMIT = 20
 
 
 async def list_tables_fzf(_: UserConfig, state: State) -> None:
@@ -28,11 +36,63 @@ async def list_tables_fzf(_: UserConfig, state: State) -> None:
         log.info("[vim-database] No connection found")
         return
 
-    tables = await run_in_executor(partial(state.sql_client.get_tables, state.selected_database))
+    tables = await _get_cached_tables(state)
 
     await async_call(partial(call_function, "VimDatabaseSelectTables", tables))
 
 
+async def find_table(configs: UserConfig, state: State) -> None:
+    if configs.table_finder == "fzf":
+        await list_tables_fzf(configs, state)
+        return
+
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    cache_key = (state.selected_connection.name, state.selected_database)
+    tables = await _get_cached_tables(state)
+    indexed_tables, table_index = state.table_indexes.get(cache_key, (None, None))
+    if indexed_tables is not tables:
+        table_index = await run_in_executor(partial(FuzzyIndex, tables))
+        state.table_indexes[cache_key] = (tables, table_index)
+
+    state.found_tables = table_index.search("", _FIND_TABLE_LIMIT)
+    state.found_tables_query = ""
+    await async_call(
+        partial(open_prompt_window,
+                "find table (" + str(len(table_index)) + ")",
+                "",
+                "VimDatabase_find_table_changed",
+                "VimDatabase_find_table_submit",
+                height=_FIND_TABLE_LIMIT + 1))
+    await _render_found_tables(state)
+
+
+async def search_tables(_: UserConfig, state: State, query: str) -> None:
+    cache_key = (state.selected_connection.name, state.selected_database)
+    _, table_index = state.table_indexes.get(cache_key, (None, None))
+    # The prompt line did not change, only the found tables below it
+    if table_index is None or query == state.found_tables_query:
+        return
+
+    state.found_tables = table_index.search(query, _FIND_TABLE_LIMIT)
+    state.found_tables_query = query
+    await _render_found_tables(state)
+
+
+async def submit_found_table(configs: UserConfig, state: State, found_table_idx: int) -> None:
+    await async_call(close_prompt_window)
+
+    # The first line is the prompt, pick the best match when the cursor is still there
+    found_table_idx = max(found_table_idx - 1, 0)
+    if found_table_idx >= len(state.found_tables):
+        return
+
+    state.reset_table_view()
+    await show_table_data(configs, state, state.found_tables[found_table_idx])
+
+
 async def describe_current_table(configs: UserConfig, state: State) -> None:
     table_idx = await async_call(partial(get_table_idx, state))
     if table_idx is None:
@@ -48,15 +108,21 @@ async def describe_table(configs: UserConfig, state: State, table: str) -> None:
     if table_info is None:
         return
 
+    indexes = await get_indexes(state, table, True)
     state.mode = Mode.TABLE_INFO
-    await show_ascii_table(configs, table_info[0], table_info[1:])
+    lines = ascii_table(table_info[0], table_info[1:])
+    if indexes:
+        lines += [""] + ascii_table(["Index", "Columns", "Unique", "Size", "Usage"], [[
+            name, columns, unique, _format_size(size), usage
+        ] for name, columns, unique, size, usage in indexes])
+
+    window = await async_call(partial(open_database_window, configs))
+    await async_call(partial(render, window, lines))
+    await async_call(partial(set_cursor, window, (4, 0)))
 
 
 async def select_table(configs: UserConfig, state: State) -> None:
-    state.query_conditions = None
-    state.filtered_columns.clear()
-    state.order = None
-    state.current_page = 1
+    state.reset_table_view()
 
     table_idx = await async_call(partial(get_table_idx, state))
     if table_idx is None:
@@ -68,16 +134,76 @@ async def select_table(configs: UserConfig, state: State) -> None:
 
 
 async def table_filter(configs: UserConfig, state: State) -> None:
+    window = await async_call(partial(open_database_window, configs))
+    filtered_tables = state.filtered_tables if state.filtered_tables is not None else ""
+    await async_call(
+        partial(open_prompt_window, "table filter", filtered_tables, "VimDatabase_table_filter_changed",
+                "VimDatabase_table_filter_submit", window))
 
-    def get_filtered_tables() -> Optional[str]:
-        _filtered_tables = state.filtered_tables if state.filtered_tables is not None else ""
-        return get_input("New table filter: ", _filtered_tables)
 
-    filtered_tables = await async_call(get_filtered_tables)
-    if filtered_tables:
-        state.filtered_tables = filtered_tables.strip()
+async def filter_tables(configs: UserConfig, state: State, filtered_tables: str) -> None:
+    if state.mode != Mode.TABLE or configs.table_search == "server":
+        return
+
+    filtered_tables = filtered_tables.strip()
+    previous_filtered_tables = state.filtered_tables
+    state.filtered_tables = filtered_tables if filtered_tables else None
+
+    cache_key = (state.selected_connection.name, state.selected_database)
+    cached_tables = state.tables_cache.get(cache_key)
+    if cached_tables is None:
+        await show_tables(configs, state)
+        return
+
+    # Typing more characters of a literal filter can only narrow the previous result
+    if previous_filtered_tables is not None and state.filtered_tables is not None and \
+            state.filtered_tables.startswith(previous_filtered_tables) and \
+            _is_literal_filter(state.filtered_tables):
+        state.tables = _filter_tables(state, state.tables)
+    else:
+        state.tables = _filter_tables(state, cached_tables)
+
+    window = await async_call(partial(open_database_window, configs))
+    table_headers, table_rows, _ = _get_tables_from_state(state)
+    await async_call(partial(render, window, ascii_table(table_headers, table_rows)))
+    await async_call(partial(set_cursor, window, (4, 0)))
+
+
+async def submit_table_filter(configs: UserConfig, state: State, filtered_tables: str) -> None:
+    await async_call(close_prompt_window)
+    if configs.table_search != "server":
+        await filter_tables(configs, state, filtered_tables)
+        return
+
+    filtered_tables = filtered_tables.strip()
+    state.filtered_tables = filtered_tables if filtered_tables else None
+    state.tables_page = 1
+    await show_tables(configs, state)
+
+
+async def next_tables_page(configs: UserConfig, state: State) -> None:
+    if configs.table_search != "server":
+        return
+
+    state.tables_page += 1
+    await show_tables(configs, state)
+
+    if not state.tables:
+        state.tables_page -= 1
         await show_tables(configs, state)
 
+    log.info("[vim-database] Page " + str(state.tables_page))
+
+
+async def previous_tables_page(configs: UserConfig, state: State) -> None:
+    if configs.table_search != "server" or state.tables_page <= 1:
+        return
+
+    state.tables_page -= 1
+    await show_tables(configs, state)
+
+    log.info("[vim-database] Page " + str(state.tables_page))
+
 
 async def show_tables(configs: UserConfig, state: State) -> None:
     if not state.connections:
@@ -87,15 +213,44 @@ async def show_tables(configs: UserConfig, state: State) -> None:
     state.mode = Mode.TABLE
     window = await async_call(partial(open_database_window, configs))
 
-    def _get_tables():
-        return list(
-            filter(lambda table: state.filtered_tables is None or re.search(state.filtered_tables, table),
-                   state.sql_client.get_tables(state.selected_database)))
+    if configs.table_search == "server":
+        # Filtering and paging are pushed down to the server, only one page of tables is fetched
+        state.tables = await run_in_executor(
+            partial(state.sql_client.search_tables, state.selected_database, state.filtered_tables,
+                    configs.tables_limit, configs.tables_limit * (state.tables_page - 1)))
+        await _render_tables(window, state)
+        return
 
-    state.tables = await run_in_executor(_get_tables)
-    table_headers, table_rows, selected_idx = _get_tables_from_state(state)
-    await async_call(partial(render, window, ascii_table(table_headers, table_rows)))
-    await async_call(partial(set_cursor, window, (selected_idx + 4, 0)))
+    cache_key = (state.selected_connection.name, state.selected_database)
+    sql_client = state.sql_client
+    cached_tables = state.tables_cache.get(cache_key)
+    if cached_tables is None:
+        tables = await run_in_executor(partial(sql_client.get_tables, state.selected_database))
+        if tables is not None:
+            state.tables_cache[cache_key] = tables
+        state.tables = _filter_tables(state, tables or [])
+        await _render_tables(window, state)
+        return
+
+    # Render the last known tables right away and refresh them in the background
+    state.tables = _filter_tables(state, cached_tables)
+    await _render_tables(window, state)
+
+    async def apply(tables: list) -> None:
+        state.tables_cache[cache_key] = tables
+        if state.mode != Mode.TABLE or (state.selected_connection.name, state.selected_database) != cache_key:
+            return
+
+        filtered_tables = _filter_tables(state, tables)
+        if filtered_tables == state.tables or not await async_call(is_database_window_open):
+            return
+
+        state.tables = filtered_tables
+        table_headers, table_rows, _ = _get_tables_from_state(state)
+        window = await async_call(partial(open_database_window, configs))
+        await async_call(partial(render, window, ascii_table(table_headers, table_rows)))
+
+    revalidate(("tables", ) + cache_key, partial(sql_client.get_tables, state.selected_database), apply)
 
 
 async def delete_table(configs: UserConfig, state: State) -> None:
@@ -109,11 +264,63 @@ async def delete_table(configs: UserConfig, state: State) -> None:
         return
 
     await run_in_executor(partial(state.sql_client.delete_table, state.selected_database, table))
+    cache_key = (state.selected_connection.name, state.selected_database)
+    if cache_key in state.tables_cache:
+        state.tables_cache[cache_key] = [
+            cached_table for cached_table in state.tables_cache[cache_key] if cached_table != table
+        ]
 
     # Refresh tables
     await show_tables(configs, state)
 
 
+async def _get_cached_tables(state: State) -> list:
+    cache_key = (state.selected_connection.name, state.selected_database)
+    tables = state.tables_cache.get(cache_key)
+    if tables is None:
+        tables = await run_in_executor(partial(state.sql_client.get_tables, state.selected_database))
+        if tables is None:
+            return []
+        state.tables_cache[cache_key] = tables
+
+    return tables
+
+
+async def _render_found_tables(state: State) -> None:
+    window = await async_call(get_prompt_window)
+    if window is None:
+        return
+
+    await async_call(partial(render_lines, window, 1, state.found_tables))
+
+
+async def _render_tables(window: Window, state: State) -> None:
+    table_headers, table_rows, selected_idx = _get_tables_from_state(state)
+    await async_call(partial(render, window, ascii_table(table_headers, table_rows)))
+    await async_call(partial(set_cursor, window, (selected_idx + 4, 0)))
+
+
+def _filter_tables(state: State, tables: list) -> list:
+    if state.filtered_tables is None:
+        return list(tables)
+
+    search = _compile_filter(state.filtered_tables).search
+    return [table for table in tables if search(table)]
+
+
+@lru_cache(maxsize=64)
+def _compile_filter(filtered_tables: str) -> Pattern:
+    try:
+        return re.compile(filtered_tables)
+    except re.error:
+        # Incomplete patterns while typing (eg: "user(") are matched literally
+        return re.compile(re.escape(filtered_tables))
+
+
+def _is_literal_filter(filtered_tables: str) -> bool:
+    return re.escape(filtered_tables) == filtered_tables
+
+
 def get_table_idx(state: State) -> Optional[int]:
     row = get_current_database_window_row()
     table_size = len(state.tables)
@@ -134,3 +341,16 @@ def _get_tables_from_state(state: State) -> Tuple[list, list, int]:
             selected_idx = idx
 
     return ["Table"], tables, selected_idx
+
+
+def _format_size(size: str) -> str:
+    if not size.isdigit():
+        return size
+
+    size = float(size)
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1024:
+            return "{:g}".format(round(size, 1)) + " " + unit
+        size /= 1024
+
+    return "{:g}".format(round(size, 1)) + " TB"
@@ -0,0 +1,192 @@
+from asyncio import sleep
+from collections import deque
+from functools import partial
+from typing import Optional
+
+from .shared.get_primary_key_value import get_primary_key_index
+from .shared.show_ascii_table import show_ascii_table
+from .shared.show_table_data import confirm_discard_changes, show_table_data
+from ..concurrents.executors import get_transition_lock, run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client import SqlClient, quote
+from ..states.state import Mode, State
+from ..states.table_tail import TableTail
+from ..utils.ascii_table import ascii_table_rows, get_column_widths
+from ..utils.log import log
+from ..utils.nvim import async_call, set_cursor
+from ..views.database_window import (
+    append_database_window_rows,
+    is_database_window_open,
+    open_database_window,
+    set_database_window_marker,
+)
+
+# Seconds a query of the session can take, the session is given up past it
+_SESSION_TIMEOUT = 10
+
+
+async def toggle_tail(configs: UserConfig, state: State) -> None:
+    if state.mode == Mode.TAIL and state.tail is not None:
+        table = state.tail.table
+        await _stop_tail(state)
+        log.info("[vim-database] Tail of " + table + " stopped")
+        await show_table_data(configs, state, table)
+        return
+
+    if state.mode != Mode.QUERY or state.user_query:
+        return
+
+    primary_key, primary_key_idx = await get_primary_key_index(state)
+    if primary_key is None or not await confirm_discard_changes(state):
+        return
+
+    await _stop_tail(state)
+    headers, _ = state.table_data
+    session = await run_in_executor(partial(state.sql_client.open_session, state.selected_database))
+    tail = TableTail(table=state.selected_table,
+                     primary_key=primary_key,
+                     primary_key_idx=primary_key_idx,
+                     conditions=state.query_conditions,
+                     headers=headers,
+                     rows=deque(maxlen=configs.tail_rows),
+                     column_widths=list(),
+                     last_value=None,
+                     session=session)
+
+    # The last rows by primary key, shown in the order of the primary key
+    result = await _run_tail_query(
+        state.sql_client, state.selected_database, tail, "SELECT * FROM (" + _get_tail_source(tail) + " ORDER BY " +
+        primary_key + " DESC LIMIT " + str(configs.tail_rows) + ") vd_tail ORDER BY " + primary_key)
+    if result is None:
+        if tail.session is not None:
+            await run_in_executor(tail.session.close)
+        return
+
+    if len(result) > 1:
+        _add_rows(tail, result[0], result[1:])
+    state.tail = tail
+    await show_tail(configs, state)
+    tail.task = run_in_background(_poll_tail(configs, state, tail))
+    log.info("[vim-database] Tail of " + tail.table + " by " + primary_key + ", press T again to stop it")
+
+
+async def show_tail(configs: UserConfig, state: State) -> None:
+    tail = state.tail
+    state.mode = Mode.TAIL
+    rows = [(list(row) + [""] * len(tail.headers))[:len(tail.headers)] for row in tail.rows]
+    tail.column_widths = get_column_widths(tail.headers, rows)
+    await show_ascii_table(configs, tail.headers, rows)
+
+    # The cursor is on the last row, it follows the new rows while it stays there
+    window = await async_call(partial(open_database_window, configs))
+    await async_call(partial(set_cursor, window, (3 + max(len(rows), 1), 0)))
+    await async_call(partial(set_database_window_marker, "tail", _get_tail_marker(tail)))
+
+
+async def _poll_tail(configs: UserConfig, state: State, tail: TableTail) -> None:
+    sql_client = state.sql_client
+    database = state.selected_database
+    shown_marker = _get_tail_marker(tail)
+    try:
+        wait = True
+        while True:
+            if wait:
+                await sleep(configs.tail_interval)
+            wait = True
+            if state.tail is not tail or state.mode != Mode.TAIL:
+                break
+            if not await async_call(is_database_window_open):
+                continue
+
+            query = _get_tail_source(tail, tail.last_value) + " ORDER BY " + tail.primary_key + " LIMIT " + \
+                str(configs.tail_batch)
+            result = await _run_tail_query(sql_client, database, tail, query)
+
+            # The rows are shown between two transitions, the view may have changed while the query ran
+            async with get_transition_lock():
+                if state.tail is not tail or state.mode != Mode.TAIL:
+                    break
+                if not await async_call(is_database_window_open):
+                    # The rows are fetched again once the window is back
+                    continue
+                if _get_tail_marker(tail) != shown_marker:
+                    shown_marker = _get_tail_marker(tail)
+                    await async_call(partial(set_database_window_marker, "tail", shown_marker))
+                if not result or len(result) < 2:
+                    continue
+
+                headers, rows = result[0], result[1:]
+                # A full batch means more rows are waiting
+                wait = len(rows) < configs.tail_batch
+                await _show_new_rows(configs, state, tail, headers, rows)
+    finally:
+        # The tail ends with its view, the session is closed
+        if state.tail is tail:
+            state.tail = None
+            if tail.session is not None:
+                tail.session.close()
+
+
+async def _stop_tail(state: State) -> None:
+    tail = state.tail
+    if tail is None:
+        return
+
+    state.tail = None
+    if tail.task is not None:
+        tail.task.cancel()
+    if tail.session is not None:
+        await run_in_executor(tail.session.close)
+
+
+async def _show_new_rows(configs: UserConfig, state: State, tail: TableTail, headers: list, rows: list) -> None:
+    old_rows = len(tail.rows)
+    if not _add_rows(tail, headers, rows) or not old_rows or len(rows) >= tail.rows.maxlen:
+        await show_tail(configs, state)
+        return
+
+    # The new rows are appended and the oldest ones removed, the other lines are left as they are
+    lines = ascii_table_rows(tail.column_widths, rows)
+    if lines is None:
+        # A value is wider than its column
+        await show_tail(configs, state)
+        return
+
+    removed = max(old_rows + len(rows) - tail.rows.maxlen, 0)
+    await async_call(partial(append_database_window_rows, lines, removed))
+
+
+def _add_rows(tail: TableTail, headers: list, rows: list) -> bool:
+    # False when the columns of the table changed
+    same_headers = headers == tail.headers
+    if not same_headers:
+        tail.headers = headers
+        tail.primary_key_idx = headers.index(tail.primary_key) if tail.primary_key in headers else 0
+    tail.rows.extend(rows)
+    tail.last_value = rows[-1][tail.primary_key_idx]
+    return same_headers
+
+
+async def _run_tail_query(sql_client: SqlClient, database: str, tail: TableTail, query: str) -> Optional[list]:
+    if tail.session is not None:
+        result = await run_in_executor(partial(sql_client.run_session_query, tail.session, query, _SESSION_TIMEOUT))
+        if result is not None:
+            return result
+
+        # The session failed or did not answer, every poll runs its own client from now on
+        await run_in_executor(tail.session.close)
+        tail.session = None
+
+    return await run_in_executor(partial(sql_client.run_query, database, query))
+
+
+def _get_tail_source(tail: TableTail, last_value: Optional[str] = None) -> str:
+    conditions = [] if last_value is None else [tail.primary_key + " > " + quote(last_value)]
+    if tail.conditions is not None:
+        conditions.append("(" + tail.conditions + ")")
+
+    return "SELECT * FROM " + tail.table + ("" if not conditions else " WHERE " + " AND ".join(conditions))
+
+
+def _get_tail_marker(tail: TableTail) -> str:
+    return "tail by " + tail.primary_key + ("" if tail.session is not None else " (one client per poll)")
@@ -0,0 +1,180 @@
+from asyncio import Semaphore
+from functools import partial
+from typing import Optional
+
+from .shared.show_table_data import show_table_data
+from ..concurrents.executors import get_transition_lock, run_in_background, run_in_executor
+from ..configs.config import UserConfig
+from ..sql_clients.sql_client_factory import SqlClientFactory
+from ..states.schema_tree import NodeKind, TreeNode, create_tree, render_tree
+from ..states.state import Mode, State
+from ..utils.log import log
+from ..utils.nvim import (
+    async_call,
+    render,
+)
+from ..views.database_window import (
+    open_database_window,
+    get_current_database_window_row,
+    is_database_window_open,
+)
+
+# Maximum number of nodes being loaded at the same time
+_MAX_CONCURRENT_LOADS = 2
+_loading_semaphore: Optional[Semaphore] = None
+
+
+async def show_tree(configs: UserConfig, state: State) -> None:
+    if not state.connections:
+        log.info("[vim-database] No connection found")
+        return
+
+    # Keep the loaded nodes of the connections that were not changed
+    loaded_nodes = {id(node.connection): node for node in state.tree}
+    state.tree = [loaded_nodes.get(id(node.connection), node) for node in create_tree(state.connections)]
+
+    state.mode = Mode.TREE
+    await _render_tree(configs, state)
+
+
+async def toggle_tree_node(configs: UserConfig, state: State) -> None:
+    node = await async_call(partial(_get_current_tree_node, state))
+    if node is None or not node.is_expandable() or node.loading:
+        return
+
+    if node.expanded:
+        node.expanded = False
+        await _render_tree(configs, state)
+        return
+
+    node.expanded = True
+    if node.children is not None:
+        await _render_tree(configs, state)
+        return
+
+    await _load_tree_node(configs, state, node)
+
+
+async def reload_tree_node(configs: UserConfig, state: State) -> None:
+    node = await async_call(partial(_get_current_tree_node, state))
+    if node is None or not node.is_expandable() or node.loading:
+        return
+
+    node.expanded = True
+    await _load_tree_node(configs, state, node)
+
+
+async def show_tree_table_data(configs: UserConfig, state: State) -> None:
+    node = await async_call(partial(_get_current_tree_node, state))
+    if node is None or node.table is None:
+        return
+
+    if state.selected_connection is not node.connection or state.selected_database != node.database:
+        state.selected_connection = node.connection
+        state.selected_database = node.database
+        state.tables_page = 1
+        state.sql_client = SqlClientFactory.create(node.connection)
+
+    state.reset_table_view()
+    await show_table_data(configs, state, node.table)
+
+
+async def _load_tree_node(configs: UserConfig, state: State, node: TreeNode) -> None:
+    node.loading = True
+    await _render_tree(configs, state)
+
+    async def load() -> None:
+        global _loading_semaphore
+        if _loading_semaphore is None:
+            _loading_semaphore = Semaphore(_MAX_CONCURRENT_LOADS)
+
+        children = None
+        try:
+            async with _loading_semaphore:
+                children = await run_in_executor(partial(_get_children, configs, node))
+        finally:
+            # The children are shown between two transitions, while the tree is still the view of the window
+            async with get_transition_lock():
+                if children is not None:
+                    node.children = children
+                node.loading = False
+                if state.mode == Mode.TREE and await async_call(is_database_window_open):
+                    await _render_tree(configs, state)
+
+    run_in_background(load())
+
+
+def _get_children(configs: UserConfig, node: TreeNode) -> list:
+    sql_client = SqlClientFactory.create(node.connection)
+
+    def child(kind: NodeKind, label: str, **kwargs) -> TreeNode:
+        return TreeNode(kind=kind,
+                        label=label,
+                        connection=node.connection,
+                        database=kwargs.get("database", node.database),
+                        schema=kwargs.get("schema", node.schema),
+                        table=kwargs.get("table", node.table))
+
+    if node.kind is NodeKind.CONNECTION:
+        return [child(NodeKind.DATABASE, database, database=database) for database in sql_client.get_databases() or []]
+
+    if node.kind is NodeKind.DATABASE:
+        schemas = sql_client.get_schemas(node.database)
+        if schemas:
+            return [child(NodeKind.SCHEMA, schema, schema=schema) for schema in schemas]
+
+    if node.kind is NodeKind.DATABASE or node.kind is NodeKind.SCHEMA:
+        # Bound the number of tables fetched for huge schemas
+        pattern = None if node.schema is None else node.schema + ".%"
+        tables = sql_client.search_tables(node.database, pattern, configs.tables_limit, 0)
+        children = [
+            child(NodeKind.TABLE, table if node.schema is None else table[len(node.schema) + 1:], table=table)
+            for table in tables
+        ]
+        if len(tables) >= configs.tables_limit:
+            children.append(child(NodeKind.ITEM, "... (first " + str(configs.tables_limit) + " tables)"))
+        return children
+
+    if node.kind is NodeKind.TABLE:
+        return [
+            child(NodeKind.COLUMNS, "columns"),
+            child(NodeKind.INDEXES, "indexes"),
+            child(NodeKind.FOREIGN_KEYS, "foreign keys"),
+        ]
+
+    if node.kind is NodeKind.COLUMNS:
+        columns = sql_client.get_columns(node.database, node.table) or []
+        return [
+            child(NodeKind.ITEM, name + " " + data_type + ("" if nullable == "YES" else " not null"))
+            for name, data_type, nullable, _ in columns
+        ]
+
+    if node.kind is NodeKind.INDEXES:
+        indexes = sql_client.get_indexes(node.database, node.table) or []
+        return [
+            child(NodeKind.ITEM, index[0] + " (" + index[1] + ")" + (" unique" if index[2] == "YES" else ""))
+            for index in indexes
+        ]
+
+    if node.kind is NodeKind.FOREIGN_KEYS:
+        foreign_keys = sql_client.get_foreign_keys(node.database, node.table) or []
+        return [
+            child(NodeKind.ITEM, name + ": " + column + " -> " + referenced_table + "." + referenced_column)
+            for name, column, referenced_table, referenced_column in foreign_keys
+        ]
+
+    return list()
+
+
+async def _render_tree(configs: UserConfig, state: State) -> None:
+    window = await async_call(partial(open_database_window, configs))
+    lines, state.tree_nodes = render_tree(state.tree)
+    await async_call(partial(render, window, lines))
+
+
+def _get_current_tree_node(state: State) -> Optional[TreeNode]:
+    row = get_current_database_window_row()
+    if row is None or row < 1 or row > len(state.tree_nodes):
+        return None
+
+    return state.tree_nodes[row - 1]
@@ -5,7 +5,12 @@ from ..configs.config import UserConfig
 from ..states.state import Mode, State
 from ..transitions.connection_ops import show_connections
 from ..transitions.database_ops import show_databases
+from ..transitions.facet_ops import show_facets
+from ..transitions.job_ops import show_jobs
+from ..transitions.profile_ops import show_profile
+from ..transitions.tail_ops import show_tail
 from ..transitions.table_ops import (show_tables, describe_table)
+from ..transitions.tree_ops import show_tree
 from ..utils.log import log
 from ..utils.nvim import async_call
 from ..views.database_window import (
@@ -35,6 +40,16 @@ async def toggle(configs: UserConfig, state: State) -> None:
         await show_table_data(configs, state, state.selected_table)
     elif state.mode == Mode.TABLE_INFO:
         await describe_table(configs, state, state.selected_table)
+    elif state.mode == Mode.TREE:
+        await show_tree(configs, state)
+    elif state.mode == Mode.JOBS:
+        await show_jobs(configs, state)
+    elif state.mode == Mode.PROFILE:
+        await show_profile(configs, state)
+    elif state.mode == Mode.FACETS:
+        await show_facets(configs, state)
+    elif state.mode == Mode.TAIL and state.tail is not None:
+        await show_tail(configs, state)
     else:
         # Fallback
         await show_connections(configs, state)
@@ -1,6 +1,8 @@
+from typing import Optional, Tuple
+
+
 def ascii_table(headers: list, rows: list) -> list:
     lines = []
-    lens = []
     num_rows = len(rows)
     num_columns = len(headers)
     for i in range(num_rows):
@@ -10,8 +12,7 @@ def ascii_table(headers: list, rows: list) -> list:
         while len(rows[i]) > num_columns:
             rows[i] = rows[i][:-1]
 
-    for i in range(num_columns):
-        lens.append(len(max([x[i] for x in rows] + [headers[i]], key=lambda x: len(str(x)))))
+    lens = get_column_widths(headers, rows)
     formats = []
     hformats = []
     for i in range(len(headers)):
@@ -33,3 +34,46 @@ def ascii_table(headers: list, rows: list) -> list:
     lines.append(separator)
 
     return lines
+
+
+def get_column_widths(headers: list, rows: list) -> list:
+    return [len(max([x[i] for x in rows] + [headers[i]], key=lambda x: len(str(x)))) for i in range(len(headers))]
+
+
+def ascii_table_rows(lens: list, rows: list) -> Optional[list]:
+    # The lines of rows added to a table with these column widths, None when a value does not fit
+    lines = []
+    pattern = " | ".join("%%-%ds" % n for n in lens)
+    for row in rows:
+        row = (list(row) + [""] * len(lens))[:len(lens)]
+        if any(len(str(value)) > lens[i] for i, value in enumerate(row)):
+            return None
+        lines.append("| " + pattern % tuple(row) + " |")
+
+    return lines
+
+
+def parse_ascii_table(lines: list) -> Tuple[list, list]:
+    headers = None
+    rows = []
+    for line_idx, line in enumerate(lines):
+        line = line.strip()
+        if not line or line.startswith("+"):
+            continue
+        if not line.startswith("|") or not line.endswith("|"):
+            raise ValueError("Line " + str(line_idx + 1) + " is not a table row")
+
+        columns = [column.strip() for column in line[1:-1].split("|")]
+        if headers is None:
+            headers = columns
+        elif len(columns) != len(headers):
+            raise ValueError("Line " + str(line_idx + 1) + " has " + str(len(columns)) + " columns, expected " +
+                             str(len(headers)))
+        elif any(columns):
+            # Blank rows are the placeholder of an empty table
+            rows.append(columns)
+
+    if headers is None:
+        raise ValueError("No table header found")
+
+    return headers, rows
@@ -0,0 +1,141 @@
+import re
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+_WORD_SEPARATOR = re.compile(r"[^a-z0-9]+")
+
+
+class FuzzyIndex:
+
+    def __init__(self, items: list):
+        # Shorter names rank first inside the same match tier
+        self._items = sorted(items, key=lambda item: (len(item), item))
+        self._lowered_items = [item.lower() for item in self._items]
+        self._all = (1 << len(self._items)) - 1
+
+        # Every key maps to a bitmask of the items containing it, the bit position is the item rank
+        size = len(self._items) // 8 + 1
+        chars: Dict[str, bytearray] = dict()
+        bigrams: Dict[str, bytearray] = dict()
+        prefixes: Dict[str, bytearray] = dict()
+        word_prefixes: Dict[str, bytearray] = dict()
+
+        def add(masks: Dict[str, bytearray], key: str, index: int) -> None:
+            mask = masks.get(key)
+            if mask is None:
+                mask = masks[key] = bytearray(size)
+            mask[index >> 3] |= 1 << (index & 7)
+
+        for index, item in enumerate(self._lowered_items):
+            for char in set(item):
+                add(chars, char, index)
+            for bigram in set(item[i:i + 2] for i in range(len(item) - 1)):
+                add(bigrams, bigram, index)
+            add(prefixes, item[:2], index)
+            for word in _WORD_SEPARATOR.split(item):
+                if word:
+                    add(word_prefixes, word[:2], index)
+
+        self._chars = _to_int_masks(chars)
+        self._bigrams = _to_int_masks(bigrams)
+        self._prefixes = _to_int_masks(prefixes)
+        self._word_prefixes = _to_int_masks(word_prefixes)
+
+        self._last_query: Optional[str] = None
+        self._last_masks: Tuple[int, int] = (self._all, self._all)
+        self._results: Dict[Tuple[str, int], list] = dict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def search(self, query: str, limit: int) -> list:
+        query = query.strip().lower()
+        if not query:
+            return self._items[:limit]
+
+        results = self._results.get((query, limit))
+        if results is not None:
+            return results
+
+        char_mask, bigram_mask = self._get_masks(query)
+        if len(query) == 1:
+            prefix_mask = _union(self._prefixes, query)
+            word_prefix_mask = _union(self._word_prefixes, query)
+        else:
+            prefix_mask = self._prefixes.get(query[:2], 0)
+            word_prefix_mask = self._word_prefixes.get(query[:2], 0)
+
+        word_search = re.compile(r"(?:^|[^a-z0-9])" + re.escape(query)).search
+        subsequence_search = re.compile(
+            re.escape(query[0]) + "".join("[^" + re.escape(char) + "]*" + re.escape(char) for char in query[1:])).search
+
+        # Ranked by tier: prefix, word prefix, substring and then subsequence matches
+        tiers: Tuple[Tuple[int, Callable[[str], bool]], ...] = (
+            (bigram_mask & prefix_mask, lambda item: item.startswith(query)),
+            (bigram_mask & word_prefix_mask, lambda item: word_search(item) is not None),
+            (bigram_mask, lambda item: query in item),
+            (char_mask, lambda item: subsequence_search(item) is not None),
+        )
+
+        results = []
+        matched = set()
+        for mask, is_match in tiers:
+            for index in _iter_bits(mask):
+                if index in matched or not is_match(self._lowered_items[index]):
+                    continue
+
+                matched.add(index)
+                results.append(self._items[index])
+                if len(results) >= limit:
+                    break
+            if len(results) >= limit:
+                break
+
+        if len(self._results) >= 256:
+            self._results.clear()
+        self._results[(query, limit)] = results
+
+        return results
+
+    def _get_masks(self, query: str) -> Tuple[int, int]:
+        # While typing, the masks of the previous query only need to be narrowed by the new characters
+        if self._last_query is not None and query.startswith(self._last_query):
+            char_mask, bigram_mask = self._last_masks
+            start = max(len(self._last_query) - 1, 0)
+        else:
+            char_mask, bigram_mask = self._all, self._all
+            start = 0
+
+        for char in query[start:]:
+            char_mask &= self._chars.get(char, 0)
+        for i in range(start, len(query) - 1):
+            bigram_mask &= self._bigrams.get(query[i:i + 2], 0)
+        bigram_mask &= char_mask
+
+        self._last_query = query
+        self._last_masks = (char_mask, bigram_mask)
+
+        return char_mask, bigram_mask
+
+
+def _to_int_masks(masks: Dict[str, bytearray]) -> Dict[str, int]:
+    return {key: int.from_bytes(mask, "little") for key, mask in masks.items()}
+
+
+def _union(masks: Dict[str, int], prefix: str) -> int:
+    result = 0
+    for key, mask in masks.items():
+        if key.startswith(prefix):
+            result |= mask
+
+    return result
+
+
+def _iter_bits(mask: int) -> Iterator[int]:
+    if not mask:
+        return
+
+    bits = bin(mask)[:1:-1]
+    index = bits.find("1")
+    while index != -1:
+        yield index
+        index = bits.find("1", index + 1)
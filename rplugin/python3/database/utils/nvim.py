@@ -1,4 +1,5 @@
 from asyncio import Future
+from difflib import SequenceMatcher
 from enum import Enum
 from typing import (
     Any,
@@ -77,18 +78,55 @@ def find_windows_in_tab() -> Iterator[Window]:
             yield window
 
 
-def create_buffer(keymaps: Dict[str, Sequence[str]] = dict, options: Dict[str, Any] = dict) -> Buffer:
-    mapping_options = {"noremap": True, "silent": True, "nowait": True}
+def create_buffer(keymaps: Optional[Dict[str, Sequence[str]]] = None,
+                  options: Optional[Dict[str, Any]] = None,
+                  visual_keymaps: Optional[Dict[str, Sequence[str]]] = None) -> Buffer:
     buffer: Buffer = _nvim.api.create_buf(False, True)
+    set_buffer_keymaps(buffer, keymaps or {}, visual_keymaps or {})
+
+    for option_name, option_value in (options or {}).items():
+        _nvim.api.buf_set_option(buffer, option_name, option_value)
+
+    return buffer
+
 
+def set_buffer_keymaps(buffer: Buffer, keymaps: Dict[str, Sequence[str]],
+                       visual_keymaps: Dict[str, Sequence[str]]) -> None:
+    mapping_options = {"noremap": True, "silent": True, "nowait": True}
     for function, mappings in keymaps.items():
         for mapping in mappings:
             _nvim.api.buf_set_keymap(buffer, "n", mapping, f"<cmd>call {function}(v:false)<cr>", mapping_options)
 
-    for option_name, option_value in options.items():
-        _nvim.api.buf_set_option(buffer, option_name, option_value)
+    # Leave visual mode first so the '< and '> marks point to the selection
+    for function, mappings in visual_keymaps.items():
+        for mapping in mappings:
+            _nvim.api.buf_set_keymap(buffer, "x", mapping, f"<Esc><cmd>call {function}(v:true)<cr>", mapping_options)
 
-    return buffer
+
+def delete_buffer_keymaps(buffer: Buffer, keymaps: Dict[str, Sequence[str]],
+                          visual_keymaps: Dict[str, Sequence[str]]) -> None:
+    for mappings in keymaps.values():
+        for mapping in mappings:
+            _nvim.api.buf_del_keymap(buffer, "n", mapping)
+
+    for mappings in visual_keymaps.values():
+        for mapping in mappings:
+            _nvim.api.buf_del_keymap(buffer, "x", mapping)
+
+
+def get_visual_selection_rows() -> Tuple[int, int]:
+    return _nvim.funcs.line("'<"), _nvim.funcs.line("'>")
+
+
+def get_visual_selection_range() -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    # (row, col) of the first and the last selected characters, the columns are 1-based byte indexes
+    _, start_row, start_col, _ = _nvim.funcs.getpos("'<")
+    _, end_row, end_col, _ = _nvim.funcs.getpos("'>")
+    return (start_row, start_col), (end_row, end_col)
+
+
+def set_buffer_keymap(buffer: Buffer, mode: str, mapping: str, rhs: str) -> None:
+    _nvim.api.buf_set_keymap(buffer, mode, mapping, rhs, {"noremap": True, "silent": True, "nowait": True})
 
 
 def set_buffer_var(buffer_handle: int, var_name: str, var_value: Any) -> None:
@@ -164,6 +202,14 @@ def get_buffer_option(buffer: Buffer, option: str) -> Any:
     return _nvim.api.buf_get_option(buffer, option)
 
 
+def set_buffer_option(buffer: Buffer, option: str, value: Any) -> None:
+    _nvim.api.buf_set_option(buffer, option, value)
+
+
+def set_buffer_name(buffer: Buffer, name: str) -> None:
+    _nvim.api.buf_set_name(buffer, name)
+
+
 def get_buffer_content(buffer: Buffer) -> list:
     return get_lines(buffer, 0, get_line_count(buffer))
 
@@ -180,6 +226,11 @@ def confirm(question: str) -> bool:
     return _nvim.funcs.confirm(question, "&Yes\n&No", 2) == 1
 
 
+def choose(question: str, choices: list) -> int:
+    # The 1-based index of the chosen choice, 0 when the prompt was cancelled
+    return _nvim.funcs.confirm(question, "\n".join(choices), len(choices))
+
+
 def get_input(question: str, default: str = "") -> str:
     return _nvim.funcs.input(question, default)
 
@@ -215,19 +266,99 @@ def set_cursor(window: Window, cursor: Tuple[int, int]) -> None:
     _nvim.api.win_set_cursor(window, cursor)
 
 
+def create_namespace(name: str) -> int:
+    return _nvim.api.create_namespace(name)
+
+
+def clear_namespace(buffer: Buffer, namespace: int) -> None:
+    _nvim.api.buf_clear_namespace(buffer, namespace, 0, -1)
+
+
+def set_virtual_text(buffer: Buffer,
+                     namespace: int,
+                     line: int,
+                     text: str,
+                     highlight: str = "Comment",
+                     position: str = "eol") -> None:
+    _nvim.api.buf_set_extmark(buffer, namespace, line, 0, {
+        "virt_text": [[text, highlight]],
+        "virt_text_pos": position,
+    })
+
+
+def add_line_highlight(buffer: Buffer, namespace: int, line: int, highlight: str) -> None:
+    _nvim.api.buf_add_highlight(buffer, namespace, highlight, line, 0, -1)
+
+
 def render(window: Window, lines: list, modifiable: Optional[bool] = None) -> None:
     buffer: Buffer = get_buffer_in_window(window)
     instruction = _buf_set_lines(buffer, lines, modifiable)
     call_atomic(*instruction)
 
 
+def render_buffer(buffer: Buffer, lines: list, modifiable: Optional[bool] = None) -> None:
+    instruction = _buf_set_lines(buffer, lines, modifiable)
+    call_atomic(*instruction)
+
+
+def is_buffer_valid(buffer: Buffer) -> bool:
+    return _nvim.api.buf_is_valid(buffer)
+
+
+def delete_buffer(buffer: Buffer) -> None:
+    _nvim.api.buf_delete(buffer, {"force": True})
+
+
+def set_current_window(window: Window) -> None:
+    _nvim.api.set_current_win(window)
+
+
+def get_current_window() -> Window:
+    return _nvim.api.get_current_win()
+
+
+def render_diff(window: Window, lines: list) -> None:
+    # Only the changed lines are replaced, the cursor and the marks of the other lines stay where they are
+    buffer: Buffer = get_buffer_in_window(window)
+    lines = [line.rstrip('\n') for line in lines]
+    opcodes = [
+        opcode for opcode in SequenceMatcher(None, get_buffer_content(buffer), lines, autojunk=False).get_opcodes()
+        if opcode[0] != "equal"
+    ]
+    # From the end, the line numbers of the previous changes stay valid
+    replace_lines(window, [(start, end, lines[new_start:new_end])
+                           for _, start, end, new_start, new_end in reversed(opcodes)])
+
+
+def replace_lines(window: Window, changes: list) -> None:
+    # The (start, end, lines) changes are applied one after another in one atomic call
+    if not changes:
+        return
+
+    buffer: Buffer = get_buffer_in_window(window)
+    modifiable = get_buffer_option(buffer, "modifiable")
+    instructions = [] if modifiable else [("nvim_buf_set_option", (buffer, "modifiable", True))]
+    for start, end, lines in changes:
+        instructions.append(("nvim_buf_set_lines", (buffer, start, end, False, lines)))
+    if not modifiable:
+        instructions.append(("nvim_buf_set_option", (buffer, "modifiable", False)))
+    call_atomic(*instructions)
+
+
+def render_lines(window: Window, start: int, lines: list, modifiable: Optional[bool] = None) -> None:
+    buffer: Buffer = get_buffer_in_window(window)
+    instruction = _buf_set_lines(buffer, lines, modifiable, start)
+    call_atomic(*instruction)
+
+
 def _buf_set_lines(buffer: Buffer,
                    lines: list,
-                   modifiable: Optional[bool] = None) -> Iterator[Tuple[str, Sequence[Any]]]:
+                   modifiable: Optional[bool] = None,
+                   start: int = 0) -> Iterator[Tuple[str, Sequence[Any]]]:
     modifiable = modifiable if modifiable is not None else get_buffer_option(buffer, "modifiable")
     if not modifiable:
         yield "nvim_buf_set_option", (buffer, "modifiable", True)
 
-    yield "nvim_buf_set_lines", (buffer, 0, -1, True, [line.rstrip('\n') for line in lines])
+    yield "nvim_buf_set_lines", (buffer, start, -1, False, [line.rstrip('\n') for line in lines])
     if not modifiable:
         yield "nvim_buf_set_option", (buffer, "modifiable", False)
@@ -0,0 +1,122 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_TOKEN_PATTERNS = {
+    "mysql": re.compile(r"--|#|/\*|'|\"|`|;"),
+    "postgresql": re.compile(r"--|/\*|[eE]'|'|\"|\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$|;"),
+    "sqlite": re.compile(r"--|/\*|'|\"|`|\[|;"),
+}
+_KEYWORD_PATTERN = re.compile(r"[A-Za-z]+")
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LITERAL_LIST_PATTERN = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@dataclass(frozen=True)
+class Statement:
+    text: str
+    # Offsets of the statement in the script from the end of the previous one, the end includes the semicolon
+    start: int
+    end: int
+    # Lower case first word of the statement, eg: select
+    keyword: str
+
+
+def split_statements(script: str, dialect: str) -> list:
+    token_pattern = _TOKEN_PATTERNS.get(dialect, _TOKEN_PATTERNS["sqlite"])
+    backslash_escapes = dialect == "mysql"
+
+    statements = []
+    start = 0
+    position = 0
+    # Offsets of the code of the current statement, the surrounding spaces and comments are left out
+    code_start: Optional[int] = None
+    code_end = 0
+    length = len(script)
+    while position < length:
+        match = token_pattern.search(script, position)
+        token_start = length if match is None else match.start()
+        code = script[position:token_start]
+        if code.strip():
+            if code_start is None:
+                code_start = position + len(code) - len(code.lstrip())
+            code_end = position + len(code.rstrip())
+        if match is None:
+            break
+
+        token = match.group()
+        if token == "--" or token == "#":
+            position = _find_end(script, "\n", match.end())
+            continue
+        if token == "/*":
+            position = _find_end(script, "*/", match.end())
+            continue
+
+        if token == ";":
+            # Empty statements are skipped
+            if code_start is not None:
+                statements.append(_create_statement(script, start, code_start, code_end, match.end()))
+            start = position = match.end()
+            code_start = None
+            continue
+
+        if code_start is None:
+            code_start = token_start
+        if token.startswith("$"):
+            position = _find_end(script, token, match.end())
+        elif token == "[":
+            position = _find_end(script, "]", match.end())
+        else:
+            quote = token[-1]
+            position = _find_quote_end(script, quote, match.end(), backslash_escapes or token != quote)
+        code_end = position
+
+    if code_start is not None:
+        statements.append(_create_statement(script, start, code_start, code_end, length))
+
+    return statements
+
+
+def find_statement(statements: list, offset: int) -> Optional[Statement]:
+    # The trailing spaces and comments of the script belong to the last statement
+    for statement in statements:
+        if offset < statement.end:
+            return statement
+
+    return statements[-1] if statements else None
+
+
+def get_query_shape(query: str) -> str:
+    # The query without its literals, eg: "id IN (1, 2) AND name = 'a'" -> "id in (?) and name = ?"
+    shape = _LITERAL_PATTERN.sub("?", query)
+    shape = _LITERAL_LIST_PATTERN.sub("?", shape)
+    return " ".join(shape.split()).lower()
+
+
+def _create_statement(script: str, start: int, code_start: int, code_end: int, end: int) -> Statement:
+    text = script[code_start:code_end]
+    keyword = _KEYWORD_PATTERN.match(text)
+    return Statement(text=text, start=start, end=end, keyword="" if keyword is None else keyword.group().lower())
+
+
+def _find_end(script: str, terminator: str, position: int) -> int:
+    end = script.find(terminator, position)
+    return len(script) if end == -1 else end + len(terminator)
+
+
+def _find_quote_end(script: str, quote: str, position: int, backslash_escapes: bool) -> int:
+    length = len(script)
+    while position < length:
+        char = script[position]
+        if backslash_escapes and char == "\\":
+            position += 2
+        elif char == quote:
+            # A doubled quote is an escaped quote
+            if position + 1 < length and script[position + 1] == quote:
+                position += 2
+            else:
+                return position + 1
+        else:
+            position += 1
+
+    return length
@@ -5,6 +5,7 @@ from pynvim.api.window import Window
 
 from ..configs.config import UserConfig
 from ..utils.nvim import (
+    execute,
     find_windows_in_tab,
     get_buffer_option,
     create_buffer,
@@ -14,11 +15,24 @@ from ..utils.nvim import (
     get_buffer_in_window,
     get_current_cursor,
     get_lines,
+    get_line_count,
+    get_buffer_content,
+    set_buffer_keymaps,
+    delete_buffer_keymaps,
+    set_buffer_name,
+    set_buffer_option,
+    create_namespace,
+    clear_namespace,
+    set_virtual_text,
+    add_line_highlight,
     get_window_width,
     set_window_width,
     WindowLayout,
     get_window_height,
     set_window_height,
+    render_diff,
+    replace_lines,
+    set_cursor,
 )
 
 _VIM_DATABASE_FILE_TYPE = 'VimDatabase'
@@ -65,6 +79,90 @@ def get_current_database_window_row() -> Optional[int]:
     return row
 
 
+def set_database_window_marker(name: str, text: Optional[str]) -> None:
+    window = _find_database_window_in_tab()
+    if window is None:
+        return
+
+    buffer: Buffer = get_buffer_in_window(window)
+    namespace = create_namespace(_VIM_DATABASE_FILE_TYPE + "_" + name)
+    clear_namespace(buffer, namespace)
+    # The marker is shown next to the header line of the table
+    if text is not None and get_line_count(buffer) > 1:
+        set_virtual_text(buffer, namespace, 1, text)
+
+
+def set_database_window_highlights(name: str, highlights: dict) -> None:
+    window = _find_database_window_in_tab()
+    if window is None:
+        return
+
+    buffer: Buffer = get_buffer_in_window(window)
+    namespace = create_namespace(_VIM_DATABASE_FILE_TYPE + "_" + name)
+    clear_namespace(buffer, namespace)
+    for line, highlight in highlights.items():
+        add_line_highlight(buffer, namespace, line, highlight)
+
+
+def set_database_window_editable(settings: UserConfig, name: Optional[str]) -> None:
+    window = _find_database_window_in_tab()
+    if window is None:
+        return
+
+    buffer: Buffer = get_buffer_in_window(window)
+    handle = str(buffer.handle)
+    if name is not None:
+        # The mappings would shadow the editing commands, :w sends the buffer back to the plugin instead
+        delete_buffer_keymaps(buffer, settings.mappings, settings.visual_mappings)
+        set_buffer_name(buffer, "vim-database://" + handle + "/" + name)
+        set_buffer_option(buffer, "buftype", "acwrite")
+        set_buffer_option(buffer, "modifiable", True)
+        set_buffer_option(buffer, "modified", False)
+        execute("autocmd BufWriteCmd <buffer=" + handle + "> call VimDatabase_write_table()")
+    else:
+        execute("autocmd! BufWriteCmd <buffer=" + handle + ">")
+        set_buffer_option(buffer, "modified", False)
+        set_buffer_option(buffer, "modifiable", False)
+        set_buffer_option(buffer, "buftype", "nofile")
+        set_buffer_keymaps(buffer, settings.mappings, settings.visual_mappings)
+
+
+def is_database_window_modified() -> bool:
+    window = _find_database_window_in_tab()
+    if window is None:
+        return False
+
+    return get_buffer_option(get_buffer_in_window(window), "modified")
+
+
+def get_database_window_content() -> Optional[list]:
+    window = _find_database_window_in_tab()
+    if window is None:
+        return None
+
+    return get_buffer_content(get_buffer_in_window(window))
+
+
+def update_database_window(lines: list) -> None:
+    window = _find_database_window_in_tab()
+    if window is not None:
+        render_diff(window, lines)
+
+
+def append_database_window_rows(lines: list, removed: int) -> None:
+    # The lines are added above the bottom border and the oldest rows removed below the header, the cursor follows the
+    # new rows when it was on the last one
+    window = _find_database_window_in_tab()
+    if window is None:
+        return
+
+    line_count = get_line_count(get_buffer_in_window(window))
+    row, column = get_current_cursor(window)
+    replace_lines(window, [(line_count - 1, line_count - 1, lines), (3, 3 + removed, [])])
+    if row >= line_count - 1:
+        set_cursor(window, (line_count - 1 + len(lines) - removed, column))
+
+
 def is_database_window_open() -> bool:
     return _find_database_window_in_tab() is not None
 
@@ -119,7 +217,7 @@ def _open_database_window(settings: UserConfig) -> Window:
             'buflisted': False,
             'modifiable': False,
             'filetype': _VIM_DATABASE_FILE_TYPE,
-        })
+        }, settings.visual_mappings)
     window = create_window(settings.window_size, _get_window_layout(settings.window_layout), {
         'list': False,
         'number': False,
@@ -0,0 +1,52 @@
+from pynvim.api.buffer import Buffer
+
+from ..utils.nvim import (
+    execute,
+    create_buffer,
+    set_buffer_name,
+    find_windows_in_tab,
+    get_buffer_in_window,
+    set_current_window,
+    is_buffer_valid,
+    delete_buffer,
+    render_buffer,
+)
+
+_VIM_DATABASE_JOB_FILE_TYPE = "VimDatabaseJob"
+
+
+def create_job_buffer(job_id: int) -> Buffer:
+    buffer = create_buffer({}, {
+        "buftype": "nofile",
+        "bufhidden": "hide",
+        "swapfile": False,
+        "buflisted": False,
+        "modifiable": False,
+        "filetype": _VIM_DATABASE_JOB_FILE_TYPE,
+    })
+    set_buffer_name(buffer, "vim-database://job/" + str(job_id))
+    return buffer
+
+
+def render_job_buffer(buffer: Buffer, lines: list) -> None:
+    # The buffer may have been wiped out by the user
+    if is_buffer_valid(buffer):
+        render_buffer(buffer, lines, False)
+
+
+def open_job_buffer(buffer: Buffer) -> bool:
+    if not is_buffer_valid(buffer):
+        return False
+
+    for window in find_windows_in_tab():
+        if get_buffer_in_window(window).handle == buffer.handle:
+            set_current_window(window)
+            return True
+
+    execute("botright sbuffer " + str(buffer.handle))
+    return True
+
+
+def delete_job_buffer(buffer: Buffer) -> None:
+    if is_buffer_valid(buffer):
+        delete_buffer(buffer)
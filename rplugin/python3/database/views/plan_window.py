@@ -0,0 +1,63 @@
+from typing import Optional
+
+from pynvim.api.buffer import Buffer
+from pynvim.api.window import Window
+
+from ..utils.nvim import (
+    execute,
+    create_buffer,
+    set_buffer_name,
+    find_windows_in_tab,
+    get_buffer_in_window,
+    get_current_window,
+    set_current_window,
+    set_window_option,
+    is_buffer_valid,
+    create_namespace,
+    clear_namespace,
+    add_line_highlight,
+    render_buffer,
+)
+
+_VIM_DATABASE_PLAN_FILE_TYPE = "VimDatabasePlan"
+_plan_buffer: Optional[Buffer] = None
+
+
+def show_plan_window(lines: list, highlights: dict) -> None:
+    global _plan_buffer
+    if _plan_buffer is None or not is_buffer_valid(_plan_buffer):
+        _plan_buffer = create_buffer({}, {
+            "buftype": "nofile",
+            "bufhidden": "hide",
+            "swapfile": False,
+            "buflisted": False,
+            "modifiable": False,
+            "shiftwidth": 2,
+            "filetype": _VIM_DATABASE_PLAN_FILE_TYPE,
+        })
+        set_buffer_name(_plan_buffer, "vim-database://plan")
+
+    render_buffer(_plan_buffer, lines, False)
+    namespace = create_namespace(_VIM_DATABASE_PLAN_FILE_TYPE)
+    clear_namespace(_plan_buffer, namespace)
+    for line, highlight in highlights.items():
+        add_line_highlight(_plan_buffer, namespace, line, highlight)
+
+    window = _find_plan_window()
+    if window is None:
+        execute("botright sbuffer " + str(_plan_buffer.handle))
+        window = get_current_window()
+        # Every node folds its details and children, zc / zo collapse and expand the tree
+        set_window_option(window, "foldmethod", "indent")
+        set_window_option(window, "wrap", False)
+    else:
+        set_current_window(window)
+    set_window_option(window, "foldlevel", 99)
+
+
+def _find_plan_window() -> Optional[Window]:
+    for window in find_windows_in_tab():
+        if get_buffer_in_window(window).handle == _plan_buffer.handle:
+            return window
+
+    return None
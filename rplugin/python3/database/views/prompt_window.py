@@ -0,0 +1,101 @@
+from typing import Optional
+
+from pynvim.api.buffer import Buffer
+from pynvim.api.window import Window
+
+from ..utils.nvim import (
+    execute,
+    get_option,
+    create_buffer,
+    create_namespace,
+    set_buffer_keymap,
+    set_virtual_text,
+    open_window,
+    set_window_option,
+    find_windows_in_tab,
+    get_buffer_in_window,
+    get_buffer_option,
+    get_window_width,
+    get_window_height,
+    close_window,
+    set_cursor,
+    render,
+)
+
+_VIM_DATABASE_PROMPT_FILE_TYPE = "VimDatabasePrompt"
+
+
+def open_prompt_window(title: str,
+                       text: str,
+                       on_change: str,
+                       on_submit: str,
+                       relative_window: Optional[Window] = None,
+                       height: int = 1) -> Window:
+    close_prompt_window()
+
+    buffer = create_buffer({}, {
+        "buftype": "nofile",
+        "bufhidden": "wipe",
+        "swapfile": False,
+        "buflisted": False,
+        "modifiable": True,
+        "filetype": _VIM_DATABASE_PROMPT_FILE_TYPE,
+    })
+
+    if relative_window is not None:
+        # Stick the prompt to the bottom of the given window
+        window_options = {
+            "relative": "win",
+            "win": relative_window.handle,
+            "width": get_window_width(relative_window),
+            "height": height,
+            "col": 0,
+            "row": max(get_window_height(relative_window) - height, 0),
+        }
+    else:
+        width = int(get_option("columns") / 1.5)
+        window_options = {
+            "relative": "editor",
+            "width": width,
+            "height": height,
+            "col": int((get_option("columns") - width) / 2),
+            "row": int((get_option("lines") - height) / 2),
+        }
+
+    window = open_window(buffer, True, dict(window_options, anchor="NW", style="minimal"))
+    set_window_option(window, "winhl", "Normal:Normal,NormalNC:Normal")
+    render(window, [text])
+    set_cursor(window, (1, len(text)))
+    set_virtual_text(buffer, create_namespace(_VIM_DATABASE_PROMPT_FILE_TYPE), 0, title, "Comment", "right_align")
+
+    # The first line of the buffer is the prompt, the remaining lines (if any) are the results
+    handle = str(buffer.handle)
+    submit = "<cmd>call " + on_submit + "(getline(1), line('.') - 1)<cr>"
+    execute("autocmd TextChanged,TextChangedI <buffer=" + handle + "> call " + on_change + "(getline(1))")
+    execute("autocmd BufLeave <buffer=" + handle + "> ++once call CloseVimDatabasePrompt(" + handle + ")")
+    set_buffer_keymap(buffer, "i", "<CR>", "<Esc>" + submit)
+    set_buffer_keymap(buffer, "n", "<CR>", submit)
+    set_buffer_keymap(buffer, "n", "<Esc>", "<cmd>call CloseVimDatabasePrompt(" + handle + ")<cr>")
+    set_buffer_keymap(buffer, "n", "q", "<cmd>call CloseVimDatabasePrompt(" + handle + ")<cr>")
+    execute("startinsert!")
+
+    return window
+
+
+def close_prompt_window() -> None:
+    window = _find_prompt_window()
+    if window is not None:
+        close_window(window, True)
+
+
+def get_prompt_window() -> Optional[Window]:
+    return _find_prompt_window()
+
+
+def _find_prompt_window() -> Optional[Window]:
+    for window in find_windows_in_tab():
+        buffer: Buffer = get_buffer_in_window(window)
+        if get_buffer_option(buffer, "filetype") == _VIM_DATABASE_PROMPT_FILE_TYPE:
+            return window
+
+    return None
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Tuple
 
 from pynvim.api.buffer import Buffer
 from pynvim.api.window import Window
@@ -17,6 +17,9 @@ from ..utils.nvim import (
     get_buffer_in_window,
     close_window,
     get_buffer_content,
+    get_current_cursor,
+    get_lines,
+    get_visual_selection_range,
     render,
 )
 from ..utils.strings import string_compose
@@ -47,7 +50,7 @@ def open_query_window(settings: UserConfig) -> Optional[Window]:
                 "buflisted": False,
                 "modifiable": True,
                 "filetype": "sql"
-            })
+            }, settings.query_visual_mappings)
 
     border_winid = get_buffer_var(_query_buffer.handle, "border_winid", -1)
     if len(get_window_info(border_winid)) != 0:
@@ -115,13 +118,32 @@ def open_query_window(settings: UserConfig) -> Optional[Window]:
     return window
 
 
-def get_query() -> Optional[str]:
+def get_query_script() -> Optional[Tuple[str, int]]:
+    # The whole buffer and the offset of the cursor in it
+    query_window = _find_query_window()
+    if query_window is None:
+        return None
+
+    lines = get_buffer_content(query_window.buffer)
+    row, col = get_current_cursor(query_window)
+    offset = sum(len(line) + 1 for line in lines[:row - 1]) + _get_char_index(lines[row - 1], col)
+    return "\n".join(lines), offset
+
+
+def get_selected_query() -> Optional[str]:
     buffer = _find_query_buffer()
     if buffer is None:
         return None
-    buffer_content = get_buffer_content(buffer)
-    buffer_content = list(map(lambda line: line.strip(), buffer_content))
-    sql_query = ' '.join(buffer_content).strip()
+
+    (start_row, start_col), (end_row, end_col) = get_visual_selection_range()
+    lines = get_lines(buffer, start_row - 1, end_row)
+    if not lines:
+        return None
+
+    # The end column of a linewise selection is past the end of the line
+    lines[-1] = lines[-1][:_get_char_index(lines[-1], end_col - 1) + 1]
+    lines[0] = lines[0][_get_char_index(lines[0], start_col - 1):]
+    sql_query = "\n".join(lines).strip()
 
     return None if len(sql_query) == 0 else sql_query
 
@@ -132,6 +154,11 @@ def is_query_window_opened() -> bool:
     return query_window is not None
 
 
+def _get_char_index(line: str, byte_index: int) -> int:
+    # Neovim columns count bytes
+    return len(line.encode("utf-8")[:byte_index].decode("utf-8", "ignore"))
+
+
 def _find_window_by_winid(winid: int) -> Optional[Window]:
     for window in find_windows_in_tab():
         if window.handle == winid: